@@ -0,0 +1,96 @@
+"""
+Benchmark comparing the legacy base64+pickle set encoding with the
+JSON-native tagged encoding.
+
+For a user-like document it measures the size of the stored JSON and the time
+needed to decode it back into Python sets (json.loads included, since that is
+what every storage read pays).
+
+Usage:
+    python benchmark_set_encoding.py [--set-size 200] [--repeat 2000]
+"""
+import sys
+import json
+import pathlib
+import argparse
+import timeit
+from uuid import uuid4
+from os.path import dirname, realpath
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+from eventplanner.eventplanner_backend.storage.eventplanner_set_encoding import (
+    LEGACY_TAG,
+    LegacySetSerializer,
+    decode_document,
+    encode_document,
+)
+
+SET_FIELDS = ("friends", "events_created", "events_participation")
+
+
+def build_document(set_size: int) -> dict:
+    document = {"id": str(uuid4()), "username": "benchmark", "email": "b@example.com"}
+    for field in SET_FIELDS:
+        document[field] = {str(uuid4()) for _ in range(set_size)}
+    return document
+
+
+def legacy_encode(document: dict) -> str:
+    serializer = LegacySetSerializer()
+    return json.dumps(
+        {
+            field: (
+                LEGACY_TAG + serializer.encode(value)
+                if isinstance(value, set)
+                else value
+            )
+            for field, value in document.items()
+        }
+    )
+
+
+def legacy_decode(data: str) -> dict:
+    serializer = LegacySetSerializer()
+    document = json.loads(data)
+    for field, value in document.items():
+        if isinstance(value, str) and value.startswith(LEGACY_TAG):
+            document[field] = serializer.decode(value[len(LEGACY_TAG) :])
+    return document
+
+
+def native_encode(document: dict) -> str:
+    return json.dumps(encode_document(document))
+
+
+def native_decode(data: str) -> dict:
+    return decode_document(json.loads(data))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--set-size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=2000)
+    arguments = parser.parse_args()
+
+    document = build_document(arguments.set_size)
+    legacy = legacy_encode(document)
+    native = native_encode(document)
+    assert legacy_decode(legacy) == native_decode(native) == document
+
+    print(f"{'encoding':<10}{'bytes':>10}{'decode us':>12}{'encode us':>12}")
+    for name, encoded, decode, encode in (
+        ("pickle", legacy, legacy_decode, legacy_encode),
+        ("native", native, native_decode, native_encode),
+    ):
+        decode_time = timeit.timeit(lambda: decode(encoded), number=arguments.repeat)
+        encode_time = timeit.timeit(lambda: encode(document), number=arguments.repeat)
+        print(
+            f"{name:<10}{len(encoded):>10}"
+            f"{decode_time / arguments.repeat * 1e6:>12.1f}"
+            f"{encode_time / arguments.repeat * 1e6:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
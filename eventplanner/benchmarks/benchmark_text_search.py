@@ -0,0 +1,91 @@
+"""
+Benchmark of the full-text event search.
+
+Indexes synthetic events (title, description and location drawn from a small
+vocabulary plus unique words) in a ``TextIndex`` and compares the time of a
+ranked top-k search with a scan matching the query words against every event.
+
+Usage:
+    python benchmark_text_search.py [--events 100000] [--repeat 20]
+"""
+import sys
+import random
+import pathlib
+import argparse
+import timeit
+from os.path import dirname, realpath
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+from eventplanner.eventplanner_backend.storage.eventplanner_text_index import (
+    TextIndex,
+    tokenize,
+)
+
+WORDS = (
+    "jazz rock concert festival open air park night market food wine tasting "
+    "book club reading lecture science tech meetup startup networking yoga "
+    "run marathon city museum art gallery photo walk river boat party"
+).split()
+CITIES = ("Bucharest", "Cluj", "Iasi", "Timisoara", "Brasov", "Constanta")
+QUERIES = ("jazz conc", "wine", "art gallery bucharest", "marath", "photo walk cluj")
+
+
+def build_events(count: int) -> list:
+    generator = random.Random(0)
+    return [
+        {
+            "title": " ".join(generator.sample(WORDS, 3)),
+            "description": " ".join(generator.choices(WORDS, k=20)) + f" event{i}",
+            "location": generator.choice(CITIES),
+        }
+        for i in range(count)
+    ]
+
+
+def scan(events: list, text: str, limit: int) -> list:
+    words = tokenize(text)
+    matches = []
+    for doc_id, event in enumerate(events, start=1):
+        event_words = tokenize(
+            f"{event['title']} {event['description']} {event['location']}"
+        )
+        score = sum(
+            1 for word in event_words for query in words if word.startswith(query)
+        )
+        if score:
+            matches.append((score, doc_id))
+    return sorted(matches, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    arguments = parser.parse_args()
+
+    events = build_events(arguments.events)
+    index = TextIndex("title", "description", "location")
+    build_time = timeit.timeit(
+        lambda: [index.add(doc_id, event) for doc_id, event in enumerate(events, 1)],
+        number=1,
+    )
+    print(f"indexed {len(events)} events in {build_time:.2f} s")
+
+    print(f"{'query':<24}{'index ms':>10}{'scan ms':>10}")
+    for query in QUERIES:
+        index_time = timeit.timeit(
+            lambda: index.search(query, arguments.limit), number=arguments.repeat
+        )
+        scan_time = timeit.timeit(
+            lambda: scan(events, query, arguments.limit), number=1
+        )
+        print(
+            f"{query:<24}{index_time / arguments.repeat * 1e3:>10.2f}"
+            f"{scan_time * 1e3:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark of the parsing and serialization of forecasts.
+
+Parses a synthetic open-meteo response into one validated
+``HourlyWeatherData`` model per hour grouped into days, the way
+``fetch_and_create_weather_data`` used to, and into ``WeatherColumns``.
+Times the parsing, the serialization of the result to JSON, and, for the
+columns, building the row models of the default response format from them.
+
+Usage:
+    python benchmark_weather_parsing.py [--days 16] [--repeat 200]
+"""
+import sys
+import json
+import random
+import pathlib
+import argparse
+import timeit
+from datetime import datetime, timedelta
+from os.path import dirname, realpath
+from typing import List
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+import pydantic_core
+from pydantic import TypeAdapter
+
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
+    HourlyWeatherData,
+    DailyWeatherData,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_weather_columns import (
+    HOURLY_VARIABLES,
+    WeatherColumns,
+)
+
+DAYS_ADAPTER = TypeAdapter(List[DailyWeatherData])
+
+
+def build_response(days: int) -> dict:
+    generator = random.Random(0)
+    start = datetime(2024, 5, 1)
+    hours = 24 * days
+    hourly = {
+        "time": [
+            (start + timedelta(hours=i)).isoformat(timespec="minutes")
+            for i in range(hours)
+        ]
+    }
+    for variable in HOURLY_VARIABLES:
+        hourly[variable] = [round(generator.uniform(0, 30), 1) for _ in range(hours)]
+    return {"hourly": hourly}
+
+
+def parse_rows(data: dict, days: int) -> List[DailyWeatherData]:
+    hourly_data_list = []
+    for i in range(len(data["time"])):
+        hourly_data_list.append(
+            HourlyWeatherData(
+                time=datetime.fromisoformat(data["time"][i]),
+                **{variable: data[variable][i] for variable in HOURLY_VARIABLES},
+            )
+        )
+    return [
+        DailyWeatherData(
+            date=hourly_data_list[day * 24].time.date(),
+            hourly_data=hourly_data_list[day * 24 : (day + 1) * 24],
+        )
+        for day in range(days)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=200)
+    arguments = parser.parse_args()
+
+    text = json.dumps(build_response(arguments.days))
+    data = json.loads(text)["hourly"]
+    rows = parse_rows(data, arguments.days)
+    columns = WeatherColumns.from_open_meteo(data)
+    assert DAYS_ADAPTER.dump_python(rows) == DAYS_ADAPTER.dump_python(
+        columns.daily_data
+    )
+
+    cases = [
+        ("parse rows", lambda: parse_rows(data, arguments.days)),
+        ("parse columns", lambda: WeatherColumns.from_open_meteo(data)),
+        ("columns to rows", lambda: WeatherColumns.from_open_meteo(data).daily_data),
+        ("serialize rows", lambda: DAYS_ADAPTER.dump_json(rows)),
+        ("serialize columns", lambda: pydantic_core.to_json(columns.daily_json())),
+    ]
+    print(f"{24 * arguments.days} hours, {len(HOURLY_VARIABLES)} variables")
+    print(f"{'case':<20}{'ms':>10}")
+    for name, case in cases:
+        seconds = timeit.timeit(case, number=arguments.repeat)
+        print(f"{name:<20}{seconds / arguments.repeat * 1e3:>10.3f}")
+    print(
+        f"JSON size: rows {len(DAYS_ADAPTER.dump_json(rows))} bytes, "
+        f"columns {len(pydantic_core.to_json(columns.daily_json()))} bytes"
+    )
+
+
+if __name__ == "__main__":
+    main()
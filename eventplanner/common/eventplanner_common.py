@@ -1,8 +1,10 @@
+import os
 from enum import Enum
 
-EVENTPLANNER_BACKEND_PORT = 8080
-EVENTPLANNER_BACKEND_HOST = "127.0.0.1"
+EVENTPLANNER_BACKEND_PORT = int(os.environ.get("EVENTPLANNER_BACKEND_PORT", 8080))
+EVENTPLANNER_BACKEND_HOST = os.environ.get("EVENTPLANNER_BACKEND_HOST", "127.0.0.1")
 EVENTPLANNER_BACKEND_APP = "eventplanner_main:app"
+EVENTPLANNER_BACKEND_WORKERS = int(os.environ.get("EVENTPLANNER_BACKEND_WORKERS", 1))
 
 
 class EventplannerBackendTags(Enum):
@@ -12,3 +14,73 @@ class EventplannerBackendTags(Enum):
     INVITATION: str = "Invitation"
     NOTIFICATION: str = "Notification"
     WEATHER: str = "Weather"
+
+
+class EventplannerDatabaseEngine(str, Enum):
+    JSON = "json"
+    SQLITE = "sqlite"
+    WAL = "wal"
+
+
+EVENTPLANNER_DATABASE_ENGINE = EventplannerDatabaseEngine(
+    os.environ.get("EVENTPLANNER_DATABASE_ENGINE", EventplannerDatabaseEngine.JSON)
+)
+EVENTPLANNER_DATABASE_JSON_PATH = "db.json"
+EVENTPLANNER_DATABASE_SQLITE_PATH = "db.sqlite3"
+EVENTPLANNER_DATABASE_WAL_PATH = "db.json.wal"
+EVENTPLANNER_DATABASE_COMPACTION_INTERVAL = 60.0
+EVENTPLANNER_DATABASE_WAL_MAX_BYTES = 4 * 1024 * 1024
+
+# When enabled every table gets its own storage file (db.users.json,
+# db.events.sqlite3, ...), flushed and compacted independently.
+EVENTPLANNER_DATABASE_PER_TABLE_FILES = (
+    os.environ.get("EVENTPLANNER_DATABASE_PER_TABLE_FILES", "false").lower() == "true"
+)
+EVENTPLANNER_DATABASE_TABLE_COMPACTION_INTERVALS = {
+    "users": 300.0,
+    "events": 30.0,
+}
+
+# Lock the storage across processes and reload caches and indexes after writes
+# from other processes. Needed with several workers, or when other uvicorn
+# instances share the database files.
+EVENTPLANNER_DATABASE_MULTIPROCESS = (
+    EVENTPLANNER_BACKEND_WORKERS > 1
+    or os.environ.get("EVENTPLANNER_DATABASE_MULTIPROCESS", "false").lower() == "true"
+)
+
+# Geocoded locations are kept in an in-process LRU and in the database;
+# locations the geocoder does not know are asked again sooner.
+EVENTPLANNER_GEOCODER_USER_AGENT = "eventplanner"
+EVENTPLANNER_GEOCODER_DOMAIN = os.environ.get(
+    "EVENTPLANNER_GEOCODER_DOMAIN", "nominatim.openstreetmap.org"
+)
+EVENTPLANNER_GEOCODER_SCHEME = os.environ.get("EVENTPLANNER_GEOCODER_SCHEME", "https")
+EVENTPLANNER_GEOCODING_CACHE_SIZE = int(
+    os.environ.get("EVENTPLANNER_GEOCODING_CACHE_SIZE", 4096)
+)
+EVENTPLANNER_GEOCODING_TTL = float(
+    os.environ.get("EVENTPLANNER_GEOCODING_TTL", 30 * 24 * 3600)
+)
+EVENTPLANNER_GEOCODING_NEGATIVE_TTL = float(
+    os.environ.get("EVENTPLANNER_GEOCODING_NEGATIVE_TTL", 3600)
+)
+
+# Forecasts are cached per cell of the forecast model grid and time interval
+# until the next model update. Set EVENTPLANNER_WEATHER_CACHE=false to always
+# ask open-meteo.
+EVENTPLANNER_WEATHER_URL = os.environ.get(
+    "EVENTPLANNER_WEATHER_URL", "https://api.open-meteo.com/v1/forecast"
+)
+# open-meteo is asked over a pooled keep-alive connection per event loop
+EVENTPLANNER_WEATHER_CONNECT_TIMEOUT = 3.0
+EVENTPLANNER_WEATHER_READ_TIMEOUT = 10.0
+EVENTPLANNER_WEATHER_MAX_CONNECTIONS = 20
+EVENTPLANNER_WEATHER_CACHE = (
+    os.environ.get("EVENTPLANNER_WEATHER_CACHE", "true").lower() == "true"
+)
+EVENTPLANNER_WEATHER_CACHE_SIZE = int(
+    os.environ.get("EVENTPLANNER_WEATHER_CACHE_SIZE", 1024)
+)
+EVENTPLANNER_WEATHER_GRID_DEGREES = 0.1
+EVENTPLANNER_WEATHER_UPDATE_INTERVAL = 3600.0
@@ -2,6 +2,7 @@
 Main module for handling event management interactions. Provides utilities for
 CRUD operations and some extra  interactions.
 """
+from typing import List
 from uuid import uuid4
 from http import HTTPStatus
 from fastapi import APIRouter, Depends, HTTPException
@@ -10,10 +11,22 @@ from eventplanner.common.eventplanner_common import EventplannerBackendTags as T
 from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
     User,
     UserBase,
+    Membership,
+    MembershipRole,
 )
 from eventplanner.eventplanner_backend.eventplanner_database import (
     users_table,
     user_query,
+    memberships_table,
+    memberships_query,
+    notifications_table,
+    notifications_query,
+    invitation_table,
+    invitations_query,
+    UniqueConstraintError,
+    set_with,
+    set_without,
+    transaction,
 )
 from eventplanner.eventplanner_backend.authentication import (
     eventplanner_authentication_helper as auth_helper,
@@ -25,22 +38,25 @@ account_management_router = APIRouter()
 # Helper functions
 def generate_unique_user_id():
     uid = str(uuid4())
-    while users_table.search(user_query.id == uid):
+    while users_table.get_by("id", uid):
         uid = str(uuid4())
     return uid
 
 
+def duplicate_field_exception(field: str) -> HTTPException:
+    return HTTPException(
+        status_code=HTTPStatus.BAD_REQUEST,
+        detail=f"{field.capitalize()} already registered",
+    )
+
+
 def check_user_existence(username: str, email: str, exclude_id: str = None):
-    existing_user = users_table.search(user_query.username == username)
-    existing_mail = users_table.search(user_query.email == email)
-    if existing_user and (not exclude_id or existing_user[0]["id"] != exclude_id):
-        raise HTTPException(
-            status_code=HTTPStatus.BAD_REQUEST, detail="Username already registered"
-        )
-    if existing_mail and (not exclude_id or existing_mail[0]["id"] != exclude_id):
-        raise HTTPException(
-            status_code=HTTPStatus.BAD_REQUEST, detail="Email already registered"
-        )
+    # Cheap index lookups so duplicates are rejected before hashing the password;
+    # the unique indexes still enforce the constraint on the actual write.
+    for field, value in (("username", username), ("email", email)):
+        existing_user = users_table.get_by(field, value)
+        if existing_user and existing_user["id"] != exclude_id:
+            raise duplicate_field_exception(field)
 
 
 def manage_friendship(current_user: User, friend_id: str, add: bool):
@@ -48,28 +64,24 @@ def manage_friendship(current_user: User, friend_id: str, add: bool):
     if not friend:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Friend not found")
 
-    current_user_friends = current_user.friends or set()
-    friend_friends = friend.friends or set()
+    change_set = set_with if add else set_without
 
-    if add:
-        if friend_id in current_user_friends:
+    def update_friends(user: dict):
+        if add and friend_id in (user.get("friends") or set()):
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST, detail="Already friends"
             )
-        current_user_friends.add(friend_id)
-        friend_friends.add(current_user.id)
-    else:
-        if friend_id not in current_user_friends:
+        if not add and friend_id not in (user.get("friends") or set()):
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST, detail="Not friends"
             )
-        current_user_friends.remove(friend_id)
-        friend_friends.remove(current_user.id)
+        return change_set(user, "friends", friend_id)
 
-    users_table.update(
-        {"friends": current_user_friends}, user_query.id == current_user.id
-    )
-    users_table.update({"friends": friend_friends}, user_query.id == friend_id)
+    with transaction(users_table):
+        shared_functions.update_user_by_id(current_user.id, update_friends)
+        shared_functions.update_user_by_id(
+            friend_id, lambda user: change_set(user, "friends", current_user.id)
+        )
 
     return {"message": "Friendship updated successfully"}
 
@@ -96,9 +108,50 @@ def me_user(current_user: User = Depends(auth_helper.get_current_user)):
     }
     ```
     """
-    return current_user.model_dump(
-        include={"username", "email", "events_created", "events_participation"}
-    )
+    events_participation = [
+        membership.event_id
+        for membership in shared_functions.get_user_memberships(
+            current_user.id, MembershipRole.PARTICIPANT
+        )
+    ]
+    user_info = current_user.model_dump(include={"username", "email", "events_created"})
+    user_info["events_participation"] = events_participation or None
+    return user_info
+
+
+@account_management_router.get(
+    "/users/me/events", tags=[Tags.ACCOUNT], response_model=List[Membership]
+)
+def my_events_user(
+    role: MembershipRole = None,
+    current_user: User = Depends(auth_helper.get_current_user),
+):
+    """
+    Endpoint utility for listing the events the current user is a member of.
+
+    ```
+    Args:
+        role: Only return the events where the user has this role (admin or
+            participant)
+
+    Returns:
+        List of memberships (user_id, event_id, role)
+    Raises:
+        [401]UNAUTHORIZED: Invalid credentials
+    ```
+    Example of valid response:
+    ```
+    [
+        {
+            "id": "9a1d8924-cc97-43eb-8432-6ed9f0da9a62:d7b01a4d-6f76-4c25-9508-8bd08d869bab:admin",
+            "user_id": "d7b01a4d-6f76-4c25-9508-8bd08d869bab",
+            "event_id": "9a1d8924-cc97-43eb-8432-6ed9f0da9a62",
+            "role": "admin"
+        }
+    ]
+    ```
+    """
+    return shared_functions.get_user_memberships(current_user.id, role)
 
 
 @account_management_router.post("/users/register", tags=[Tags.ACCOUNT])
@@ -140,7 +193,10 @@ def register_user(input_user: UserBase):
     input_user.password = auth_helper.get_password_hash(input_user.password)
 
     new_user = User(**input_user.model_dump(), id=uid, token_version=0)
-    users_table.insert(new_user.model_dump())
+    try:
+        users_table.insert(new_user.model_dump())
+    except UniqueConstraintError as error:
+        raise duplicate_field_exception(error.field) from error
 
     return {"message": "User created successfully", "uid": uid}
 
@@ -189,13 +245,15 @@ def remove_friend_user(
 
 
 @account_management_router.get("/users/{username}", tags=[Tags.ACCOUNT])
-def get_user(username: str):
+def get_user(username: str, fields: str = None):
     """
     Endpoint utility to retrieve a user by its username.
 
     ```
     Args:
         username: Users username
+        fields: Comma separated user fields to return, e.g. "id,username"
+            (optional)
 
     Returns:
         Dictionary with users field
@@ -216,19 +274,24 @@ def get_user(username: str):
       "password": "$2b$12$QMlcRwaxFSCx7Wx/1XBR/ORKgAkeuQQAQL1iQ/2AZ7I6gMVGPUk66",
       "id": "d7b01a4d-6f76-4c25-9508-8bd08d869bab",
       "role": "user",
-      "events_participation": null,
       "events_created": null,
-      "active_invitations": null,
-      "notifications": null,
       "token_version": 0,
       "friends": null
     }
     ```
     """
-    user = shared_functions.get_user_by_name(username)
-    if not user:
+    requested = shared_functions.parse_fields(fields, User)
+    if requested is None:
+        user = shared_functions.get_user_by_name(username)
+        if not user:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND, detail="User not found"
+            )
+        return user
+    user = users_table.get_by("username", username, requested)
+    if user is None:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="User not found")
-    return user
+    return shared_functions.dump_fields(User.model_construct(**user), requested)
 
 
 @account_management_router.post("/users/logout", tags=[Tags.ACCOUNT])
@@ -285,7 +348,10 @@ def update_user(
     update_data = update_info.model_dump(exclude_unset=True)
     update_data["password"] = auth_helper.get_password_hash(update_info.password)
 
-    users_table.update(update_data, user_query.id == current_user.id)
+    try:
+        users_table.update(update_data, user_query.id == current_user.id)
+    except UniqueConstraintError as error:
+        raise duplicate_field_exception(error.field) from error
     return {"message": "User updated successfully"}
 
 
@@ -308,5 +374,13 @@ def delete_user(current_user: User = Depends(auth_helper.get_current_user)):
 
 
     """
-    users_table.remove(user_query.id == current_user.id)
+    with transaction(
+        users_table, memberships_table, notifications_table, invitation_table
+    ):
+        users_table.remove(user_query.id == current_user.id)
+        memberships_table.remove(memberships_query.user_id == current_user.id)
+        notifications_table.remove(notifications_query.user_id == current_user.id)
+        # One indexed removal per side, the invitations sent and received
+        invitation_table.remove(invitations_query.start_user == current_user.id)
+        invitation_table.remove(invitations_query.end_user == current_user.id)
     return {"message": "Account successfully deleted"}
@@ -1,9 +1,13 @@
 import time
+import json
 from datetime import datetime
 from typing import List, Annotated
 from uuid import uuid4
 from http import HTTPStatus
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from geopy.exc import GeopyError
 
 from eventplanner.eventplanner_backend.api_routers import shared_functions
 from eventplanner.common.eventplanner_common import EventplannerBackendTags as Tags
@@ -15,6 +19,12 @@ from eventplanner.eventplanner_backend.eventplanner_database import (
     user_query,
     event_table,
     events_query,
+    invitation_table,
+    invitations_query,
+    memberships_table,
+    memberships_query,
+    add_to_set,
+    transaction,
 )
 from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
     User,
@@ -22,40 +32,140 @@ from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
     Event,
     Invitation,
     InvitationType,
+    Membership,
+    MembershipRole,
 )
 from eventplanner.eventplanner_backend.schemas.eventplanner_model_helpers import (
     EventTags,
+    TagsMatch,
+    DateMatch,
+    EventSort,
 )
 from eventplanner.eventplanner_backend.api_routers import (
     eventplanner_weather_integration as weather_integration,
 )
 
 event_management_router = APIRouter()
+SEARCH_RESULTS_SIZE = 20
+SEARCH_MAX_RESULTS_SIZE = 100
+EVENTS_PAGE_SIZE = 50
+EVENTS_MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 500
+# Read with any field projection: they decide what a user may see of an event
+EVENT_ACCESS_FIELDS = frozenset(
+    {"id", "title", "description", "public", "organizer_id"}
+)
 
 
 # Helper Functions
 def generate_unique_event_id():
-    event_id = uuid4()
-    while event_table.search(events_query.id == event_id):
-        event_id = uuid4()
-    return str(event_id)
+    event_id = str(uuid4())
+    while event_table.get_by("id", event_id):
+        event_id = str(uuid4())
+    return event_id
+
+
+def locate(location: str) -> dict:
+    """
+    Coordinates of ``location`` to store on an event, resolved once when its
+    location is written. They are left unset when the geocoder cannot be
+    reached, the event is then geocoded when it is viewed.
+    """
+    latitude, longitude = None, None
+    if location:
+        try:
+            latitude, longitude = shared_functions.get_location_coordinates(location)
+        except GeopyError:
+            pass
+    return {"latitude": latitude, "longitude": longitude}
 
 
 def update_user_events_created(user: User, event_id: str):
-    updated_events_created = (user.events_created or set()) | {event_id}
-    users_table.update(
-        {"events_created": updated_events_created}, user_query.id == user.id
+    users_table.update(add_to_set("events_created", event_id), user_query.id == user.id)
+
+
+def is_event_admin(event: Event, user: User) -> bool:
+    return user.id == event.organizer_id or shared_functions.has_membership(
+        event.id, user.id, MembershipRole.ADMIN
+    )
+
+
+def can_view_event(event: Event, user: User) -> bool:
+    return (
+        event.public
+        or is_event_admin(event, user)
+        or shared_functions.has_membership(
+            event.id, user.id, MembershipRole.PARTICIPANT
+        )
     )
 
 
 def validate_event_ownership_or_admin(event: Event, user: User):
-    if user.id not in event.admins and user.id != event.organizer_id:
+    if not is_event_admin(event, user):
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="You do not have permission to perform this action",
         )
 
 
+def encode_events_cursor(event, sort: EventSort, descending: bool) -> str:
+    # The sort order, then the position of the event in the sort index
+    return shared_functions.encode_cursor(
+        sort.value, descending, event[sort.value], event.doc_id
+    )
+
+
+def decode_events_cursor(cursor: str, sort: EventSort, descending: bool) -> list:
+    cursor_sort, cursor_descending, value, doc_id = shared_functions.decode_cursor(
+        cursor, 4
+    )
+    if cursor_sort != sort.value or cursor_descending != descending:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="The cursor belongs to a different sort order",
+        )
+    return [value, doc_id]
+
+
+def stream_events(query, sort: EventSort, descending: bool, after=None, fields=None):
+    """
+    Yield the events matching ``query`` as NDJSON lines, reading them from
+    the sort index in batches so only one batch is held in memory and the
+    table is not locked while the response is sent.
+    """
+    stored_fields = None if fields is None else fields | {sort.value}
+    while True:
+        events = event_table.search_sorted(
+            query,
+            sort.value,
+            STREAM_BATCH_SIZE,
+            after=after,
+            descending=descending,
+            fields=stored_fields,
+        )
+        for event in events:
+            if fields is None:
+                yield Event(**event).model_dump_json() + "\n"
+            else:
+                event_fields = Event.model_construct(**event)
+                yield json.dumps(shared_functions.dump_fields(event_fields, fields))
+                yield "\n"
+        if len(events) < STREAM_BATCH_SIZE:
+            return
+        after = [events[-1][sort.value], events[-1].doc_id]
+
+
+def validate_event_members_access(event_id: str, user: User):
+    event = shared_functions.get_event_by_id(event_id)
+    if not can_view_event(event, user):
+        raise HTTPException(
+            status_code=HTTPStatus.FORBIDDEN,
+            detail="You do not have access to the participants of this private event",
+        )
+
+
 # Event Management Endpoints
 @event_management_router.post("/events/register", tags=[Tags.EVENT])
 def register_event(
@@ -120,20 +230,97 @@ def register_event(
         end_time=end_time,
         location=location,
         organizer_id=current_user.id,
-        admins={current_user.id},
         organizer_name=current_user.username,
         public=public,
+        created_at=time.time(),
+        **locate(location),
     )
 
-    event_table.insert(event_to_store.model_dump())
-    update_user_events_created(current_user, id_event)
+    with transaction(event_table, users_table, memberships_table):
+        event_table.insert(event_to_store.model_dump())
+        update_user_events_created(current_user, id_event)
+        shared_functions.add_membership(
+            id_event, current_user.id, MembershipRole.ADMIN
+        )
 
     return {"message": "Event created successfully", "id_event": id_event}
 
 
+@event_management_router.get(
+    "/events/search", tags=[Tags.EVENT], response_model=List[Event]
+)
+def search_events(
+    q: str,
+    limit: int = Query(SEARCH_RESULTS_SIZE, ge=1, le=SEARCH_MAX_RESULTS_SIZE),
+):
+    """
+    Endpoint utility for searching events by words of their title,
+    description and location.
+
+    ```
+    Args:
+        q: The words to search for; the last letters of a word may be left
+            out ("conc" finds "concert")
+        limit: Maximum number of events returned (1 to 100)
+
+    Returns:
+        The best matching events, best first
+
+    Raises:
+        [422]UNPROCESSABLE_ENTITY: Missing query or invalid limit
+    ```
+
+    Example of valid request:
+    ```
+    /events/search?q=jazz conc&limit=5
+    ```
+    """
+    return [document for document, _ in event_table.search_text(q, limit)]
+
+
+@event_management_router.get(
+    "/events/nearby", tags=[Tags.EVENT], response_model=List[Event]
+)
+def get_nearby_events(
+    lat: float = Query(ge=-90, le=90),
+    lon: float = Query(ge=-180, le=180),
+    radius_km: float = Query(gt=0),
+    limit: int = Query(SEARCH_RESULTS_SIZE, ge=1, le=SEARCH_MAX_RESULTS_SIZE),
+):
+    """
+    Endpoint utility for finding the events close to a point, from the
+    coordinates geocoded when the events were stored.
+
+    ```
+    Args:
+        lat: Latitude of the point in degrees
+        lon: Longitude of the point in degrees
+        radius_km: Maximum distance of the events from the point
+        limit: Maximum number of events returned (1 to 100)
+
+    Returns:
+        The events within radius_km of the point, nearest first
+
+    Raises:
+        [422]UNPROCESSABLE_ENTITY: Missing or invalid coordinates or radius
+    ```
+
+    Example of valid request:
+    ```
+    /events/nearby?lat=44.4268&lon=26.1025&radius_km=5
+    ```
+    """
+    return [
+        document
+        for document, _ in event_table.search_nearby(lat, lon, radius_km, limit)
+    ]
+
+
 @event_management_router.get("/events/{event_id}", tags=[Tags.EVENT])
-def get_single_event(
-    event_id: str, current_user: User = Depends(auth_helper.get_current_user)
+async def get_single_event(
+    event_id: str,
+    current_user: User = Depends(auth_helper.get_current_user),
+    fields: str = None,
 ):
     """
     Endpoint utility for retrieving a single event by its ID.
@@ -141,6 +328,8 @@ def get_single_event(
     Args:
         event_id: The unique identifier of the event
         current_user: Current logged-in user (retrieved via authentication)
+        fields: Comma separated event fields to return, e.g. "id,title";
+            the weather is only fetched when it is one of them (optional)
 
     Returns:
         Event object with details if the user is authorized to view it
@@ -171,11 +360,7 @@ def get_single_event(
   "id": "9a1d8924-cc97-43eb-8432-6ed9f0da9a62",
   "organizer_name": "example",
   "organizer_id": "d7b01a4d-6f76-4c25-9508-8bd08d869bab",
-  "admins": [
-    "d7b01a4d-6f76-4c25-9508-8bd08d869bab"
-  ],
-  "participants": null,
-  "requests_to_join": null,
+  "created_at": 1706194243.8539546,
   "weather": [
     {
       "date": "2024-01-25T00:00:00",
@@ -251,53 +436,120 @@ def get_single_event(
 }
     ```
     """
-    event = shared_functions.get_event_by_id(event_id=event_id)
+    requested = shared_functions.parse_fields(fields, Event)
+    # The database and the geocoder block, the forecast is awaited
+    event, coordinates = await run_in_threadpool(
+        load_viewable_event, event_id, current_user, requested
+    )
+    if coordinates is not None:
+        event.weather = await weather_integration.fetch_and_create_weather_data(
+            *coordinates
+        )
 
-    if not event.public and not current_user.id in (event.participants or set()) | (
-        event.admins or set()
-    ):
-        return Event(
+    if requested is None:
+        return event
+    return shared_functions.dump_fields(event, requested)
+
+
+def load_viewable_event(
+    event_id: str, current_user: User, requested: frozenset | None
+) -> tuple:
+    """
+    The event with ``event_id`` as ``current_user`` may see it, and the
+    coordinates of its location when its weather is to be shown.
+    """
+    stored_fields = None
+    if requested is not None:
+        stored_fields = requested | EVENT_ACCESS_FIELDS
+        if "weather" in requested:
+            stored_fields |= {"location", "latitude", "longitude"}
+    event = shared_functions.get_event_by_id(event_id=event_id, fields=stored_fields)
+
+    if not can_view_event(event, current_user):
+        event = Event(
             title=event.title,
             id=event.id,
             description=event.description,
             public=event.public,
         )
-
-    latitude, longitude = shared_functions.get_location_coordinates(event.location)
-    if latitude is not None and longitude is not None:
-        weather = weather_integration.fetch_and_create_weather_data(latitude, longitude)
-
-        event.weather = weather
-
-        return event
-    raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Location not found")
+        return event, None
+    if requested is None or "weather" in requested:
+        latitude, longitude = event.latitude, event.longitude
+        if latitude is None or longitude is None:
+            # Stored before geocoding at write time or while the geocoder
+            # was down: resolve the location now and keep the coordinates
+            # unless it has been changed in the meantime
+            latitude, longitude = shared_functions.get_location_coordinates(
+                event.location
+            )
+            if latitude is not None and longitude is not None:
+                event_table.update(
+                    {"latitude": latitude, "longitude": longitude},
+                    (events_query.id == event.id)
+                    & (events_query.location == event.location),
+                )
+        if latitude is None or longitude is None:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND, detail="Location not found"
+            )
+        return event, (latitude, longitude)
+    return event, None
 
 
 @event_management_router.get("/events", tags=[Tags.EVENT], response_model=List[Event])
 def get_events(
+    response: Response,
     title: str = None,
     location: str = None,
     tags: List[EventTags] = Query([]),
+    tags_match: TagsMatch = TagsMatch.ANY,
     organizer_name: str = None,
     start_date: float = None,
     end_date: float = None,
+    date_match: DateMatch = DateMatch.WITHIN,
     public: bool = None,
+    sort: EventSort = EventSort.CREATED_AT,
+    descending: bool = False,
+    limit: int = Query(EVENTS_PAGE_SIZE, ge=1, le=EVENTS_MAX_PAGE_SIZE),
+    cursor: str = None,
+    stream: bool = False,
+    accept: str = Header(None),
+    fields: str = None,
+    explain: bool = False,
 ):
     """
-    Endpoint utility for retrieving a list of events based on filters.
+    Endpoint utility for retrieving a page of events based on filters.
 
     ```
     Args:
         title: Filter for events by title (optional)
         location: Filter for events by location (optional)
         tags: Filter for events by tags (optional)
+        tags_match: Whether events need "any" (default) or "all" of the tags
         organizer_name: Filter for events by organizer's name (optional)
         start_date: Filter for events starting after this date (optional)
         end_date: Filter for events ending before this date (optional)
+        date_match: "within" (default) keeps the events that start after
+            start_date and end before end_date, "overlaps" the events taking
+            place at any time between start_date and end_date
         public: Filter for events by their public/private status (optional)
+        sort: Order the events by "created_at" (default) or "start_time";
+            events without a start time are left out of the latter
+        descending: Sort the newest/latest events first
+        limit: Maximum number of events in the page (1 to 500)
+        cursor: The X-Next-Cursor header of the previous page
+        stream: Send every matching event (after the cursor, ignoring the
+            limit) as newline-delimited JSON, also chosen by an
+            "Accept: application/x-ndjson" header
+        fields: Comma separated event fields to return, e.g.
+            "id,title,start_time,location" (optional)
+        explain: Return the query plan of the filters instead of the events
 
     Returns:
-        A list of Event objects that match the given filters
+        A list of Event objects that match the given filters. If there are
+        more, the X-Next-Cursor response header holds the cursor of the
+        next page. In streaming mode one Event object per line instead.
+        With explain, {"plan": [...]} listing the steps of the query.
 
     Raises:
         [401]UNAUTHORIZED: Invalid credentials or not logged in
@@ -321,11 +573,7 @@ def get_events(
         "id": "9a1d8924-cc97-43eb-8432-6ed9f0da9a62",
         "organizer_name": "example",
         "organizer_id": "d7b01a4d-6f76-4c25-9508-8bd08d869bab",
-        "admins": [
-          "d7b01a4d-6f76-4c25-9508-8bd08d869bab"
-        ],
-        "participants": null,
-        "requests_to_join": null,
+        "created_at": 1706194243.8539546,
         "weather": null
       }
     ]
@@ -340,26 +588,71 @@ def get_events(
         conditions.append(events_query.location == location)
     if organizer_name:
         conditions.append(events_query.organizer_name == organizer_name)
-    if start_date:
-        conditions.append(events_query.start_date >= start_date)
     if tags:
-        conditions.append(events_query.tags.any(tag.value for tag in tags))
-    if end_date:
-        conditions.append(events_query.end_date <= end_date)
+        # Answered from the posting sets of the tags index
+        tag_values = [tag.value for tag in tags]
+        if tags_match == TagsMatch.ALL:
+            conditions.append(events_query.tags.all(tag_values))
+        else:
+            conditions.append(events_query.tags.any(tag_values))
+    # Answered with a binary search on the start and end time indexes
+    if date_match == DateMatch.OVERLAPS:
+        if start_date is not None:
+            conditions.append(events_query.end_time >= start_date)
+        if end_date is not None:
+            conditions.append(events_query.start_time <= end_date)
+    else:
+        if start_date is not None:
+            conditions.append(events_query.start_time >= start_date)
+        if end_date is not None:
+            conditions.append(events_query.end_time <= end_date)
     if public is not None:
         conditions.append(events_query.public == public)
 
+    query = None
     if conditions:
-        # Combine all conditions using logical AND
+        # Combine all conditions using logical AND. The table's planner
+        # answers the indexed ones from the most selective index on, title
+        # and location are only evaluated on the remaining candidates.
         query = conditions[0]
         for condition in conditions[1:]:
             query &= condition
 
-        events = event_table.search(query)
-    else:
-        events = event_table.all()
-
-    return events
+    if explain:
+        return JSONResponse({"plan": event_table.explain(query, sort.value)})
+    # Keyset pagination on the sort index: a page starts right after the
+    # last event of the previous one, so every page costs the same
+    after = decode_events_cursor(cursor, sort, descending) if cursor else None
+    requested = shared_functions.parse_fields(fields, Event)
+    if stream or NDJSON_MEDIA_TYPE in (accept or ""):
+        return StreamingResponse(
+            stream_events(query, sort, descending, after, requested),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+    # Only the requested fields are read, plus the sort key for the cursor
+    events = event_table.search_sorted(
+        query,
+        sort.value,
+        limit + 1,
+        after=after,
+        descending=descending,
+        fields=None if requested is None else requested | {sort.value},
+    )
+    headers = {}
+    if len(events) > limit:
+        events = events[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_events_cursor(events[-1], sort, descending)
+    if requested is None:
+        response.headers.update(headers)
+        return events
+    # Bypasses the validation against the whole Event model
+    return JSONResponse(
+        [
+            shared_functions.dump_fields(Event.model_construct(**event), requested)
+            for event in events
+        ],
+        headers=headers,
+    )
 
 
 @event_management_router.post("/events/{event_id}/status", tags=[Tags.EVENT])
@@ -438,21 +731,11 @@ def join_event(
     """
     event = shared_functions.get_event_by_id(event_id)
     if event.public:
-        updated_participants = (event.participants or set()) | {current_user.id}
-        event_table.update(
-            {"participants": updated_participants}, events_query.id == event_id
+        shared_functions.add_membership(
+            event_id, current_user.id, MembershipRole.PARTICIPANT
         )
         return {"message": "Successfully joined the event"}
     else:
-        # Check if the user has already requested to join
-        existing_request = any(
-            inv
-            for inv in (event.requests_to_join or set())
-            if inv.end_user == current_user.id
-        )
-        if existing_request:
-            return {"message": "You have already requested to join this event"}
-
         inv_id = shared_functions.generate_invitation_id_fields(
             event_id, current_user.id
         )
@@ -466,10 +749,18 @@ def join_event(
             time=str(datetime.now()),
         )
 
-        updated_requests = (event.requests_to_join or set()) | {new_request}
-        event_table.update(
-            {"requests_to_join": updated_requests}, events_query.id == event_id
-        )
+        with invitation_table.write_lock():
+            # Check if the user has already requested to join
+            existing_request = any(
+                inv["type"] == InvitationType.REQUEST.value
+                and inv["start_user"] == current_user.id
+                for inv in invitation_table.search(
+                    invitations_query.event_id == event_id
+                )
+            )
+            if existing_request:
+                return {"message": "You have already requested to join this event"}
+            shared_functions.store_invitation(new_request)
         return {
             "message": "Request to join the event sent successfully",
             "id_invitation": inv_id,
@@ -494,24 +785,17 @@ def leave_event(
         [401]UNAUTHORIZED: Invalid credentials or not logged in
         [400]BAD_REQUEST: User is not a participant or admin of this event
     """
-    event = shared_functions.get_event_by_id(event_id)
-
-    if current_user.id in event.participants:
-        updated_participants = event.participants - {current_user.id}
-        event_table.update(
-            {"participants": updated_participants}, events_query.id == event_id
+    shared_functions.get_event_by_id(event_id)
+    if not shared_functions.remove_membership(
+        event_id, current_user.id, MembershipRole.PARTICIPANT
+    ) and not shared_functions.remove_membership(
+        event_id, current_user.id, MembershipRole.ADMIN
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="You are not a participant or admin of this event",
         )
-        return {"message": "You successfully left the event"}
-
-    if current_user.id in event.admins:
-        updated_admins = event.admins - {current_user.id}
-        event_table.update({"admins": updated_admins}, events_query.id == event_id)
-        return {"message": "You successfully left the event"}
-
-    raise HTTPException(
-        status_code=HTTPStatus.BAD_REQUEST,
-        detail="You are not a participant or admin of this event",
-    )
+    return {"message": "You successfully left the event"}
 
 
 @event_management_router.put("/events/{event_id}/admin", tags=[Tags.EVENT])
@@ -544,8 +828,7 @@ def add_admin_event(
     validate_event_ownership_or_admin(current_event, current_user)
 
     user_to_add = shared_functions.get_user_by_name(username)
-    updated_admins = current_event.admins | {user_to_add.id}
-    event_table.update({"admins": updated_admins}, events_query.id == event_id)
+    shared_functions.add_membership(event_id, user_to_add.id, MembershipRole.ADMIN)
 
     return {"message": "Admin added successfully to event"}
 
@@ -610,15 +893,43 @@ def get_participants_event(
         [401]UNAUTHORIZED: Invalid credentials or not logged in
         [403]FORBIDDEN: User not authorized to view participants of a private event
     """
-    event = shared_functions.get_event_by_id(event_id)
-    if not event.public and current_user.id not in (event.participants or set()) | {
-        event.organizer_id
-    } | (event.admins or set()):
-        raise HTTPException(
-            status_code=HTTPStatus.FORBIDDEN,
-            detail="You do not have access to the participants of this private event",
+    validate_event_members_access(event_id, current_user)
+    return [
+        membership.user_id
+        for membership in shared_functions.get_event_memberships(
+            event_id, MembershipRole.PARTICIPANT
         )
-    return list(event.participants or [])
+    ]
+
+
+@event_management_router.get(
+    "/events/{event_id}/members",
+    tags=[Tags.EVENT],
+    response_model=List[Membership],
+)
+def get_members_event(
+    event_id: str,
+    role: MembershipRole = None,
+    current_user: User = Depends(auth_helper.get_current_user),
+):
+    """
+    Endpoint utility for retrieving the members of an event with their role.
+
+    Args:
+        event_id: The unique identifier of the event
+        role: Only return the members with this role (admin or participant)
+        current_user: Current logged in user (retrieved via authentication)
+
+    Returns:
+        A list of memberships (user_id, event_id, role)
+
+    Raises:
+        [401]UNAUTHORIZED: Invalid credentials or not logged in
+        [403]FORBIDDEN: User not authorized to view members of a private event
+        [404]NOT_FOUND: Event not found
+    """
+    validate_event_members_access(event_id, current_user)
+    return shared_functions.get_event_memberships(event_id, role)
 
 
 @event_management_router.put("/events/{event_id}", tags=[Tags.EVENT])
@@ -645,9 +956,10 @@ def update_event(
     event = shared_functions.get_event_by_id(event_id)
     validate_event_ownership_or_admin(event, current_user)
 
-    event_table.update(
-        updated_event.model_dump(exclude_unset=True), events_query.id == event_id
-    )
+    changes = updated_event.model_dump(exclude_unset=True)
+    if "location" in changes and changes["location"] != event.location:
+        changes.update(locate(changes["location"]))
+    event_table.update(changes, events_query.id == event_id)
     return {"message": "Event updated successfully!"}
 
 
@@ -679,8 +991,7 @@ def remove_admin_status_event(
             detail="You do not have rights to remove an admin from this event",
         )
 
-    updated_admins = event.admins - {admin_id}
-    event_table.update({"admins": updated_admins}, events_query.id == event_id)
+    shared_functions.remove_membership(event_id, admin_id, MembershipRole.ADMIN)
     return {"message": "Admin removed successfully!"}
 
 
@@ -709,7 +1020,10 @@ def delete_event(
             detail="You do not have rights to delete this event",
         )
 
-    event_table.remove(events_query.id == event_id)
+    with transaction(event_table, memberships_table, invitation_table):
+        event_table.remove(events_query.id == event_id)
+        memberships_table.remove(memberships_query.event_id == event_id)
+        invitation_table.remove(invitations_query.event_id == event_id)
     return {"message": "Event deleted successfully!"}
 
 
@@ -738,18 +1052,21 @@ def approve_join_request(
     event = shared_functions.get_event_by_id(event_id)
     validate_event_ownership_or_admin(event, current_user)
 
-    invitation = [req for req in event.requests_to_join if req.id == invitation_id]
-
-    if not invitation or invitation[0].type != InvitationType.REQUEST:
+    invitation = invitation_table.get_by("id", invitation_id)
+    if (
+        not invitation
+        or invitation["event_id"] != event_id
+        or invitation["type"] != InvitationType.REQUEST.value
+    ):
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail="Invitation not found"
         )
+    invitation = Invitation(**invitation)
 
-    invitation = invitation[0]
-
-    updated_participants = (event.participants or set()) | {invitation.end_user}
-    event_table.update(
-        {"participants": updated_participants}, events_query.id == event_id
-    )
+    with transaction(memberships_table, invitation_table):
+        shared_functions.add_membership(
+            event_id, invitation.start_user, MembershipRole.PARTICIPANT
+        )
+        invitation_table.remove(invitations_query.id == invitation.id)
 
     return {"message": "Join request approved"}
@@ -0,0 +1,138 @@
+"""
+Geocoding of event locations through one shared Nominatim client and a
+two-tier cache.
+
+Answers are keyed on the normalized location string (case, Unicode form and
+whitespace do not matter) and kept in an in-process LRU and in the
+``geocodes`` table, which every worker shares and which survives restarts.
+Locations the geocoder does not know are cached as ``(None, None)`` with a
+shorter TTL, so a typo is not looked up on every view but a newly mapped
+place is found eventually. Geocoder errors are not cached. Concurrent misses
+for a location share one geocoder call.
+"""
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from geopy import Nominatim
+
+from eventplanner.common import eventplanner_common as common
+from eventplanner.eventplanner_backend.api_routers.eventplanner_single_flight import (
+    SingleFlight,
+)
+from eventplanner.eventplanner_backend.eventplanner_database import (
+    geocodes_table,
+    geocodes_query,
+)
+
+Coordinates = Tuple[Optional[float], Optional[float]]
+
+geolocator = Nominatim(
+    user_agent=common.EVENTPLANNER_GEOCODER_USER_AGENT,
+    domain=common.EVENTPLANNER_GEOCODER_DOMAIN,
+    scheme=common.EVENTPLANNER_GEOCODER_SCHEME,
+)
+
+
+def normalize_location(location: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", location).casefold().split())
+
+
+def geocode(location: str) -> Coordinates:
+    location_data = geolocator.geocode(location)
+    return (
+        (location_data.latitude, location_data.longitude)
+        if location_data
+        else (None, None)
+    )
+
+
+class GeocodingCache:
+    """
+    Caches the answers of ``geocode`` in an LRU of ``size`` locations in
+    front of ``table``. Found coordinates expire after ``ttl`` seconds,
+    unknown locations after ``negative_ttl``.
+    """
+
+    def __init__(
+        self,
+        geocode: Callable[[str], Coordinates],
+        table,
+        size: int,
+        ttl: float,
+        negative_ttl: float,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._geocode = geocode
+        self._table = table
+        self._size = size
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def _remember(self, key: str, latitude, longitude, expires_at: float):
+        with self._lock:
+            self._entries[key] = (latitude, longitude, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+    def _cached(self, key: str, now: float) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > now:
+                self._entries.move_to_end(key)
+                return entry
+        stored = self._table.get_by("location", key)
+        if stored is None or stored["expires_at"] <= now:
+            return None
+        entry = (stored["latitude"], stored["longitude"], stored["expires_at"])
+        self._remember(key, *entry)
+        return entry
+
+    def coordinates(self, location: str) -> Coordinates:
+        key = normalize_location(location)
+        entry = self._cached(key, self._clock())
+        if entry is not None:
+            return entry[0], entry[1]
+        return self._flights.do(key, lambda: self._refresh(key, location))
+
+    def _refresh(self, key: str, location: str) -> Coordinates:
+        now = self._clock()
+        # A flight for the key may have just landed
+        entry = self._cached(key, now)
+        if entry is not None:
+            return entry[0], entry[1]
+
+        latitude, longitude = self._geocode(location)
+        ttl = self._negative_ttl if latitude is None else self._ttl
+        self._table.upsert(
+            {
+                "location": key,
+                "latitude": latitude,
+                "longitude": longitude,
+                "expires_at": now + ttl,
+            },
+            geocodes_query.location == key,
+        )
+        self._remember(key, latitude, longitude, now + ttl)
+        return latitude, longitude
+
+    def clear(self):
+        """Forget the in-process entries, the table is left as it is."""
+        with self._lock:
+            self._entries.clear()
+
+
+geocoding_cache = GeocodingCache(
+    geocode,
+    geocodes_table,
+    size=common.EVENTPLANNER_GEOCODING_CACHE_SIZE,
+    ttl=common.EVENTPLANNER_GEOCODING_TTL,
+    negative_ttl=common.EVENTPLANNER_GEOCODING_NEGATIVE_TTL,
+)
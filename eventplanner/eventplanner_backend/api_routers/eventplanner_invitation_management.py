@@ -10,39 +10,37 @@ from eventplanner.eventplanner_backend.authentication import (
 )
 from eventplanner.eventplanner_backend.eventplanner_database import (
     users_table,
-    user_query,
     event_table,
-    events_query,
+    invitation_table,
+    memberships_table,
+    invitations_query,
+    set_with,
+    transaction,
 )
 from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
     User,
     InvitationBase,
     Invitation,
     InvitationType,
+    MembershipRole,
 )
 
 invitation_management_router = APIRouter()
 # Helper functions
 def validate_event_organizer_or_admin(event_id: str, user_id: str):
     event = shared_functions.get_event_by_id(event_id)
-    if user_id not in event.admins and user_id != event.organizer_id:
+    if user_id != event.organizer_id and not shared_functions.has_membership(
+        event_id, user_id, MembershipRole.ADMIN
+    ):
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="You do not have permission to give invites!",
         )
 
 
-def find_invitation(invitations, invite_id: str):
-    for invite in invitations or []:
-        if invite.id == invite_id:
-            return invite
-    return None
-
-
-def update_invitations(user_id: str, updated_invitations):
-    users_table.update(
-        {"active_invitations": updated_invitations}, user_query.id == user_id
-    )
+def find_invitation(invite_id: str) -> Invitation | None:
+    invitation = invitation_table.get_by("id", invite_id)
+    return Invitation(**invitation) if invitation else None
 
 
 def create_updated_invite(
@@ -58,28 +56,20 @@ def handle_event_invitation(
     invite: InvitationBase, current_user: User, updated_invite: Invitation
 ):
     validate_event_organizer_or_admin(invite.event_id, current_user.id)
-    invited_user = shared_functions.get_user_by_id(invite.end_user)
-    update_invitations(
-        invited_user.id, (invited_user.active_invitations or set()) | {updated_invite}
-    )
+    shared_functions.get_user_by_id(invite.end_user)
+    shared_functions.store_invitation(updated_invite)
 
 
 def handle_request_invitation(invite: InvitationBase, updated_invite: Invitation):
-    event = shared_functions.get_event_by_id(invite.event_id)
-    event_table.update(
-        {"requests_to_join": (event.requests_to_join or set()) | {updated_invite}},
-        events_query.id == invite.event_id,
-    )
+    shared_functions.get_event_by_id(invite.event_id)
+    shared_functions.store_invitation(updated_invite)
 
 
 def handle_friend_invitation(
     invite: InvitationBase, current_user: User, updated_invite: Invitation
 ):
-    friend = shared_functions.get_user_by_id(invite.end_user)
-    users_table.update(
-        {"active_invitations": (friend.active_invitations or set()) | {updated_invite}},
-        user_query.id == friend.id,
-    )
+    shared_functions.get_user_by_id(invite.end_user)
+    shared_functions.store_invitation(updated_invite)
 
 
 # Invitation Endpoints
@@ -155,7 +145,7 @@ def respond_to_invitation(
     IMPORTANT:
         ```
         There are 3 types of notification:
-            - event: If you respond to invitation of type event you look into current_user.invitations
+            - event: Answered by the invited user (end_user)
             - friend: When start_user (current_user.id) wants to be friend with end_user (user_id), event_id is null
             - request: When start_user (current_user.id) requests to join an event (event_id)
         ```
@@ -176,69 +166,88 @@ def respond_to_invitation(
 
     No request body is required as the response is sent via URL parameters.
     """
-    if event_id:
-        event = shared_functions.get_event_by_id(event_id)
-        invite = find_invitation(event.requests_to_join, invite_id)
-    else:
-        invite = find_invitation(current_user.active_invitations, invite_id)
-    if not invite:
+    invite = find_invitation(invite_id)
+    if not invite or (event_id and invite.event_id != event_id):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail="Invitation not found"
+        )
+    # Requests to join are answered by the event's organizer or admins, other
+    # invitations by the user they were sent to
+    if invite.type == InvitationType.REQUEST:
+        validate_event_organizer_or_admin(invite.event_id, current_user.id)
+    elif invite.end_user != current_user.id:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST, detail="Invitation not found"
         )
 
-    if answer:
-        if invite.type == InvitationType.FRIEND:
-            handle_friend_acceptance(invite, current_user)
-        elif invite.type == InvitationType.REQUEST:
-            handle_event_request_acceptance(invite, current_user)
-        elif invite.type == InvitationType.EVENT:
-            handle_event_invitation_acceptance(invite, current_user)
-
-    # Remove invitation regardless of the answer
-    update_invitations(current_user.id, current_user.active_invitations - {invite})
+    # Accepting touches the memberships or both users, apply it all or
+    # nothing. The event is read inside, so its lock is taken in the same
+    # order as every other transaction instead of while holding the others.
+    with transaction(event_table, users_table, memberships_table, invitation_table):
+        if answer:
+            if invite.type == InvitationType.FRIEND:
+                handle_friend_acceptance(invite, current_user)
+            elif invite.type == InvitationType.REQUEST:
+                shared_functions.add_membership(
+                    invite.event_id, invite.start_user, MembershipRole.PARTICIPANT
+                )
+            elif invite.type == InvitationType.EVENT:
+                handle_event_invitation_acceptance(invite, current_user)
+
+        # Remove invitation regardless of the answer
+        invitation_table.remove(invitations_query.id == invite.id)
 
     return {"message": "Invitation response has been successfully processed!"}
 
 
-def handle_friend_acceptance(invite: Invitation, current_user: User):
-    friend = shared_functions.get_user_by_id(invite.end_user)
-    current_user.friends = (current_user.friends or set()) | {friend.id}
-    friend.friends = (friend.friends or set()) | {current_user.id}
-    users_table.update(
-        {"friends": current_user.friends}, user_query.id == current_user.id
-    )
-    users_table.update({"friends": friend.friends}, user_query.id == friend.id)
+@invitation_management_router.get("/invitations", tags=[Tags.INVITATION])
+def get_invitations(
+    event_id: str = None,
+    current_user: User = Depends(auth_helper.get_current_user),
+):
+    """
+    Endpoint for listing pending invitations.
+
+    ```
+    Args:
+        event_id: List the requests to join this event instead of the
+            invitations received by the current user; only for the event's
+            organizer and admins.
+        current_user: The user asking, obtained from the authentication.
 
+    Returns:
+        A list of invitations.
 
-def handle_event_request_acceptance(invite: Invitation, current_user: User):
-    validate_event_organizer_or_admin(invite.event_id, current_user.id)
-    event = shared_functions.get_event_by_id(invite.event_id)
-    event_table.update(
-        {
-            "participants": (event.participants or set()) | {invite.end_user},
-            "requests_to_join": event.requests_to_join ^ {invite},
-        },
-        events_query.id == event.id,
+    Raises:
+        [401]UNAUTHORIZED: If the user is not authenticated.
+        [400]BAD_REQUEST: If the user may not see the event's requests.
+        [404]NOT_FOUND: If the event does not exist.
+    ```
+    """
+    if event_id:
+        validate_event_organizer_or_admin(event_id, current_user.id)
+        invitations = invitation_table.search(invitations_query.event_id == event_id)
+        return [
+            Invitation(**invitation)
+            for invitation in invitations
+            if invitation["type"] == InvitationType.REQUEST.value
+        ]
+    invitations = invitation_table.search(invitations_query.end_user == current_user.id)
+    return [Invitation(**invitation) for invitation in invitations]
+
+
+def handle_friend_acceptance(invite: Invitation, current_user: User):
+    friend = shared_functions.get_user_by_id(invite.start_user)
+    shared_functions.update_user_by_id(
+        current_user.id, lambda user: set_with(user, "friends", friend.id)
     )
-    users_table.update(
-        {
-            "events_participation": (current_user.events_participation or set())
-            | {event.id}
-        },
-        user_query.id == invite.start_user,
+    shared_functions.update_user_by_id(
+        friend.id, lambda user: set_with(user, "friends", current_user.id)
     )
 
 
 def handle_event_invitation_acceptance(invite: Invitation, current_user: User):
-    event = shared_functions.get_event_by_id(invite.event_id)
-    event_table.update(
-        {"participants": (event.participants or set()) | {invite.end_user}},
-        events_query.id == event.id,
-    )
-    users_table.update(
-        {
-            "events_participation": (current_user.events_participation or set())
-            | {event.id}
-        },
-        user_query.id == invite.end_user,
+    shared_functions.get_event_by_id(invite.event_id)
+    shared_functions.add_membership(
+        invite.event_id, current_user.id, MembershipRole.PARTICIPANT
     )
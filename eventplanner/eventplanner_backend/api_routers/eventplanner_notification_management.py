@@ -1,37 +1,56 @@
 import time
-from fastapi import APIRouter
+from http import HTTPStatus
+from fastapi import APIRouter, Depends, HTTPException, Query
 
 from eventplanner.eventplanner_backend.api_routers import shared_functions
 from eventplanner.common.eventplanner_common import EventplannerBackendTags as Tags
+from eventplanner.eventplanner_backend.authentication import (
+    eventplanner_authentication_helper as auth_helper,
+)
 from eventplanner.eventplanner_backend.eventplanner_database import (
-    users_table,
-    user_query,
+    notifications_table,
+    notifications_query,
 )
 from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
+    User,
     Notification,
+    NotificationPage,
     NotificationType,
 )
 
 notification_management_router = APIRouter()
 
+NOTIFICATIONS_PAGE_SIZE = 20
+NOTIFICATIONS_MAX_PAGE_SIZE = 100
+
 
-# Helper function
+# Helper functions
 def create_and_store_notification(
     user_id: str, notification_type: NotificationType, content: str
-):
+) -> Notification:
+    notification_time = time.time()
     notification_id = shared_functions.generate_notification_id(
-        user_id, notification_type.value, time.time()
+        user_id, notification_type.value, notification_time
     )
     new_notification = Notification(
         user_id=user_id,
         notification_type=notification_type,
-        time=time.time(),
+        time=notification_time,
         id=notification_id,
         message=content,
     )
+    shared_functions.store_notification(new_notification)
     return new_notification
 
 
+def user_notifications_query(user_id: str, unread_only: bool = False):
+    # Answered from the user_id and read indexes
+    query = notifications_query.user_id == user_id
+    if unread_only:
+        query &= notifications_query.read == False  # noqa: E712
+    return query
+
+
 @notification_management_router.post(
     "/notifications/{user_id}/notify", tags=[Tags.NOTIFICATION]
 )
@@ -40,8 +59,8 @@ def notify_user(user_id: str, notification_type: NotificationType, content: str)
     Endpoint utility for sending a notification to a specified user.
 
     This function creates a notification based on the provided type and content,
-    associates it with the given user ID, and updates the user's notification list
-    in the database.
+    associates it with the given user ID, and stores it in the notifications
+    table.
 
     ```
     Args:
@@ -65,13 +84,155 @@ def notify_user(user_id: str, notification_type: NotificationType, content: str)
     }
     ```
     """
-    user = shared_functions.get_user_by_id(user_id)
-    notification = create_and_store_notification(user_id, notification_type, content)
+    create_and_store_notification(user_id, notification_type, content)
+
+    return {"message": "User notified successfully!"}
+
+
+@notification_management_router.get(
+    "/notifications", tags=[Tags.NOTIFICATION], response_model=NotificationPage
+)
+def list_notifications(
+    limit: int = Query(NOTIFICATIONS_PAGE_SIZE, ge=1, le=NOTIFICATIONS_MAX_PAGE_SIZE),
+    cursor: str = None,
+    unread_only: bool = False,
+    current_user: User = Depends(auth_helper.get_current_user),
+):
+    """
+    Endpoint utility for listing the notifications of the current user, newest
+    first, one page at a time.
+
+    ```
+    Args:
+        limit: Maximum number of notifications in the page (1 to 100)
+        cursor: The next_cursor of the previous page, omitted for the first page
+        unread_only: Only list notifications that were not marked as read
+        current_user: Current logged-in user (retrieved via authentication)
+
+    Returns:
+        The page of notifications and the cursor of the next page, null on the
+        last page
 
-    updated_notifications = user.notifications or set()
-    updated_notifications.add(notification)
-    users_table.update(
-        {"notifications": updated_notifications}, user_query.id == user.id
+    Raises:
+        [401]UNAUTHORIZED: Invalid credentials or not logged in
+        [400]BAD_REQUEST: Invalid cursor
+    ```
+    Example of valid response body:
+    ```
+    {
+        "notifications": [
+            {
+                "user_id": "11111-1111111-11-11111",
+                "notification_type": "invitation",
+                "message": "Example",
+                "id": "1a2b3c",
+                "time": 1706194243.8539546,
+                "read": false
+            }
+        ],
+        "next_cursor": "WzE3MDYxOTQyNDMuODUzOTU0NiwgN10="
+    }
+    ```
+    """
+    # Keyset pagination on the time index, newest first
+    notifications = notifications_table.search_sorted(
+        user_notifications_query(current_user.id, unread_only),
+        "time",
+        limit + 1,
+        after=shared_functions.decode_cursor(cursor) if cursor else None,
+        descending=True,
     )
+    page = notifications[:limit]
+    next_cursor = None
+    if len(notifications) > limit:
+        # The (time, doc_id) key of the last notification in the time index
+        last = page[-1]
+        next_cursor = shared_functions.encode_cursor(last["time"], last.doc_id)
+    return {"notifications": page, "next_cursor": next_cursor}
 
-    return {"message": "User notified successfully!"}
+
+@notification_management_router.get(
+    "/notifications/unread_count", tags=[Tags.NOTIFICATION]
+)
+def count_unread_notifications(
+    current_user: User = Depends(auth_helper.get_current_user),
+):
+    """
+    Endpoint utility for counting the unread notifications of the current user.
+
+    ```
+    Returns:
+        A dictionary with the number of unread notifications
+
+    Raises:
+        [401]UNAUTHORIZED: Invalid credentials or not logged in
+    ```
+    Example of valid response body:
+    ```
+    {
+        "unread": 3
+    }
+    ```
+    """
+    # Counted from the indexes, without reading the notifications
+    unread = notifications_table.count(user_notifications_query(current_user.id, True))
+    return {"unread": unread}
+
+
+@notification_management_router.post(
+    "/notifications/{notification_id}/read", tags=[Tags.NOTIFICATION]
+)
+def mark_notification_read(
+    notification_id: str, current_user: User = Depends(auth_helper.get_current_user)
+):
+    """
+    Endpoint utility for marking one notification of the current user as read.
+
+    ```
+    Args:
+        notification_id: The unique identifier of the notification
+        current_user: Current logged-in user (retrieved via authentication)
+
+    Returns:
+        A dictionary with a success message
+
+    Raises:
+        [401]UNAUTHORIZED: Invalid credentials or not logged in
+        [404]NOT_FOUND: No notification with this id for the current user
+    ```
+    """
+    notification = notifications_table.get_by("id", notification_id)
+    if notification is None or notification["user_id"] != current_user.id:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail="Notification not found"
+        )
+    notifications_table.update({"read": True}, doc_ids=[notification.doc_id])
+    return {"message": "Notification marked as read"}
+
+
+@notification_management_router.post("/notifications/read", tags=[Tags.NOTIFICATION])
+def mark_all_notifications_read(
+    current_user: User = Depends(auth_helper.get_current_user),
+):
+    """
+    Endpoint utility for marking every notification of the current user as
+    read, with a single write.
+
+    ```
+    Returns:
+        A dictionary with a success message and the number of notifications
+        that were unread
+
+    Raises:
+        [401]UNAUTHORIZED: Invalid credentials or not logged in
+    ```
+    """
+    unread_ids = [
+        n.doc_id
+        for n in notifications_table.search(
+            user_notifications_query(current_user.id, unread_only=True)
+        )
+    ]
+    if unread_ids:
+        notifications_table.update({"read": True}, doc_ids=unread_ids)
+    return {"message": "Notifications marked as read", "marked": len(unread_ids)}
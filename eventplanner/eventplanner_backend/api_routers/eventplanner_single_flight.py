@@ -0,0 +1,82 @@
+"""
+Coalescing of concurrent identical calls to slow upstream services.
+
+When many requests miss a cache for the same key at once, ``SingleFlight``
+lets the first one make the upstream call while the others wait for it and
+share its result, or its exception, instead of making the same call again.
+Blocking calls are coalesced across threads with ``do``, coroutines within
+an event loop with ``do_async``.
+"""
+import asyncio
+import threading
+import weakref
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        # Tasks in flight by key, for every event loop
+        self._tasks: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def do(self, key: Hashable, function: Callable[[], T]) -> T:
+        """
+        The result of ``function()``, called once for all the callers asking
+        for ``key`` while it runs.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key: Hashable, function: Callable[[], Awaitable[T]]) -> T:
+        """
+        The result of ``await function()``, awaited once for all the callers
+        in the event loop asking for ``key`` while it runs. The call runs in
+        its own task, so it is not cancelled with the caller that started it.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            tasks = self._tasks.setdefault(loop, {})
+        task = tasks.get(key)
+        if task is None:
+            task = tasks[key] = loop.create_task(function())
+
+            def land(task: asyncio.Task):
+                if tasks.get(key) is task:
+                    del tasks[key]
+
+            task.add_done_callback(land)
+        return await asyncio.shield(task)
+
+    def __len__(self):
+        """The number of calls in flight."""
+        with self._lock:
+            return len(self._calls) + sum(map(len, self._tasks.values()))
@@ -1,99 +1,223 @@
-from collections import defaultdict
-from datetime import datetime, timedelta
+import asyncio
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Annotated, Awaitable, Callable, Tuple
 
-import requests
-from fastapi import APIRouter
+import httpx
+import pydantic_core
+from fastapi import APIRouter, Query, Response
+
+from eventplanner.common import eventplanner_common as common
+from eventplanner.eventplanner_backend.api_routers.eventplanner_single_flight import (
+    SingleFlight,
+)
 from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
     Weather,
-    HourlyWeatherData,
     TimeInterval,
-    DailyWeatherData,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_weather_columns import (
+    HOURLY_VARIABLES,
+    WeatherColumns,
+    WeatherFormat,
 )
 
 weather_management_router = APIRouter()
 
 
-def create_weather_data(response):
-    hourly_data_list = []
-    for i in range(len(response.Hourly().Variables(0).ValuesAsNumpy())):
-        hourly_data_list.append(
-            HourlyWeatherData(
-                time=datetime.fromtimestamp(
-                    response.Hourly().Time()[i]
-                ),  # Adjust as needed
-                temperature_2m=response.Hourly().Variables(0).ValuesAsNumpy()[i],
-                relative_humidity_2m=response.Hourly().Variables(1).ValuesAsNumpy()[i],
-                dew_point_2m=response.Hourly().Variables(2).ValuesAsNumpy()[i],
-                apparent_temperature=response.Hourly().Variables(3).ValuesAsNumpy()[i],
-                precipitation_probability=response.Hourly()
-                .Variables(4)
-                .ValuesAsNumpy()[i],
-                precipitation=response.Hourly().Variables(5).ValuesAsNumpy()[i],
-                rain=response.Hourly().Variables(6).ValuesAsNumpy()[i],
-                snowfall=response.Hourly().Variables(7).ValuesAsNumpy()[i],
-                snow_depth=response.Hourly().Variables(8).ValuesAsNumpy()[i],
-                wind_speed_80m=response.Hourly().Variables(9).ValuesAsNumpy()[i],
-                temperature_180m=response.Hourly().Variables(10).ValuesAsNumpy()[i],
-                soil_temperature_6cm=response.Hourly().Variables(11).ValuesAsNumpy()[i],
+def create_weather_data(response) -> Weather:
+    """``Weather`` from a response of the ``openmeteo_requests`` client."""
+    return Weather(hourly_data=WeatherColumns.from_sdk_response(response).hourly_data())
+
+
+class WeatherClient:
+    """
+    HTTP client for open-meteo. Requests share a pool of HTTP/1.1 keep-alive
+    connections, one pool per event loop since connections cannot move
+    between loops.
+    """
+
+    def __init__(self, timeout: httpx.Timeout, limits: httpx.Limits):
+        self._timeout = timeout
+        self._limits = limits
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = httpx.AsyncClient(
+                timeout=self._timeout, limits=self._limits
             )
-        )
-    return Weather(hourly_data=hourly_data_list)
+        return client
 
+    async def get(self, url: str, params: dict) -> dict:
+        response = await self.client().get(url, params=params)
+        response.raise_for_status()
+        return response.json()
 
-@weather_management_router.get("/weather/data")
-def fetch_and_create_weather_data(
-    latitude: float, longitude: float, time_interval: TimeInterval = TimeInterval.DAY_7
-):
-    base_url = "https://api.open-meteo.com/v1/forecast"
+    async def aclose(self):
+        """Close the connections of the running event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+weather_client = WeatherClient(
+    timeout=httpx.Timeout(
+        common.EVENTPLANNER_WEATHER_READ_TIMEOUT,
+        connect=common.EVENTPLANNER_WEATHER_CONNECT_TIMEOUT,
+    ),
+    limits=httpx.Limits(
+        max_connections=common.EVENTPLANNER_WEATHER_MAX_CONNECTIONS,
+        max_keepalive_connections=common.EVENTPLANNER_WEATHER_MAX_CONNECTIONS,
+    ),
+)
+
+
+async def fetch_forecast(
+    latitude: float, longitude: float, time_interval: TimeInterval
+) -> WeatherColumns:
+    base_url = common.EVENTPLANNER_WEATHER_URL
     params = {
         "latitude": latitude,
         "longitude": longitude,
-        "hourly": [
-            "temperature_2m",
-            "relative_humidity_2m",
-            "dew_point_2m",
-            "apparent_temperature",
-            "precipitation_probability",
-            "precipitation",
-            "rain",
-            "snowfall",
-            "snow_depth",
-            "wind_speed_80m",
-            "temperature_180m",
-            "soil_temperature_6cm",
-        ],
+        "hourly": list(HOURLY_VARIABLES),
         "forecast_days": int(time_interval.value),
     }
 
-    response = requests.get(base_url, params=params)
-    response.raise_for_status()
-    data = response.json()["hourly"]
-
-    hourly_data_list = []
-    for i in range(len(data["time"])):
-        hourly_weather = HourlyWeatherData(
-            time=datetime.fromisoformat(data["time"][i]),
-            temperature_2m=data["temperature_2m"][i],
-            relative_humidity_2m=data["relative_humidity_2m"][i],
-            dew_point_2m=data["dew_point_2m"][i],
-            apparent_temperature=data["apparent_temperature"][i],
-            precipitation_probability=data["precipitation_probability"][i],
-            precipitation=data["precipitation"][i],
-            rain=data["rain"][i],
-            snowfall=data["snowfall"][i],
-            snow_depth=data["snow_depth"][i],
-            wind_speed_80m=data["wind_speed_80m"][i],
-            temperature_180m=data["temperature_180m"][i],
-            soil_temperature_6cm=data["soil_temperature_6cm"][i],
-        )
-        hourly_data_list.append(hourly_weather)
-
-    daily_list = []
-    for day in range(int(time_interval.value)):
-        daily_weather_data = hourly_data_list[day * 24 : (day + 1) * 24]
-        daily_list.append(
-            DailyWeatherData(
-                date=daily_weather_data[0].time.date(), hourly_data=daily_weather_data
-            )
+    data = (await weather_client.get(base_url, params))["hourly"]
+    return WeatherColumns.from_open_meteo(data)
+
+
+ForecastKey = Tuple[float, float, TimeInterval]
+
+
+def grid_cell(latitude: float, longitude: float, step: float) -> Tuple[float, float]:
+    """The center of the ``step`` degrees wide grid cell holding the point."""
+    # Rounded again so that every point of a cell gives the same float
+    return (
+        round(round(latitude / step) * step, 6),
+        round(round(longitude / step) * step, 6),
+    )
+
+
+class ForecastCache:
+    """
+    Caches the answers of ``fetch`` for up to ``size`` grid cells and time
+    intervals. The forecast model is updated every ``update_interval``
+    seconds, so entries expire at the next multiple of it. Concurrent misses
+    for a key share one call to ``fetch``.
+    The cached forecasts are shared and must not be modified.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[
+            [float, float, TimeInterval], Awaitable[WeatherColumns]
+        ],
+        size: int,
+        grid_degrees: float,
+        update_interval: float,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._fetch = fetch
+        self._size = size
+        self._grid_degrees = grid_degrees
+        self._update_interval = update_interval
+        self._clock = clock
+        self._entries: "OrderedDict[ForecastKey, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    def _expires_at(self, now: float) -> float:
+        return (now // self._update_interval + 1) * self._update_interval
+
+    async def forecast(
+        self, latitude: float, longitude: float, time_interval: TimeInterval
+    ) -> WeatherColumns:
+        latitude, longitude = grid_cell(latitude, longitude, self._grid_degrees)
+        key = (latitude, longitude, time_interval)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        return await self._flights.do_async(key, lambda: self._refresh(key, now))
+
+    async def _refresh(self, key: ForecastKey, now: float) -> WeatherColumns:
+        with self._lock:
+            # A flight for the key may have just landed
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+        forecast = await self._fetch(*key)
+        with self._lock:
+            self._entries[key] = (forecast, self._expires_at(now))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+        return forecast
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+forecast_cache = ForecastCache(
+    fetch_forecast,
+    size=common.EVENTPLANNER_WEATHER_CACHE_SIZE,
+    grid_degrees=common.EVENTPLANNER_WEATHER_GRID_DEGREES,
+    update_interval=common.EVENTPLANNER_WEATHER_UPDATE_INTERVAL,
+)
+
+
+@weather_management_router.get("/weather/data")
+async def fetch_and_create_weather_data(
+    latitude: float,
+    longitude: float,
+    time_interval: TimeInterval = TimeInterval.DAY_7,
+    cache: bool = True,
+    response_format: Annotated[
+        WeatherFormat, Query(alias="format")
+    ] = WeatherFormat.ROWS,
+):
+    """
+    The hourly forecast for the point, grouped by day. Nearby points share
+    the forecast of their grid cell until the next model update, unless
+    ``cache`` is false or the cache is disabled in the configuration.
+    With the ``columns`` format every day holds one list per variable,
+    ``{"time": [...], "temperature_2m": [...], ...}``, instead of one
+    object per hour.
+    """
+    if not (cache and common.EVENTPLANNER_WEATHER_CACHE):
+        forecast = await fetch_forecast(latitude, longitude, time_interval)
+    else:
+        forecast = await forecast_cache.forecast(latitude, longitude, time_interval)
+    if response_format == WeatherFormat.COLUMNS:
+        return Response(
+            pydantic_core.to_json(forecast.daily_json()), media_type="application/json"
         )
-    return daily_list
+    return forecast.daily_data
+
+
+@weather_management_router.get("/weather/cache")
+def get_weather_cache_stats():
+    """Hits, misses and number of entries of the forecast cache."""
+    return forecast_cache.stats()
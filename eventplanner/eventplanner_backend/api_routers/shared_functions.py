@@ -1,25 +1,42 @@
 import uuid
+import json
 import time
+import base64
 import hashlib
+import binascii
+from typing import Collection, List, Type
 from http import HTTPStatus
 
-from geopy import Nominatim
+from pydantic import BaseModel
 from fastapi.exceptions import HTTPException
 from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
     User,
     InvitationBase,
+    Invitation,
     Event,
+    Membership,
+    MembershipRole,
     NotificationType,
     Notification,
 )
 from eventplanner.eventplanner_backend.authentication import (
     eventplanner_authentication_helper as auth_helper,
 )
+from eventplanner.eventplanner_backend.api_routers.eventplanner_geocoding import (
+    geocoding_cache,
+)
 from eventplanner.eventplanner_backend.eventplanner_database import (
     users_table,
     user_query,
     event_table,
     events_query,
+    update_with_retry,
+    notifications_table,
+    invitation_table,
+    memberships_table,
+    memberships_query,
+    membership_id,
+    UniqueConstraintError,
 )
 
 
@@ -31,6 +48,24 @@ def fetch_single_record(table, query, detail: str):
     raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=detail)
 
 
+def update_single_record(table, query, change, detail: str) -> list:
+    """
+    Apply ``change`` to the record matching ``query`` with an optimistic
+    compare-and-swap, retried when a concurrent request updated it first.
+    Returns the updated ids, empty if ``change`` had nothing to write.
+    """
+    updated_ids = update_with_retry(table, query, change)
+    if updated_ids is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=detail)
+    return updated_ids
+
+
+def update_user_by_id(uid: str, change) -> list:
+    return update_single_record(
+        users_table, user_query.id == uid, change, "User id not found"
+    )
+
+
 def generate_hash_id(*args):
     string_id = f"{''.join(map(str, args))}{uuid.uuid4()}"
     return hashlib.sha256(string_id.encode()).hexdigest()
@@ -61,11 +96,83 @@ def get_event_organizer_user(event_id: str) -> User:
     return get_user_by_id(organizer_id)
 
 
-def get_event_by_id(event_id: str) -> Event:
-    event = fetch_single_record(
-        event_table, events_query.id == event_id, "Event not found with id"
-    )
-    return Event(**event)
+def get_event_by_id(event_id: str, fields: Collection[str] = None) -> Event:
+    """
+    The event with ``event_id``. With ``fields`` only those are read and the
+    event is built without validation, so the other fields are left unset.
+    """
+    if fields is None:
+        event = fetch_single_record(
+            event_table, events_query.id == event_id, "Event not found with id"
+        )
+        return Event(**event)
+    event = event_table.get_by("id", event_id, fields)
+    if event is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail="Event not found with id"
+        )
+    return Event.model_construct(**event)
+
+
+def parse_fields(fields: str | None, model: Type[BaseModel]) -> frozenset | None:
+    """
+    The names in a comma separated ``fields`` query parameter, or ``None``
+    when whole documents are wanted.
+    """
+    if fields is None:
+        return None
+    names = frozenset(name.strip() for name in fields.split(",") if name.strip())
+    if not names:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail="No fields requested"
+        )
+    unknown = names - model.model_fields.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+        )
+    return names
+
+
+def dump_fields(instance: BaseModel, fields: Collection[str]) -> dict:
+    """
+    The JSON representation of the ``fields`` of a possibly partial model
+    built with ``model_construct``.
+    """
+    return instance.model_dump(mode="json", include=set(fields), warnings=False)
+
+
+def encode_cursor(*position) -> str:
+    """
+    Opaque page cursor holding ``position``, which ends with the
+    ``(value, doc_id)`` key of the page's last document in a sort index.
+    """
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str, length: int = 2) -> list:
+    """
+    The ``length`` items of the position in ``cursor``. Anything that is not
+    a position ending with a number and a doc id is rejected, as it cannot be
+    compared with the keys of a sort index.
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError, TypeError) as error:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor"
+        ) from error
+    if (
+        not isinstance(position, list)
+        or len(position) != length
+        or not isinstance(position[-2], (int, float))
+        or isinstance(position[-2], bool)
+        or not isinstance(position[-1], int)
+        or isinstance(position[-1], bool)
+    ):
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
+    return position
 
 
 def generate_invitation_id(invite: InvitationBase) -> str:
@@ -76,10 +183,72 @@ def generate_invitation_id_fields(event_id, end_user):
     return generate_hash_id(time.time(), event_id, end_user)
 
 
+def store_invitation(invitation: Invitation) -> None:
+    invitation_table.insert(invitation.model_dump(mode="json"))
+
+
+def add_membership(event_id: str, user_id: str, role: MembershipRole) -> bool:
+    """Returns False if the user already had ``role`` in the event."""
+    membership = Membership(
+        id=membership_id(event_id, user_id, role),
+        event_id=event_id,
+        user_id=user_id,
+        role=role,
+    )
+    try:
+        memberships_table.insert(membership.model_dump(mode="json"))
+    except UniqueConstraintError:
+        return False
+    return True
+
+
+def remove_membership(event_id: str, user_id: str, role: MembershipRole) -> bool:
+    """Returns False if the user did not have ``role`` in the event."""
+    return bool(
+        memberships_table.remove(
+            memberships_query.id == membership_id(event_id, user_id, role)
+        )
+    )
+
+
+def has_membership(event_id: str, user_id: str, *roles: MembershipRole) -> bool:
+    return any(
+        memberships_table.get_by("id", membership_id(event_id, user_id, role))
+        for role in roles
+    )
+
+
+def get_event_memberships(
+    event_id: str, role: MembershipRole | None = None
+) -> List[Membership]:
+    memberships = memberships_table.search(memberships_query.event_id == event_id)
+    return [
+        Membership(**membership)
+        for membership in memberships
+        if role is None or membership["role"] == role.value
+    ]
+
+
+def get_user_memberships(
+    user_id: str, role: MembershipRole | None = None
+) -> List[Membership]:
+    memberships = memberships_table.search(memberships_query.user_id == user_id)
+    return [
+        Membership(**membership)
+        for membership in memberships
+        if role is None or membership["role"] == role.value
+    ]
+
+
 def generate_notification_id(user_id, notification_type, time_stamp) -> str:
     return generate_hash_id(time_stamp, user_id, notification_type)
 
 
+def store_notification(notification: Notification) -> None:
+    get_user_by_id(notification.user_id)
+    notifications_table.insert(notification.model_dump(mode="json"))
+
+
 def notify_user(
     user_id: str, notification_type: NotificationType, content: str
 ) -> dict:
@@ -96,20 +265,10 @@ def notify_user(
         message=content,
     )
 
-    user = get_user_by_id(user_id)
-    user_notifications = user.notifications or set()
-    user_notifications.add(notification)
-
-    users_table.update({"notifications": user_notifications}, user_query.id == user.id)
+    store_notification(notification)
 
     return {"message": "User notified successfully!"}
 
 
 def get_location_coordinates(location: str):
-    geolocator = Nominatim(user_agent="eventplanner")
-    location_data = geolocator.geocode(location)
-    return (
-        (location_data.latitude, location_data.longitude)
-        if location_data
-        else (None, None)
-    )
+    return geocoding_cache.coordinates(location)
@@ -2,6 +2,7 @@
 
 import sys
 import pathlib
+from contextlib import asynccontextmanager
 from os.path import dirname, realpath
 
 sys.path.append(
@@ -30,9 +31,17 @@ from eventplanner.eventplanner_backend.api_routers.eventplanner_notification_man
 )
 from eventplanner.eventplanner_backend.api_routers.eventplanner_weather_integration import (
     weather_management_router,
+    weather_client,
 )
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await weather_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(auth_router)
 app.include_router(account_management_router)
 app.include_router(event_management_router)
@@ -47,8 +56,13 @@ def redirect():
 
 
 if __name__ == "__main__":
+    # Every worker is a separate process importing the app by name; the
+    # database then locks its files across processes, see
+    # EVENTPLANNER_DATABASE_MULTIPROCESS.
     uvicorn.run(
         app=common.EVENTPLANNER_BACKEND_APP,
+        app_dir=dirname(realpath(__file__)),
         port=common.EVENTPLANNER_BACKEND_PORT,
         host=common.EVENTPLANNER_BACKEND_HOST,
+        workers=common.EVENTPLANNER_BACKEND_WORKERS,
     )
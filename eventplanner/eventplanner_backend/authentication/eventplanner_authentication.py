@@ -10,7 +10,6 @@ from eventplanner.eventplanner_backend.authentication import (
 )
 from eventplanner.eventplanner_backend.eventplanner_database import (
     users_table,
-    user_query,
 )
 from eventplanner.common.eventplanner_common import EventplannerBackendTags as Tags
 from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
@@ -34,9 +33,8 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 
 
 def authenticate_user(username: str, password: str) -> User | None:
-    users = users_table.search(user_query.username == username)
-    if users:
-        user = users[0]  # Assuming username is unique
+    user = users_table.get_by("username", username)
+    if user:
         if auth_helper.verify_password(password, user["password"]):
             return User(**user)
     return None
@@ -41,11 +41,6 @@ def create_access_token(
 
     # [SET_TYPE]
     to_encode.events_created = SetSerializer().encode(to_encode.events_created)
-    to_encode.active_invitations = SetSerializer().encode(to_encode.active_invitations)
-    to_encode.events_participation = SetSerializer().encode(
-        to_encode.events_participation
-    )
-    to_encode.notifications = SetSerializer().encode(to_encode.notifications)
     to_encode.friends = SetSerializer().encode(to_encode.friends)
 
     to_encode = dict(to_encode)
@@ -56,7 +51,7 @@ def create_access_token(
 
 
 def update_token_version(uid: str) -> User:
-    user = users_table.search(user_query.id == uid)[0]
+    user = users_table.get_by("id", uid)
     new_version = user.get("token_version", 0) + 1
     users_table.update({"token_version": new_version}, user_query.id == uid)
     return new_version
@@ -97,11 +92,7 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> Use
     token_version: int = payload.get("ver")
     if uid is None:
         raise credentials_exception
-    try:
-        user = users_table.search(user_query.id == uid)[0]
-    except IndexError:
-        raise credentials_exception
-
+    user = users_table.get_by("id", uid)
     if user is None:
         raise credentials_exception
     if user["token_version"] != token_version:
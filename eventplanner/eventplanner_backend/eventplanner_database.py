@@ -1,49 +1,347 @@
-import base64
-import pickle
+from contextlib import contextmanager
+from functools import partial
 
 from tinydb import TinyDB, Query
+from tinydb.operations import delete
 from tinydb.storages import JSONStorage
-from tinydb_serialization import SerializationMiddleware
+from tinydb.table import Table
 
+from eventplanner.common import eventplanner_common as common
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
+    Invitation,
+    Membership,
+    MembershipRole,
+    Notification,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_sqlite_storage import (
+    SQLiteDatabase,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_wal_storage import (
+    WriteAheadLogStorage,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_sharded_database import (
+    ShardedDatabase,
+    shard_path,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_set_encoding import (
+    SetEncodingMiddleware,
+    register_element_types,
+    encode_set,
+    decode_set,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_indexes import (
+    HashIndex,
+    IndexedTable,
+    SetIndex,
+    SortedIndex,
+    UniqueConstraintError,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_text_index import (
+    TextIndex,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_geo_index import (
+    GeoIndex,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_locking import (
+    LockedTable,
+    ProcessReadWriteLock,
+    ReadWriteLock,
+    SynchronizedMiddleware,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_versioning import (
+    VersionedTable,
+    VersionConflictError,
+    update_with_retry,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_transactions import (
+    TransactionMiddleware,
+    unit_of_work,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_operations import (
+    add_to_set,
+    set_with,
+    set_without,
+)
 
-TYPES = {"<class 'str'>": str}
-# class SetSerializer(Serializer):
-#     OBJ_CLASS = set  # The class this serializer handles
-#
-#     def encode(self, obj):
-#         list_from_obj = list(obj)
-#         if list_from_obj:
-#             TYPES[str(type(list_from_obj[0]))] = type(list_from_obj[0])
-#             return f'{type(list_from_obj[0])}#%#{",".join(map(str, list_from_obj))}'
-#         return ",".join(map(str, obj))
-#
-#     def decode(self, s):
-#         str_type, s = s.split('#%#')
-#         return set(map(TYPES[str_type], s.split(",")))
+
+register_element_types(Invitation, Notification)
 
 
 class SetSerializer:
+    """
+    Encodes sets with the JSON-native tagged format, e.g. for token payloads.
+    """
+
     OBJ_CLASS = set
 
     def encode(self, obj):
-        # Serialize the entire set object at once
-        return base64.b64encode(pickle.dumps(obj)).decode()
+        return encode_set(obj) if obj is not None else None
+
+    def decode(self, obj: dict):
+        return decode_set(obj) if obj is not None else None
+
+
+def create_table_database(
+    engine: common.EventplannerDatabaseEngine, table_name: str = None
+):
+    """
+    Database for every table, or only for ``table_name`` when each table is
+    stored in its own file.
+    """
+    if engine == common.EventplannerDatabaseEngine.SQLITE:
+        return SQLiteDatabase(
+            shard_path(common.EVENTPLANNER_DATABASE_SQLITE_PATH, table_name)
+        )
+
+    json_path = shard_path(common.EVENTPLANNER_DATABASE_JSON_PATH, table_name)
+    if engine == common.EventplannerDatabaseEngine.WAL:
+        log_path = common.EVENTPLANNER_DATABASE_WAL_PATH
+        if table_name:
+            log_path = f"{json_path}.wal"
+        compaction_intervals = common.EVENTPLANNER_DATABASE_TABLE_COMPACTION_INTERVALS
+        compaction_interval = compaction_intervals.get(
+            table_name, common.EVENTPLANNER_DATABASE_COMPACTION_INTERVAL
+        )
+        storage = partial(
+            WriteAheadLogStorage,
+            json_path,
+            log_path=log_path,
+            compaction_interval=compaction_interval,
+            max_log_size=common.EVENTPLANNER_DATABASE_WAL_MAX_BYTES,
+        )
+    else:
+        storage = SynchronizedMiddleware(partial(JSONStorage, json_path))
+
+    return TinyDB(storage=TransactionMiddleware(SetEncodingMiddleware(storage)))
+
+
+def create_database(engine: common.EventplannerDatabaseEngine):
+    if (
+        common.EVENTPLANNER_DATABASE_MULTIPROCESS
+        and engine == common.EventplannerDatabaseEngine.WAL
+    ):
+        raise ValueError(
+            "The wal engine keeps the database in memory and cannot be shared "
+            "between processes, use the json or sqlite engine with several workers"
+        )
+    if common.EVENTPLANNER_DATABASE_PER_TABLE_FILES:
+        return ShardedDatabase(partial(create_table_database, engine))
+    return create_table_database(engine)
 
-    def decode(self, obj: str):
-        # Deserialize the set object
-        return pickle.loads(base64.b64decode(obj))
 
+def create_table_lock(
+    engine: common.EventplannerDatabaseEngine, table_name: str = None
+) -> ReadWriteLock:
+    if not common.EVENTPLANNER_DATABASE_MULTIPROCESS:
+        return ReadWriteLock()
+    if engine == common.EventplannerDatabaseEngine.SQLITE:
+        path = common.EVENTPLANNER_DATABASE_SQLITE_PATH
+    else:
+        path = common.EVENTPLANNER_DATABASE_JSON_PATH
+    return ProcessReadWriteLock(f"{shard_path(path, table_name)}.lock")
 
-serialization = SerializationMiddleware(lambda: JSONStorage("db.json"))
 
-serialization.register_serializer(SetSerializer(), "TinySet")
+def reload_table(table, indexed_table: IndexedTable):
+    # The stored documents changed behind the table's back (another process
+    # wrote, or a transaction was rolled back): forget TinyDB's query cache
+    # and next document id, then bring the indexes up to date.
+    table.clear_cache()
+    if isinstance(table, Table):
+        table._next_id = None
+    indexed_table.refresh()
 
 
-db = TinyDB(storage=serialization)
-users_table = db.table("users")
-event_table = db.table("events")
-invitation_table = db.table("invitations")
+def transaction_unit(name: str):
+    """The object buffering the writes of table ``name`` in a transaction."""
+    database = db.shard(name) if isinstance(db, ShardedDatabase) else db
+    return database if isinstance(database, SQLiteDatabase) else database.storage
+
+
+def open_table(name: str, indexes=()) -> LockedTable:
+    # Tables stored in one TinyDB file rewrite each other on every write, so
+    # they share a lock; separate files and SQLite tables get their own.
+    lock_key = name if isinstance(db, (ShardedDatabase, SQLiteDatabase)) else None
+    if lock_key not in table_locks:
+        table_locks[lock_key] = create_table_lock(
+            common.EVENTPLANNER_DATABASE_ENGINE, lock_key
+        )
+    table = db.table(name)
+    indexed_table = IndexedTable(VersionedTable(table), indexes)
+    reload = partial(reload_table, table, indexed_table)
+    return LockedTable(indexed_table, table_locks[lock_key], reload)
+
+
+@contextmanager
+def transaction(*tables: LockedTable):
+    """
+    Unit of work over ``tables``: their writes inside the block are applied
+    atomically with a single flush per storage when it exits, or not at all
+    if it raises.
+    """
+    with unit_of_work((table, transaction_unit(table.name)) for table in tables):
+        yield
+
+
+db = create_database(common.EVENTPLANNER_DATABASE_ENGINE)
+table_locks = {}
+users_table = open_table(
+    "users", [HashIndex("id"), HashIndex("username"), HashIndex("email")]
+)
+event_table = open_table(
+    "events",
+    [
+        HashIndex("id"),
+        HashIndex("organizer_name", unique=False),
+        HashIndex("public", unique=False),
+        SetIndex("tags"),
+        SortedIndex("start_time"),
+        SortedIndex("end_time"),
+        SortedIndex("created_at"),
+        TextIndex("title", "description", "location"),
+        GeoIndex("latitude", "longitude"),
+    ],
+)
+invitation_table = open_table(
+    "invitations",
+    [
+        HashIndex("id"),
+        HashIndex("end_user", unique=False),
+        HashIndex("start_user", unique=False),
+        HashIndex("event_id", unique=False),
+    ],
+)
+notifications_table = open_table(
+    "notifications",
+    [
+        HashIndex("id"),
+        HashIndex("user_id", unique=False),
+        HashIndex("read", unique=False),
+        SortedIndex("time"),
+    ],
+)
+memberships_table = open_table(
+    "memberships",
+    [
+        HashIndex("id"),
+        HashIndex("user_id", unique=False),
+        HashIndex("event_id", unique=False),
+    ],
+)
+# Geocoder answers by normalized location, shared by every worker
+geocodes_table = open_table("geocodes", [HashIndex("location")])
 
 user_query = Query()
 events_query = Query()
 invitations_query = Query()
+notifications_query = Query()
+memberships_query = Query()
+geocodes_query = Query()
+
+
+def membership_id(event_id: str, user_id: str, role: MembershipRole) -> str:
+    # One edge per user, event and role, so a membership check is a lookup
+    # on the unique id index
+    return f"{event_id}:{user_id}:{role.value}"
+
+
+def move_embedded(table: LockedTable, field: str, target_table: LockedTable):
+    """
+    Move the models kept in the set ``field`` of the documents of ``table``
+    into documents of their own in ``target_table``.
+    """
+    documents = table.search(Query()[field].exists())
+    if not documents:
+        return
+    with transaction(table, target_table):
+        for document in documents:
+            target_table.insert_multiple(
+                item.model_dump(mode="json")
+                for item in document[field] or ()
+                if target_table.get_by("id", item.id) is None
+            )
+            table.update(delete(field), doc_ids=[document.doc_id])
+
+
+def move_embedded_notifications():
+    # Notifications used to be stored in the user document
+    move_embedded(users_table, "notifications", notifications_table)
+
+
+def move_embedded_invitations():
+    # Invitations used to be stored in the invited user, requests to join in
+    # the event
+    move_embedded(users_table, "active_invitations", invitation_table)
+    move_embedded(event_table, "requests_to_join", invitation_table)
+
+
+def move_embedded_memberships():
+    """
+    Participants and admins used to be kept in sets on the event, and the
+    events a user takes part in in a set on the user; turn both sides into
+    edges of the memberships table.
+    """
+    fields = {
+        "participants": MembershipRole.PARTICIPANT,
+        "admins": MembershipRole.ADMIN,
+    }
+    events = event_table.search(
+        events_query.participants.exists() | events_query.admins.exists()
+    )
+    users = users_table.search(user_query.events_participation.exists())
+    if not events and not users:
+        return
+
+    edges = [
+        (event["id"], user_id, role)
+        for event in events
+        for field, role in fields.items()
+        for user_id in event.get(field) or ()
+    ] + [
+        (event_id, user["id"], MembershipRole.PARTICIPANT)
+        for user in users
+        for event_id in user["events_participation"] or ()
+        if event_table.get_by("id", event_id) is not None
+    ]
+    memberships = {
+        membership_id(*edge): Membership(
+            id=membership_id(*edge), event_id=edge[0], user_id=edge[1], role=edge[2]
+        )
+        for edge in edges
+    }
+
+    def drop_fields(*names):
+        def transform(document):
+            for name in names:
+                document.pop(name, None)
+
+        return transform
+
+    with transaction(event_table, users_table, memberships_table):
+        memberships_table.insert_multiple(
+            membership.model_dump(mode="json")
+            for membership in memberships.values()
+            if memberships_table.get_by("id", membership.id) is None
+        )
+        event_table.update(
+            drop_fields(*fields), doc_ids=[event.doc_id for event in events]
+        )
+        users_table.update(
+            drop_fields("events_participation"),
+            doc_ids=[user.doc_id for user in users],
+        )
+
+
+def backfill_created_at():
+    # Events stored before the creation time was recorded sort first, in the
+    # order they were inserted
+    events = event_table.search(~events_query.created_at.exists())
+    if events:
+        event_table.update(
+            {"created_at": 0.0}, doc_ids=[event.doc_id for event in events]
+        )
+
+
+move_embedded_notifications()
+move_embedded_invitations()
+move_embedded_memberships()
+backfill_created_at()
@@ -56,6 +56,18 @@ class Invitation(InvitationBase):
         return hash(f"{self.time}{self.start_user}{self.end_user}")
 
 
+class MembershipRole(str, Enum):
+    ADMIN = "admin"
+    PARTICIPANT = "participant"
+
+
+class Membership(BaseModel):
+    id: str
+    user_id: str
+    event_id: str
+    role: MembershipRole
+
+
 class NotificationType(str, Enum):
     INVITATION = "invitation"
     EVENT_UPDATE = "event_update"
@@ -74,6 +86,11 @@ class Notification(BaseModel):
         return hash(f"{self.id}{self.user_id}{self.time}")
 
 
+class NotificationPage(BaseModel):
+    notifications: List[Notification]
+    next_cursor: str | None = None
+
+
 class UserBase(BaseModel):
     username: str
     email: str
@@ -83,18 +100,12 @@ class UserBase(BaseModel):
 class User(UserBase):
     id: str
     role: Role = Role.USER
-    events_participation: Set[str] | None = None
     events_created: Set[str] | None = None
-    active_invitations: Set[Invitation] | None = None
-    notifications: Set[Notification] | None = None
     token_version: int = 0
     friends: Set[str] | None = None
 
     @field_serializer(
-        "events_participation",
         "events_created",
-        "active_invitations",
-        "notifications",
         "friends",
         when_used="json",
     )
@@ -105,17 +116,18 @@ class User(UserBase):
 
 
 class HourlyWeatherData(BaseModel):
+    # open-meteo sends null for the hours a variable is not forecast for
     time: datetime
-    temperature_2m: float
-    relative_humidity_2m: float
-    dew_point_2m: float
-    apparent_temperature: float
-    precipitation_probability: float
-    precipitation: float
-    rain: float
-    snowfall: float
-    snow_depth: float
-    wind_speed_80m: float
+    temperature_2m: Optional[float]
+    relative_humidity_2m: Optional[float]
+    dew_point_2m: Optional[float]
+    apparent_temperature: Optional[float]
+    precipitation_probability: Optional[float]
+    precipitation: Optional[float]
+    rain: Optional[float]
+    snowfall: Optional[float]
+    snow_depth: Optional[float]
+    wind_speed_80m: Optional[float]
     temperature_180m: Optional[float] = None  # Optional if not always present
     soil_temperature_6cm: Optional[float] = None  # Optional if not always present
 
@@ -143,7 +155,7 @@ class Event(EventBase):
     id: str
     organizer_name: str | None = None
     organizer_id: str | None = None
-    admins: Set[str] | None = None
-    participants: Set[str] | None = None
-    requests_to_join: Set[Invitation] | None = None
+    created_at: float | None = None
+    latitude: float | None = None
+    longitude: float | None = None
     weather: List[DailyWeatherData] | None = None
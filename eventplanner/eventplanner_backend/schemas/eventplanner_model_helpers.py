@@ -34,3 +34,18 @@ class EventTags(enum.Enum):
     THEATRE = "#theatre"
     TRAVEL = "#travel"
     WORKSHOP = "#workshop"
+
+
+class TagsMatch(str, enum.Enum):
+    ANY = "any"
+    ALL = "all"
+
+
+class DateMatch(str, enum.Enum):
+    WITHIN = "within"
+    OVERLAPS = "overlaps"
+
+
+class EventSort(str, enum.Enum):
+    CREATED_AT = "created_at"
+    START_TIME = "start_time"
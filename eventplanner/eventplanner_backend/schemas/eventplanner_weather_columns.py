@@ -0,0 +1,151 @@
+"""
+Column-oriented hourly forecasts.
+
+``WeatherColumns`` keeps a forecast as one NumPy array per hourly variable,
+the way open-meteo sends it, instead of one ``HourlyWeatherData`` model per
+hour. Days are basic slices of the arrays, so they share their memory, and
+they serialize straight to the ``{"time": [...], "temperature_2m": [...]}``
+shape of the ``columns`` response format. The models per hour of the
+default ``rows`` format are built from the columns once per forecast, and
+validated in a single call into pydantic's core.
+"""
+import enum
+from datetime import datetime
+from functools import cached_property
+from typing import Dict, List, Mapping
+
+import numpy as np
+from pydantic import TypeAdapter
+
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
+    HourlyWeatherData,
+    DailyWeatherData,
+)
+
+HOURLY_VARIABLES = (
+    "temperature_2m",
+    "relative_humidity_2m",
+    "dew_point_2m",
+    "apparent_temperature",
+    "precipitation_probability",
+    "precipitation",
+    "rain",
+    "snowfall",
+    "snow_depth",
+    "wind_speed_80m",
+    "temperature_180m",
+    "soil_temperature_6cm",
+)
+HOURS_PER_DAY = 24
+HOURLY_DATA_ADAPTER = TypeAdapter(List[HourlyWeatherData])
+DAILY_DATA_ADAPTER = TypeAdapter(List[DailyWeatherData])
+
+
+class WeatherFormat(str, enum.Enum):
+    ROWS = "rows"
+    COLUMNS = "columns"
+
+
+def _values(column: np.ndarray) -> list:
+    """The column as floats, with the missing (NaN) values as ``None``."""
+    missing = np.isnan(column)
+    if not missing.any():
+        return column.tolist()
+    return np.where(missing, None, column).tolist()
+
+
+class WeatherColumns:
+    """
+    An hourly forecast: ``time`` as ``datetime64[m]`` and a float array for
+    each of ``HOURLY_VARIABLES``, all of the same length. Missing values are
+    NaN. Instances are shared through the forecast cache and must not be
+    modified.
+    """
+
+    def __init__(self, time: np.ndarray, values: Mapping[str, np.ndarray]):
+        self.time = time
+        self.values: Dict[str, np.ndarray] = dict(values)
+
+    @classmethod
+    def from_open_meteo(cls, hourly: Mapping[str, list]) -> "WeatherColumns":
+        """From the ``hourly`` object of an open-meteo JSON response."""
+        return cls(
+            np.array(hourly["time"], dtype="datetime64[m]"),
+            {
+                variable: np.array(hourly[variable], dtype=np.float64)
+                for variable in HOURLY_VARIABLES
+            },
+        )
+
+    @classmethod
+    def from_sdk_response(cls, response) -> "WeatherColumns":
+        """
+        From a response of the ``openmeteo_requests`` client asked for
+        ``HOURLY_VARIABLES`` in that order.
+        """
+        hourly = response.Hourly()
+        return cls(
+            np.arange(hourly.Time(), hourly.TimeEnd(), hourly.Interval()).astype(
+                "datetime64[s]"
+            ),
+            {
+                variable: hourly.Variables(i).ValuesAsNumpy().astype(np.float64)
+                for i, variable in enumerate(HOURLY_VARIABLES)
+            },
+        )
+
+    def __len__(self):
+        return len(self.time)
+
+    def slice(self, start: int, stop: int) -> "WeatherColumns":
+        """The hours from ``start`` to ``stop``, viewing these arrays."""
+        return WeatherColumns(
+            self.time[start:stop],
+            {variable: column[start:stop] for variable, column in self.values.items()},
+        )
+
+    def days(self) -> List["WeatherColumns"]:
+        return [
+            self.slice(start, start + HOURS_PER_DAY)
+            for start in range(0, len(self), HOURS_PER_DAY)
+        ]
+
+    def date(self) -> datetime:
+        """Midnight of the day of the first hour."""
+        return self.time[0].astype("datetime64[D]").astype("datetime64[us]").item()
+
+    def to_json(self) -> dict:
+        """``{"time": [...], <variable>: [...]}``, times as ISO 8601."""
+        columns = {"time": np.datetime_as_string(self.time, unit="m").tolist()}
+        for variable, column in self.values.items():
+            columns[variable] = _values(column)
+        return columns
+
+    def daily_json(self) -> List[dict]:
+        return [
+            {"date": day.date().isoformat(), "hourly_data": day.to_json()}
+            for day in self.days()
+        ]
+
+    def _hours(self) -> List[dict]:
+        # The arrays are converted to Python values a column at a time
+        times = self.time.astype("datetime64[us]").tolist()
+        columns = [_values(self.values[variable]) for variable in HOURLY_VARIABLES]
+        return [
+            dict(zip(HOURLY_VARIABLES, values), time=time)
+            for time, *values in zip(times, *columns)
+        ]
+
+    def hourly_data(self) -> List[HourlyWeatherData]:
+        return HOURLY_DATA_ADAPTER.validate_python(self._hours())
+
+    @cached_property
+    def daily_data(self) -> List[DailyWeatherData]:
+        """The forecast as ``DailyWeatherData`` models, built on first use."""
+        hours = self._hours()
+        return DAILY_DATA_ADAPTER.validate_python(
+            [
+                {"date": day.date(), "hourly_data": hours[start : start + len(day)]}
+                for start, day in zip(range(0, len(self), HOURS_PER_DAY), self.days())
+            ]
+        )
@@ -0,0 +1,212 @@
+"""
+In-memory geospatial index for ``IndexedTable``.
+
+``GeoIndex`` keeps the geohash of every document's coordinates in a sorted
+list. A geohash is a base32 string of interleaved longitude and latitude
+bits, so all the points of a grid cell share the prefix naming the cell and
+sit next to each other in the list. A radius query picks the finest cell
+size that is still at least the radius, collects the points of the cell
+holding the center and of its eight neighbours (which together cover the
+circle) with one binary search per cell, and keeps those within the radius.
+Like the other indexes it is updated incrementally by ``IndexedTable`` on
+every write and rebuilt when the table is loaded.
+"""
+import heapq
+import math
+from bisect import bisect_left, insort
+from numbers import Real
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Cells of about 5 x 5 m
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def geohash(latitude: float, longitude: float, precision: int) -> str:
+    """The geohash of a point with ``precision`` characters."""
+    latitude_range = [-90.0, 90.0]
+    longitude_range = [-180.0, 180.0]
+    characters = []
+    value, bits = 0, 0
+    on_longitude = True
+    while len(characters) < precision:
+        bounds, coordinate = (
+            (longitude_range, longitude) if on_longitude else (latitude_range, latitude)
+        )
+        middle = (bounds[0] + bounds[1]) / 2
+        if coordinate >= middle:
+            value = value * 2 + 1
+            bounds[0] = middle
+        else:
+            value *= 2
+            bounds[1] = middle
+        on_longitude = not on_longitude
+        bits += 1
+        if bits == 5:
+            characters.append(BASE32[value])
+            value, bits = 0, 0
+    return "".join(characters)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Width and height in degrees of the geohash cells of ``precision``."""
+    bits = 5 * precision
+    return 360 / 2 ** ((bits + 1) // 2), 180 / 2 ** (bits // 2)
+
+
+def distance_km(
+    latitude: float, longitude: float, other_latitude: float, other_longitude: float
+) -> float:
+    """Great-circle (haversine) distance between two points."""
+    latitude, longitude, other_latitude, other_longitude = map(
+        math.radians, (latitude, longitude, other_latitude, other_longitude)
+    )
+    a = (
+        math.sin((other_latitude - latitude) / 2) ** 2
+        + math.cos(latitude)
+        * math.cos(other_latitude)
+        * math.sin((other_longitude - longitude) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _coordinate(value, limit: float) -> Optional[float]:
+    if not isinstance(value, Real) or isinstance(value, bool):
+        return None
+    if not -limit <= value <= limit:
+        return None
+    return float(value)
+
+
+class GeoIndex:
+    """
+    Geohash index over the ``latitude_field`` and ``longitude_field`` of a
+    document, registered in ``IndexedTable.indexes`` under ``name``.
+    Documents without valid coordinates are not indexed.
+    """
+
+    unique = False
+
+    def __init__(
+        self,
+        latitude_field: str = "latitude",
+        longitude_field: str = "longitude",
+        name: str = "coordinates",
+    ):
+        self.name = name
+        self._latitude_field = latitude_field
+        self._longitude_field = longitude_field
+        self._sorted: List[Tuple[str, int]] = []
+        self._points: Dict[int, Tuple[float, float]] = {}
+
+    @property
+    def fields(self) -> tuple:
+        return self._latitude_field, self._longitude_field
+
+    def _point(self, document: Mapping) -> Optional[Tuple[float, float]]:
+        latitude = _coordinate(document.get(self._latitude_field), 90)
+        longitude = _coordinate(document.get(self._longitude_field), 180)
+        if latitude is None or longitude is None:
+            return None
+        return latitude, longitude
+
+    def keys(self, document: Mapping) -> Iterable[Hashable]:
+        point = self._point(document)
+        if point is None:
+            return ()
+        return (geohash(*point, GEOHASH_PRECISION),)
+
+    def add(self, doc_id: int, document: Mapping):
+        point = self._point(document)
+        if point is None:
+            return
+        insort(self._sorted, (geohash(*point, GEOHASH_PRECISION), doc_id))
+        self._points[doc_id] = point
+
+    def remove(self, doc_id: int, document: Mapping):
+        point = self._points.pop(doc_id, None)
+        if point is None:
+            return
+        entry = (geohash(*point, GEOHASH_PRECISION), doc_id)
+        position = bisect_left(self._sorted, entry)
+        if position < len(self._sorted) and self._sorted[position] == entry:
+            del self._sorted[position]
+
+    def clear(self):
+        self._sorted.clear()
+        self._points.clear()
+
+    def check(self, doc_ids: Set[int], document: Mapping):
+        pass
+
+    def resolve(self, operation: str, operand) -> Optional[Set[int]]:
+        # Queries on the individual coordinates are not answered from here
+        return None
+
+    def estimate(self, operation: str, operand) -> Optional[int]:
+        return None
+
+    def __len__(self):
+        return len(self._sorted)
+
+    @staticmethod
+    def _precision(latitude: float, radius_km: float) -> Optional[int]:
+        # Cells get narrower towards the poles, measure them at the latitude
+        # of the circle closest to one
+        edge = min(90.0, abs(latitude) + radius_km / KM_PER_DEGREE)
+        cosine = math.cos(math.radians(edge))
+        for precision in range(GEOHASH_PRECISION, 0, -1):
+            width, height = cell_size(precision)
+            if (
+                height * KM_PER_DEGREE >= radius_km
+                and width * KM_PER_DEGREE * cosine >= radius_km
+            ):
+                return precision
+        return None
+
+    @staticmethod
+    def cells(latitude: float, longitude: float, precision: int) -> Set[str]:
+        """The cell holding the point and its neighbours."""
+        width, height = cell_size(precision)
+        cells = set()
+        for latitude_step in (-1, 0, 1):
+            neighbour_latitude = latitude + latitude_step * height
+            if not -90 <= neighbour_latitude <= 90:
+                continue
+            for longitude_step in (-1, 0, 1):
+                neighbour_longitude = (
+                    longitude + longitude_step * width + 180
+                ) % 360 - 180
+                cells.add(geohash(neighbour_latitude, neighbour_longitude, precision))
+        return cells
+
+    def nearby(
+        self, latitude: float, longitude: float, radius_km: float, limit: int = None
+    ) -> List[Tuple[int, float]]:
+        """
+        ``(doc_id, distance_km)`` of the documents within ``radius_km`` of
+        the point, nearest first.
+        """
+        precision = self._precision(latitude, radius_km)
+        if precision is None:
+            # The circle is about as large as the earth
+            candidates: Iterable[int] = self._points
+        else:
+            candidates = set()
+            for cell in self.cells(latitude, longitude, precision):
+                # Every geohash character sorts before "~"
+                start = bisect_left(self._sorted, (cell,))
+                end = bisect_left(self._sorted, (cell + "~",))
+                candidates.update(doc_id for _, doc_id in self._sorted[start:end])
+        matches = []
+        for doc_id in candidates:
+            distance = distance_km(latitude, longitude, *self._points[doc_id])
+            if distance <= radius_km:
+                matches.append((distance, doc_id))
+        if limit is None:
+            nearest = sorted(matches)
+        else:
+            nearest = heapq.nsmallest(limit, matches)
+        return [(doc_id, distance) for distance, doc_id in nearest]
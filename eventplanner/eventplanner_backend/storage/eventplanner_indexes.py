@@ -0,0 +1,740 @@
+"""
+In-memory secondary indexes kept in sync with a TinyDB-like table.
+
+``IndexedTable`` wraps any table exposing the ``tinydb.table.Table`` interface
+(TinyDB tables, ``SQLiteTable``) and maintains its indexes on every insert,
+update and remove. Equality queries on an indexed field, such as
+``user_query.id == uid``, ``any``/``all`` queries on a set-valued field with
+a ``SetIndex``, such as ``events_query.tags.any(["#art"])``, and comparisons
+on a field with a ``SortedIndex``, such as ``events_query.start_time >= t``,
+are answered from the index instead of evaluating the query against every
+document. In a conjunction the indexed parts narrow down the documents the
+rest of the query is evaluated on, in the order chosen by the cost-based
+planner of ``eventplanner_query_planner``. Unique indexes reject duplicates
+before anything is written.
+
+Index-backed reads accept ``fields`` to return only part of each document.
+Tables that can read part of a document (``SQLiteTable``) are asked for just
+those fields, the others are cut down after reading.
+"""
+from bisect import bisect_left, bisect_right, insort
+from copy import copy, deepcopy
+from itertools import islice
+from math import inf
+from numbers import Real
+from typing import (
+    Callable,
+    Collection,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from tinydb.table import Document
+
+from eventplanner.eventplanner_backend.storage.eventplanner_query_planner import (
+    plan_query,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_versioning import (
+    VersionConflictError,
+)
+
+
+def project(document: Document, fields: Collection[str]) -> Document:
+    """A copy of ``document`` holding only ``fields``."""
+    return Document(
+        {field: document[field] for field in fields if field in document},
+        document.doc_id,
+    )
+
+
+class UniqueConstraintError(ValueError):
+    def __init__(self, field: str, value):
+        super().__init__(f"Duplicate value for unique field '{field}': {value!r}")
+        self.field = field
+        self.value = value
+
+
+class HashIndex:
+    """
+    Maps the value of ``field`` to the ids of the documents holding it.
+    Documents without the field (or with ``None``) are not indexed.
+    """
+
+    def __init__(self, field: str, unique: bool = True):
+        self.field = field
+        self.name = field
+        self.unique = unique
+        self._entries: Dict[Hashable, Set[int]] = {}
+
+    @property
+    def fields(self) -> tuple:
+        return (self.field,)
+
+    def keys(self, document: Mapping) -> Iterable[Hashable]:
+        value = document.get(self.field)
+        if value is None:
+            return ()
+        return (value,)
+
+    def add(self, doc_id: int, document: Mapping):
+        for key in self.keys(document):
+            self._entries.setdefault(key, set()).add(doc_id)
+
+    def remove(self, doc_id: int, document: Mapping):
+        for key in self.keys(document):
+            doc_ids = self._entries.get(key)
+            if doc_ids is None:
+                continue
+            doc_ids.discard(doc_id)
+            if not doc_ids:
+                del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def lookup(self, value) -> Set[int]:
+        return set(self._entries.get(value, ()))
+
+    def resolve(self, operation: str, operand) -> Optional[Set[int]]:
+        """
+        Ids of the documents matching the query ``operation`` (the first item
+        of a TinyDB query hash) with ``operand`` on the indexed field, or
+        ``None`` if this index cannot answer it.
+        """
+        if operation == "==":
+            return self.lookup(operand)
+        return None
+
+    def estimate(self, operation: str, operand) -> Optional[int]:
+        """
+        How many ids ``resolve`` returns, at most, without collecting them,
+        or ``None`` if this index cannot answer the query.
+        """
+        if operation == "==":
+            return len(self._entries.get(operand, ()))
+        return None
+
+    def matches(self, operation: str, operand, document: Mapping) -> bool:
+        """Whether ``resolve`` would return ``document`` (or its projection)."""
+        return operand in self.keys(document)
+
+    def check(self, doc_ids: Set[int], document: Mapping):
+        """Raise if storing ``document`` under ``doc_ids`` breaks uniqueness."""
+        if not self.unique:
+            return
+        for key in self.keys(document):
+            if len(doc_ids) > 1 or self._entries.get(key, set()) - doc_ids:
+                raise UniqueConstraintError(self.field, key)
+
+
+class SetIndex(HashIndex):
+    """
+    Inverted index over a set-valued ``field``: maps each element to the ids
+    of the documents whose set holds it. ``any`` queries are answered with
+    the union of the posting sets of the queried elements, ``all`` queries
+    with their intersection.
+    """
+
+    def __init__(self, field: str):
+        super().__init__(field, unique=False)
+
+    def keys(self, document: Mapping) -> Iterable[Hashable]:
+        return document.get(self.field) or ()
+
+    def resolve(self, operation: str, operand) -> Optional[Set[int]]:
+        # Only lists of values (frozen to tuples in the hash), not sub-queries
+        if not isinstance(operand, tuple) or not operand:
+            return None
+        postings = [self._entries.get(value, set()) for value in operand]
+        if operation == "any":
+            return set().union(*postings)
+        if operation == "all":
+            # Start from the rarest element to keep the intersection small
+            postings.sort(key=len)
+            return set(postings[0]).intersection(*postings[1:])
+        return None
+
+    def estimate(self, operation: str, operand) -> Optional[int]:
+        if not isinstance(operand, tuple) or not operand:
+            return None
+        sizes = [len(self._entries.get(value, ())) for value in operand]
+        if operation == "any":
+            return sum(sizes)
+        if operation == "all":
+            return min(sizes)
+        return None
+
+    def matches(self, operation: str, operand, document: Mapping) -> bool:
+        values = set(self.keys(document))
+        if operation == "any":
+            return not values.isdisjoint(operand)
+        return values.issuperset(operand)
+
+
+class SortedIndex(HashIndex):
+    """
+    Keeps ``(value, doc_id)`` pairs sorted on a numeric ``field`` so range
+    queries (``<``, ``<=``, ``>``, ``>=``) are answered with a binary search.
+    Documents whose field is not a number are not indexed, as comparing it
+    with a number never matches.
+    """
+
+    def __init__(self, field: str):
+        super().__init__(field, unique=False)
+        self._sorted: List[Tuple[Real, int]] = []
+
+    def keys(self, document: Mapping) -> Iterable[Hashable]:
+        value = document.get(self.field)
+        if not isinstance(value, Real) or isinstance(value, bool):
+            return ()
+        return (value,)
+
+    def add(self, doc_id: int, document: Mapping):
+        super().add(doc_id, document)
+        for key in self.keys(document):
+            insort(self._sorted, (key, doc_id))
+
+    def remove(self, doc_id: int, document: Mapping):
+        super().remove(doc_id, document)
+        for key in self.keys(document):
+            entry = (key, doc_id)
+            position = bisect_left(self._sorted, entry)
+            if position < len(self._sorted) and self._sorted[position] == entry:
+                del self._sorted[position]
+
+    def clear(self):
+        super().clear()
+        self._sorted.clear()
+
+    def range(
+        self,
+        low: Real = None,
+        high: Real = None,
+        include_low: bool = True,
+        include_high: bool = True,
+    ) -> Set[int]:
+        """Ids of the documents whose value lies between ``low`` and ``high``."""
+        start, end = self._bounds(low, high, include_low, include_high)
+        return {doc_id for _, doc_id in self._sorted[start:end]}
+
+    def _bounds(
+        self, low: Real, high: Real, include_low: bool, include_high: bool
+    ) -> Tuple[int, int]:
+        start, end = 0, len(self._sorted)
+        # (value,) sorts before and (value, inf) after every pair of value
+        if low is not None:
+            if include_low:
+                start = bisect_left(self._sorted, (low,))
+            else:
+                start = bisect_right(self._sorted, (low, inf))
+        if high is not None:
+            if include_high:
+                end = bisect_right(self._sorted, (high, inf))
+            else:
+                end = bisect_left(self._sorted, (high,))
+        return start, max(start, end)
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def scan(
+        self, after: Sequence = None, descending: bool = False
+    ) -> Iterator[Tuple[Real, int]]:
+        """
+        The ``(value, doc_id)`` pairs in order, starting after the pair
+        ``after`` (which need not be in the index any more).
+        """
+        if descending:
+            position = len(self._sorted)
+            if after is not None:
+                position = bisect_left(self._sorted, tuple(after))
+            for position in range(position - 1, -1, -1):
+                yield self._sorted[position]
+        else:
+            position = 0
+            if after is not None:
+                position = bisect_right(self._sorted, tuple(after))
+            for position in range(position, len(self._sorted)):
+                yield self._sorted[position]
+
+    @staticmethod
+    def _range_arguments(operation: str, operand) -> Optional[tuple]:
+        # (low, high, include_low, include_high) of a comparison
+        if not isinstance(operand, Real) or isinstance(operand, bool):
+            return None
+        return {
+            ">=": (operand, None, True, True),
+            ">": (operand, None, False, True),
+            "<=": (None, operand, True, True),
+            "<": (None, operand, True, False),
+        }.get(operation)
+
+    def resolve(self, operation: str, operand) -> Optional[Set[int]]:
+        arguments = self._range_arguments(operation, operand)
+        if arguments is not None:
+            return self.range(*arguments)
+        if not isinstance(operand, Real) or isinstance(operand, bool):
+            return None
+        return super().resolve(operation, operand)
+
+    def estimate(self, operation: str, operand) -> Optional[int]:
+        arguments = self._range_arguments(operation, operand)
+        if arguments is not None:
+            start, end = self._bounds(*arguments)
+            return end - start
+        if not isinstance(operand, Real) or isinstance(operand, bool):
+            return None
+        return super().estimate(operation, operand)
+
+    def matches(self, operation: str, operand, document: Mapping) -> bool:
+        arguments = self._range_arguments(operation, operand)
+        if arguments is None:
+            return super().matches(operation, operand, document)
+        low, high, include_low, include_high = arguments
+        return any(
+            (low is None or value > low or include_low and value == low)
+            and (high is None or value < high or include_high and value == high)
+            for value in self.keys(document)
+        )
+
+
+class IndexedTable:
+    """
+    A table wrapper that keeps a set of indexes up to date. Anything not
+    overridden here is delegated to the wrapped table.
+    """
+
+    def __init__(self, table, indexes: Iterable[HashIndex]):
+        self._table = table
+        self.indexes = {index.name: index for index in indexes}
+        self._indexed_fields = {
+            field for index in self.indexes.values() for field in index.fields
+        }
+        self._projections: Dict[int, dict] = {}
+        self.rebuild()
+
+    def __getattr__(self, item):
+        return getattr(self._table, item)
+
+    def __len__(self):
+        return len(self._table)
+
+    def __iter__(self):
+        return iter(self._table)
+
+    def __repr__(self):
+        return f"<IndexedTable {self._table!r} indexes={list(self.indexes)}>"
+
+    # Index maintenance
+    def rebuild(self):
+        for index in self.indexes.values():
+            index.clear()
+        self._projections.clear()
+        for document in self._table.all():
+            self._add(document.doc_id, document)
+
+    def refresh(self):
+        """
+        Bring the indexes up to date with documents changed behind the
+        table's back. Only the documents whose indexed fields differ from
+        what the indexes hold are reindexed, so a few foreign writes do not
+        rebuild the larger indexes (text, geo) from scratch.
+        """
+        documents = {document.doc_id: document for document in self._table.all()}
+        for doc_id in self._projections.keys() - documents.keys():
+            self._discard(doc_id)
+        for doc_id, document in documents.items():
+            if self._projections.get(doc_id) != self._project(document):
+                self._discard(doc_id)
+                self._add(doc_id, document)
+
+    def _project(self, document: Mapping) -> dict:
+        # Containers are copied so later in-place edits by the caller cannot
+        # desynchronize the projection from what the indexes hold.
+        return {
+            field: copy(document[field])
+            for field in self._indexed_fields
+            if field in document
+        }
+
+    def _add(self, doc_id: int, document: Mapping):
+        projection = self._project(document)
+        for index in self.indexes.values():
+            index.add(doc_id, projection)
+        self._projections[doc_id] = projection
+
+    def _discard(self, doc_id: int):
+        projection = self._projections.pop(doc_id, None)
+        if projection is None:
+            return
+        for index in self.indexes.values():
+            index.remove(doc_id, projection)
+
+    def _reindex(self, doc_ids: Iterable[int]):
+        doc_ids = list(doc_ids)
+        for doc_id in doc_ids:
+            self._discard(doc_id)
+        # One read of the table for all of them
+        for document in self._documents(doc_ids):
+            self._add(document.doc_id, document)
+
+    def _check_unique(self, doc_ids: Set[int], fields: Mapping):
+        for index in self.indexes.values():
+            if set(index.fields) & fields.keys():
+                index.check(doc_ids, fields)
+
+    def _check_unique_transform(self, doc_ids: Set[int], transform: Callable):
+        """
+        Raise if applying ``transform`` to the documents ``doc_ids`` breaks
+        uniqueness. The transform runs on copies of the documents first, so,
+        like TinyDB's operations, it must not have side effects.
+        """
+        unique = [index for index in self.indexes.values() if index.unique]
+        if not unique:
+            return
+        updated = {}
+        for document in self._documents(doc_ids):
+            changed = deepcopy(dict(document))
+            transform(changed)
+            updated[document.doc_id] = changed
+        for index in unique:
+            # The new keys may only be held by the updated documents, once
+            seen = set()
+            for document in updated.values():
+                for key in index.keys(document):
+                    if key in seen or index.lookup(key) - updated.keys():
+                        raise UniqueConstraintError(index.name, key)
+                    seen.add(key)
+
+    # Query routing
+    def _resolve(self, query_hash) -> Optional[Tuple[Set[int], bool]]:
+        """
+        Resolve the query with ``query_hash`` through the indexes. Returns the
+        candidate ids and whether they are exactly the matching documents
+        (a conjunction with unindexed parts only narrows them down), or
+        ``None`` if no index applies.
+        """
+        plan = plan_query(query_hash, self.indexes)
+        if plan is None:
+            return None
+        return plan.execute(self._projections), plan.exact
+
+    def _indexed_documents(self, cond) -> Optional[list]:
+        resolved = self._resolve(getattr(cond, "_hash", None))
+        if resolved is None:
+            return None
+        doc_ids, exact = resolved
+        documents = self._documents(doc_ids)
+        if exact:
+            return documents
+        return [document for document in documents if cond(document)]
+
+    def _indexed_doc_ids(self, cond) -> Optional[Set[int]]:
+        resolved = self._resolve(getattr(cond, "_hash", None))
+        if resolved is None:
+            return None
+        doc_ids, exact = resolved
+        if exact:
+            return doc_ids
+        return {
+            document.doc_id
+            for document in self._documents(doc_ids)
+            if cond(document)
+        }
+
+    def _get(self, doc_id: int = None, doc_ids: List[int] = None, fields=None):
+        if fields is None:
+            return self._table.get(doc_id=doc_id, doc_ids=doc_ids)
+        if getattr(self._table, "projects_fields", False):
+            return self._table.get(doc_id=doc_id, doc_ids=doc_ids, fields=fields)
+        if doc_id is not None:
+            document = self._table.get(doc_id=doc_id)
+            return None if document is None else project(document, fields)
+        documents = self._table.get(doc_ids=doc_ids)
+        return [project(document, fields) for document in documents]
+
+    def _documents(self, doc_ids: Iterable[int], fields=None) -> list:
+        doc_ids = sorted(doc_ids)
+        if len(doc_ids) == 1:
+            document = self._get(doc_id=doc_ids[0], fields=fields)
+            return [document] if document is not None else []
+        # One read of the table for all of them
+        return self._get(doc_ids=doc_ids, fields=fields) if doc_ids else []
+
+    def _target_ids(self, cond=None, doc_ids: Iterable[int] = None) -> Set[int]:
+        if doc_ids is not None:
+            return set(doc_ids)
+        if cond is not None:
+            indexed = self._indexed_doc_ids(cond)
+            if indexed is not None:
+                return indexed
+            return {document.doc_id for document in self._table.search(cond)}
+        return set(self._projections)
+
+    def get_by(self, field: str, value, fields: Collection[str] = None):
+        """
+        O(1) lookup of the single document whose ``field`` equals ``value``,
+        holding only ``fields`` if given.
+        """
+        doc_ids = self.indexes[field].lookup(value)
+        if not doc_ids:
+            return None
+        return self._get(doc_id=min(doc_ids), fields=fields)
+
+    # Read operations
+    def search(self, cond) -> list:
+        documents = self._indexed_documents(cond)
+        if documents is None:
+            return self._table.search(cond)
+        return documents
+
+    def search_text(
+        self, text: str, limit: int = None, index: str = "text"
+    ) -> List[Tuple[Document, float]]:
+        """
+        Documents ranked by the full-text ``index`` (a ``TextIndex``) for
+        ``text``, best first, with their scores.
+        """
+        ranked = self.indexes[index].search(text, limit)
+        documents = {
+            document.doc_id: document
+            for document in self._documents(doc_id for doc_id, _ in ranked)
+        }
+        return [
+            (documents[doc_id], score)
+            for doc_id, score in ranked
+            if doc_id in documents
+        ]
+
+    def search_nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        limit: int = None,
+        index: str = "coordinates",
+    ) -> List[Tuple[Document, float]]:
+        """
+        Documents within ``radius_km`` of the point according to the
+        ``GeoIndex`` ``index``, nearest first, with their distances.
+        """
+        nearest = self.indexes[index].nearby(latitude, longitude, radius_km, limit)
+        documents = {
+            document.doc_id: document
+            for document in self._documents(doc_id for doc_id, _ in nearest)
+        }
+        return [
+            (documents[doc_id], distance)
+            for doc_id, distance in nearest
+            if doc_id in documents
+        ]
+
+    def search_sorted(
+        self,
+        cond,
+        index: str,
+        limit: int,
+        after: Sequence = None,
+        descending: bool = False,
+        fields: Collection[str] = None,
+    ) -> list:
+        """
+        Up to ``limit`` documents matching ``cond`` (all documents if
+        ``None``) in the order of the ``SortedIndex`` ``index``, starting
+        after the ``(value, doc_id)`` key ``after`` of the last document of
+        the previous page. Documents without a value for the indexed field
+        are left out. Each page only visits the index from ``after`` on.
+        With ``fields`` the documents only hold those fields.
+        """
+        sorted_index = self.indexes[index]
+        resolved = None
+        if cond is not None:
+            resolved = self._resolve(getattr(cond, "_hash", None))
+        candidates = resolved[0] if resolved else None
+
+        if self._sorts_candidates(candidates, sorted_index):
+            keys = sorted(
+                (key, doc_id)
+                for doc_id in candidates
+                for key in sorted_index.keys(self._projections.get(doc_id, {}))
+            )
+            if descending:
+                keys.reverse()
+            if after is not None:
+                after = tuple(after)
+                keys = [
+                    key for key in keys if (key < after if descending else key > after)
+                ]
+            entries = iter(keys)
+        else:
+            entries = sorted_index.scan(after, descending)
+        doc_ids = (
+            doc_id
+            for _, doc_id in entries
+            if candidates is None or doc_id in candidates
+        )
+
+        if cond is None or (resolved is not None and resolved[1]):
+            return self._documents_in_order(list(islice(doc_ids, limit)), fields)
+        # The rest of the query is evaluated on batches of whole documents
+        documents = []
+        while len(documents) < limit:
+            batch = list(islice(doc_ids, max(limit, 64)))
+            if not batch:
+                break
+            documents.extend(
+                document
+                for document in self._documents_in_order(batch)
+                if cond(document)
+            )
+        documents = documents[:limit]
+        if fields is None:
+            return documents
+        return [project(document, fields) for document in documents]
+
+    @staticmethod
+    def _sorts_candidates(candidates: Optional[Set[int]], sorted_index) -> bool:
+        # Few candidates: sorting them beats walking the index
+        return candidates is not None and len(candidates) * 8 < len(sorted_index)
+
+    def explain(self, cond, index: str = None) -> List[dict]:
+        """
+        The steps a ``search`` for ``cond``, or a ``search_sorted`` in the
+        order of ``index``, goes through: the index steps of the query plan
+        with their estimated and actual number of candidates, how the
+        candidates are ordered, and whether the documents still have to be
+        evaluated against the query ("filter") or all of them ("scan").
+        """
+        steps = []
+        resolved = None
+        if cond is not None:
+            plan = plan_query(getattr(cond, "_hash", None), self.indexes)
+            if plan is not None:
+                resolved = plan.execute(self._projections, steps), plan.exact
+        if index is not None:
+            candidates = resolved[0] if resolved else None
+            if self._sorts_candidates(candidates, self.indexes[index]):
+                steps.append({"step": "sort", "index": index, "rows": len(candidates)})
+            else:
+                steps.append(
+                    {
+                        "step": "walk",
+                        "index": index,
+                        "estimated_rows": len(self.indexes[index]),
+                    }
+                )
+        elif cond is not None and resolved is None:
+            steps.append({"step": "scan", "estimated_rows": len(self._projections)})
+        if cond is not None and not (resolved and resolved[1]):
+            steps.append({"step": "filter"})
+        return steps
+
+    def _documents_in_order(self, doc_ids: List[int], fields=None) -> list:
+        documents = {
+            document.doc_id: document for document in self._documents(doc_ids, fields)
+        }
+        return [documents[doc_id] for doc_id in doc_ids if doc_id in documents]
+
+    def get(self, cond=None, doc_id: int = None, doc_ids: List = None):
+        if doc_id is None and doc_ids is None and cond is not None:
+            documents = self._indexed_documents(cond)
+            if documents is not None:
+                return documents[0] if documents else None
+        return self._table.get(cond, doc_id=doc_id, doc_ids=doc_ids)
+
+    def contains(self, cond=None, doc_id: int = None) -> bool:
+        if doc_id is not None:
+            return doc_id in self._projections
+        return self.get(cond) is not None
+
+    def count(self, cond) -> int:
+        # Queries answered by the indexes alone do not read any document
+        doc_ids = self._indexed_doc_ids(cond)
+        if doc_ids is None:
+            return len(self.search(cond))
+        return len(doc_ids)
+
+    # Write operations
+    def insert(self, document: Mapping) -> int:
+        self._check_unique(set(), document)
+        doc_id = self._table.insert(document)
+        self._add(doc_id, document)
+        return doc_id
+
+    def insert_multiple(self, documents: Iterable[Mapping]) -> List[int]:
+        documents = list(documents)
+        for document in documents:
+            self._check_unique(set(), document)
+        for index in self.indexes.values():
+            if not index.unique:
+                continue
+            # Duplicates within the batch, the check above sees the table only
+            seen = set()
+            for document in documents:
+                for key in index.keys(document):
+                    if key in seen:
+                        raise UniqueConstraintError(index.name, key)
+                    seen.add(key)
+        # One write of the table for all of them
+        doc_ids = self._table.insert_multiple(documents)
+        for doc_id, document in zip(doc_ids, documents):
+            self._add(doc_id, document)
+        return doc_ids
+
+    def update(self, fields, cond=None, doc_ids: Iterable[int] = None) -> List[int]:
+        target_ids = self._target_ids(cond, doc_ids)
+        if not target_ids:
+            return []
+        if callable(fields):
+            self._check_unique_transform(target_ids, fields)
+        else:
+            self._check_unique(target_ids, fields)
+        updated_ids = self._table.update(fields, doc_ids=sorted(target_ids))
+        self._reindex(updated_ids)
+        return updated_ids
+
+    def compare_and_swap(self, fields, doc_id: int, version: int) -> List[int]:
+        if doc_id not in self._projections:
+            # Removed since it was read
+            raise VersionConflictError(doc_id, version, None)
+        if callable(fields):
+            self._check_unique_transform({doc_id}, fields)
+        else:
+            self._check_unique({doc_id}, fields)
+        updated_ids = self._table.compare_and_swap(fields, doc_id, version)
+        self._reindex(updated_ids)
+        return updated_ids
+
+    def upsert(self, document: Mapping, cond=None) -> List[int]:
+        if hasattr(document, "doc_id"):
+            updated_ids = self.update(document, doc_ids=[document.doc_id])
+        else:
+            updated_ids = self.update(document, cond)
+        if updated_ids:
+            return updated_ids
+        return [self.insert(document)]
+
+    def remove(self, cond=None, doc_ids: Iterable[int] = None) -> List[int]:
+        if cond is None and doc_ids is None:
+            raise RuntimeError("Use truncate() to remove all documents")
+        target_ids = self._target_ids(cond, doc_ids)
+        if not target_ids:
+            return []
+        removed_ids = self._table.remove(doc_ids=sorted(target_ids))
+        for doc_id in removed_ids:
+            self._discard(doc_id)
+        return removed_ids
+
+    def truncate(self) -> None:
+        self._table.truncate()
+        for index in self.indexes.values():
+            index.clear()
+        self._projections.clear()
@@ -0,0 +1,393 @@
+"""
+Thread-safe access to the database tables.
+
+FastAPI runs the plain ``def`` endpoints concurrently on the AnyIO threadpool,
+while TinyDB tables, their storages and the in-memory indexes are not
+thread-safe. ``LockedTable`` guards a table with a ``ReadWriteLock``: reads run
+in parallel, writes are exclusive. Tables sharing one storage file must share
+one lock, since a write to any of them rewrites the whole file.
+
+When several worker processes serve the app, ``ProcessReadWriteLock`` extends
+the lock to the other processes with ``flock`` on a sidecar lock file, which
+also holds a write generation counter per table. A ``LockedTable`` that finds
+its table's generation changed by another process reloads its caches and
+indexes before touching the table; writes to the other tables sharing the
+lock leave it alone.
+"""
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Collection, Iterable, List, Mapping
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+from tinydb.middlewares import Middleware
+
+from eventplanner.eventplanner_backend.storage.eventplanner_indexes import (
+    UniqueConstraintError,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_versioning import (
+    VersionConflictError,
+)
+
+NESTED = "nested"
+READ = "read"
+WRITE = "write"
+
+
+class ReadWriteLock:
+    """
+    Writer-preferring reader-writer lock. A thread holding the write lock may
+    take it again or read; a thread already reading may read again even while
+    a writer waits. Upgrading a read lock to a write lock is not supported.
+    """
+
+    cross_process = False
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def _held(self) -> list:
+        if not hasattr(self._local, "modes"):
+            self._local.modes = []
+        return self._local.modes
+
+    def acquire_read(self):
+        held = self._held()
+        with self._condition:
+            if self._writer == threading.get_ident():
+                held.append(NESTED)
+                return
+            if READ not in held:
+                while self._writer is not None or self._waiting_writers:
+                    self._condition.wait()
+            if not self._readers:
+                self._acquired_shared()
+            self._readers += 1
+            held.append(READ)
+
+    def release_read(self):
+        if self._held().pop() == NESTED:
+            return
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._released_shared()
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        held = self._held()
+        with self._condition:
+            if self._writer == threading.get_ident():
+                self._writer_depth += 1
+                held.append(WRITE)
+                return
+            if READ in held:
+                raise RuntimeError("Cannot upgrade a read lock to a write lock")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._acquired_exclusive()
+            self._writer = threading.get_ident()
+            self._writer_depth = 1
+            held.append(WRITE)
+
+    def release_write(self):
+        self._held().pop()
+        with self._condition:
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._released_exclusive()
+                self._condition.notify_all()
+
+    # Called with the internal mutex held when the first reader arrives, the
+    # last reader leaves, or a writer takes or gives back the lock.
+    def _acquired_shared(self):
+        pass
+
+    def _released_shared(self):
+        pass
+
+    def _acquired_exclusive(self):
+        pass
+
+    def _released_exclusive(self):
+        pass
+
+    def generation(self, key: str = None) -> int:
+        """
+        Number of writes other processes may have made to the table ``key``,
+        see subclasses.
+        """
+        return 0
+
+    def bump_generation(self, key: str = None) -> int:
+        return 0
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield self
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield self
+        finally:
+            self.release_write()
+
+
+class ProcessReadWriteLock(ReadWriteLock):
+    """
+    ``ReadWriteLock`` that is also held against other processes: the first
+    reader takes a shared ``flock`` on ``path`` and the last one releases it,
+    writers take it exclusively. The lock file counts the writes to every
+    table in an 8 byte slot picked by a hash of the table name (the first
+    slot for ``key=None``), so a process can tell whether someone else
+    changed a table. Tables whose names share a slot only reload needlessly.
+    """
+
+    cross_process = True
+    GENERATION_SLOTS = 256
+
+    def __init__(self, path: str):
+        if fcntl is None:
+            raise RuntimeError("Cross-process locking requires fcntl (POSIX)")
+        super().__init__()
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def _acquired_shared(self):
+        fcntl.flock(self._fd, fcntl.LOCK_SH)
+
+    def _released_shared(self):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _acquired_exclusive(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def _released_exclusive(self):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _offset(self, key: str = None) -> int:
+        if key is None:
+            return 0
+        return 8 * (1 + zlib.crc32(key.encode()) % self.GENERATION_SLOTS)
+
+    def generation(self, key: str = None) -> int:
+        data = os.pread(self._fd, 8, self._offset(key))
+        return int.from_bytes(data.ljust(8, b"\0"), "little")
+
+    def bump_generation(self, key: str = None) -> int:
+        generation = self.generation(key) + 1
+        os.pwrite(self._fd, generation.to_bytes(8, "little"), self._offset(key))
+        return generation
+
+    def close(self):
+        os.close(self._fd)
+
+
+class SynchronizedMiddleware(Middleware):
+    """
+    Serializes access to storages sharing a single file handle, such as
+    ``JSONStorage``, so parallel readers do not interleave seek and read.
+    """
+
+    def __init__(self, storage_cls):
+        super().__init__(storage_cls)
+        self._mutex = threading.Lock()
+
+    def read(self):
+        with self._mutex:
+            return self.storage.read()
+
+    def write(self, data):
+        with self._mutex:
+            self.storage.write(data)
+
+    def close(self):
+        with self._mutex:
+            self.storage.close()
+
+
+class LockedTable:
+    """
+    Serializes writes and lets reads run in parallel on the wrapped table.
+    ``write_lock()`` can be held around a read-modify-write sequence that
+    must not interleave with other writers.
+
+    ``reload`` drops whatever the wrapped table caches about the stored
+    documents. It is called under the write lock by ``reload()``, and before
+    the table is used whenever the ``ProcessReadWriteLock`` generation of the
+    table's name shows another process wrote to it.
+    """
+
+    def __init__(self, table, lock: ReadWriteLock, reload: Callable = None):
+        self._table = table
+        self.lock = lock
+        self._reload = reload
+        self._generation_key = getattr(table, "name", None)
+        # Unknown until the first access, which reloads
+        self._generation = (
+            None if lock.cross_process else lock.generation(self._generation_key)
+        )
+
+    def __getattr__(self, item):
+        return getattr(self._table, item)
+
+    def __repr__(self):
+        return f"<LockedTable {self._table!r}>"
+
+    def read_lock(self):
+        return self.lock.read()
+
+    def write_lock(self):
+        return self.lock.write()
+
+    def reload(self):
+        with self.lock.write():
+            if self._reload is not None:
+                self._reload()
+
+    def _stale(self) -> bool:
+        return (
+            self.lock.cross_process
+            and self.lock.generation(self._generation_key) != self._generation
+        )
+
+    def _refresh(self):
+        # Called with the write lock held
+        if self._stale():
+            self._reload()
+            self._generation = self.lock.generation(self._generation_key)
+
+    def _read(self, operation: Callable):
+        with self.lock.read():
+            if not self._stale():
+                return operation()
+        with self.lock.write():
+            self._refresh()
+            return operation()
+
+    def _write(self, operation: Callable):
+        with self.lock.write():
+            self._refresh()
+            try:
+                result = operation()
+            except (UniqueConstraintError, VersionConflictError):
+                # Rejected before anything was written
+                raise
+            except BaseException:
+                self._bump_generation()
+                raise
+            self._bump_generation()
+            return result
+
+    def _bump_generation(self):
+        if self.lock.cross_process:
+            self._generation = self.lock.bump_generation(self._generation_key)
+
+    # Read operations
+    def __len__(self):
+        return self._read(lambda: len(self._table))
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def all(self) -> list:
+        return self._read(self._table.all)
+
+    def search(self, cond) -> list:
+        return self._read(lambda: self._table.search(cond))
+
+    def get(self, cond=None, doc_id: int = None, doc_ids: List = None):
+        return self._read(lambda: self._table.get(cond, doc_id=doc_id, doc_ids=doc_ids))
+
+    def get_by(self, field: str, value, fields: Collection[str] = None):
+        return self._read(lambda: self._table.get_by(field, value, fields))
+
+    def search_text(self, text: str, limit: int = None, index: str = "text") -> list:
+        return self._read(lambda: self._table.search_text(text, limit, index))
+
+    def search_nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        limit: int = None,
+        index: str = "coordinates",
+    ) -> list:
+        return self._read(
+            lambda: self._table.search_nearby(
+                latitude, longitude, radius_km, limit, index
+            )
+        )
+
+    def search_sorted(
+        self,
+        cond,
+        index: str,
+        limit: int,
+        after=None,
+        descending: bool = False,
+        fields: Collection[str] = None,
+    ) -> list:
+        return self._read(
+            lambda: self._table.search_sorted(
+                cond, index, limit, after, descending, fields
+            )
+        )
+
+    def explain(self, cond, index: str = None) -> List[dict]:
+        return self._read(lambda: self._table.explain(cond, index))
+
+    def contains(self, cond=None, doc_id: int = None) -> bool:
+        return self._read(lambda: self._table.contains(cond, doc_id=doc_id))
+
+    def count(self, cond) -> int:
+        return self._read(lambda: self._table.count(cond))
+
+    # Write operations
+    def insert(self, document: Mapping) -> int:
+        return self._write(lambda: self._table.insert(document))
+
+    def insert_multiple(self, documents: Iterable[Mapping]) -> List[int]:
+        return self._write(lambda: self._table.insert_multiple(documents))
+
+    def update(self, fields, cond=None, doc_ids: Iterable[int] = None) -> List[int]:
+        return self._write(lambda: self._table.update(fields, cond, doc_ids=doc_ids))
+
+    def compare_and_swap(self, fields, doc_id: int, version: int) -> List[int]:
+        return self._write(
+            lambda: self._table.compare_and_swap(fields, doc_id, version)
+        )
+
+    def upsert(self, document: Mapping, cond=None) -> List[int]:
+        return self._write(lambda: self._table.upsert(document, cond))
+
+    def remove(self, cond=None, doc_ids: Iterable[int] = None) -> List[int]:
+        return self._write(lambda: self._table.remove(cond, doc_ids=doc_ids))
+
+    def truncate(self) -> None:
+        self._write(self._table.truncate)
+
+    def rebuild(self) -> None:
+        with self.lock.write():
+            self._table.rebuild()
@@ -0,0 +1,33 @@
+"""
+Atomic update operations, in the style of ``tinydb.operations``.
+
+Passing one of these to ``table.update`` applies the change to the stored
+document while the table's write lock is held, instead of reading the
+document in the router, changing a copy and writing it back, which loses
+concurrent updates.
+
+``set_with`` and ``set_without`` compute the same changes as plain fields,
+for changes applied with a compare-and-swap (see ``update_with_retry``).
+"""
+
+
+def add_to_set(field: str, *values):
+    def transform(document):
+        document[field] = set(document.get(field) or ()) | set(values)
+
+    return transform
+
+
+def remove_from_set(field: str, *values):
+    def transform(document):
+        document[field] = set(document.get(field) or ()) - set(values)
+
+    return transform
+
+
+def set_with(document, field: str, *values) -> dict:
+    return {field: set(document.get(field) or ()) | set(values)}
+
+
+def set_without(document, field: str, *values) -> dict:
+    return {field: set(document.get(field) or ()) - set(values)}
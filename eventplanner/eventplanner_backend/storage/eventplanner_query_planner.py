@@ -0,0 +1,119 @@
+"""
+Cost-based planning of the index-backed part of a query for ``IndexedTable``.
+
+A TinyDB query hash is flattened into its conjunction of conditions. Each
+condition an index can answer is costed with ``estimate`` (the number of ids
+it resolves to, found without collecting them), the others are left to be
+evaluated on the documents. The plan starts from the most selective
+condition and narrows its candidates down with the next ones, cheapest
+first, either by intersecting with the ids the index resolves to or, when
+that set would be much larger than the candidates, by probing each
+candidate's indexed values, which are kept in memory, so no document is read
+before the candidates are final.
+"""
+from typing import Dict, List, Mapping, Optional, Set
+
+# Probing one candidate costs about as much as collecting this many ids
+PROBE_COST = 3
+
+
+class PlanStep:
+    """One condition answered by ``index``, with its estimated size."""
+
+    def __init__(self, index, operation: str, operand, estimate: int):
+        self.index = index
+        self.operation = operation
+        self.operand = operand
+        self.estimate = estimate
+
+    def resolve(self) -> Set[int]:
+        return self.index.resolve(self.operation, self.operand)
+
+    def matches(self, document: Mapping) -> bool:
+        return self.index.matches(self.operation, self.operand, document)
+
+
+class QueryPlan:
+    """
+    The indexed ``steps`` of a query, most selective first. ``exact`` is
+    false when some conditions have no index and still need to be evaluated
+    on the documents.
+    """
+
+    def __init__(self, steps: List[PlanStep], exact: bool):
+        self.steps = steps
+        self.exact = exact
+
+    def execute(
+        self, projections: Mapping[int, dict], trace: List[dict] = None
+    ) -> Set[int]:
+        """
+        The candidate ids. ``projections`` holds the indexed values of every
+        document; ``trace`` collects a description of each step taken.
+        """
+        candidates = None
+        for step in self.steps:
+            if candidates is None:
+                strategy = "lookup"
+                candidates = step.resolve()
+            elif step.estimate <= PROBE_COST * len(candidates):
+                strategy = "intersect"
+                candidates &= step.resolve()
+            else:
+                strategy = "probe"
+                candidates = {
+                    doc_id
+                    for doc_id in candidates
+                    if step.matches(projections.get(doc_id, {}))
+                }
+            if trace is not None:
+                trace.append(
+                    {
+                        "step": strategy,
+                        "index": step.index.name,
+                        "operation": step.operation,
+                        "estimated_rows": step.estimate,
+                        "rows": len(candidates),
+                    }
+                )
+            if not candidates:
+                break
+        return candidates
+
+
+def conjuncts(query_hash) -> list:
+    """The conditions of a (possibly nested) conjunction."""
+    if query_hash[0] != "and":
+        return [query_hash]
+    return [part for nested in query_hash[1] for part in conjuncts(nested)]
+
+
+def plan_query(query_hash, indexes: Dict[str, object]) -> Optional[QueryPlan]:
+    """
+    Plan the query with ``query_hash`` over ``indexes`` (keyed by field), or
+    return ``None`` if no index applies to any of its conditions.
+    """
+    if not query_hash:
+        return None
+    steps = []
+    exact = True
+    for condition in conjuncts(query_hash):
+        step = None
+        if len(condition) == 3 and len(condition[1]) == 1:
+            index = indexes.get(condition[1][0])
+            if index is not None:
+                try:
+                    estimate = index.estimate(condition[0], condition[2])
+                except TypeError:
+                    # Unhashable operand, let the table evaluate the condition
+                    estimate = None
+                if estimate is not None:
+                    step = PlanStep(index, condition[0], condition[2], estimate)
+        if step is None:
+            exact = False
+        else:
+            steps.append(step)
+    if not steps:
+        return None
+    steps.sort(key=lambda step: step.estimate)
+    return QueryPlan(steps, exact)
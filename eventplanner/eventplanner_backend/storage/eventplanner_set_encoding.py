@@ -0,0 +1,152 @@
+"""
+JSON-native encoding for ``set``/``frozenset`` document fields.
+
+A set is stored as a tagged object holding a sorted array of its elements,
+for example ``{"__set__": "str", "items": ["a", "b"]}``. The tag names the
+container (``__set__`` or ``__frozenset__``) and its value names the element
+type, so decoding is a single ``set(items)`` for plain values or one model
+validation per element for registered pydantic models. Sorting keeps the
+encoding deterministic, so unchanged documents serialize to identical JSON.
+
+``LegacySetSerializer`` is the former base64+pickle format. It is only kept to
+read databases that have not been converted yet by
+``eventplanner_set_migration``.
+"""
+import base64
+import json
+import pickle
+from typing import Any, Dict, Mapping
+
+from tinydb.middlewares import Middleware
+
+from eventplanner.eventplanner_backend.storage.eventplanner_wal_storage import (
+    DocumentsView,
+)
+
+SET_TAG = "__set__"
+FROZENSET_TAG = "__frozenset__"
+ITEMS_KEY = "items"
+LEGACY_TAG = "{TinySet}:"
+
+ELEMENT_TYPES: Dict[str, Any] = {"str": str, "int": int, "float": float}
+
+
+def register_element_types(*element_types):
+    """Allow pydantic models (e.g. ``Invitation``) to be stored inside sets."""
+    for element_type in element_types:
+        ELEMENT_TYPES[element_type.__name__] = element_type
+
+
+def _element_type_name(values) -> str | None:
+    type_names = {type(value).__name__ for value in values}
+    if len(type_names) > 1:
+        raise ValueError(f"Sets must hold a single element type, got {type_names}")
+    type_name = next(iter(type_names), None)
+    if type_name is not None and type_name not in ELEMENT_TYPES:
+        raise TypeError(f"Unregistered set element type: {type_name}")
+    return type_name
+
+
+def _sort_key(item):
+    if isinstance(item, dict):
+        return json.dumps(item, sort_keys=True)
+    return item
+
+
+def encode_set(value: set | frozenset) -> dict:
+    type_name = _element_type_name(value)
+    if type_name in (None, "str", "int", "float"):
+        items = sorted(value)
+    else:
+        items = sorted(
+            (element.model_dump(mode="json") for element in value), key=_sort_key
+        )
+    tag = FROZENSET_TAG if isinstance(value, frozenset) else SET_TAG
+    return {tag: type_name, ITEMS_KEY: items}
+
+
+def is_encoded_set(value) -> bool:
+    return isinstance(value, dict) and (SET_TAG in value or FROZENSET_TAG in value)
+
+
+def decode_set(value: Mapping) -> set | frozenset:
+    frozen = FROZENSET_TAG in value
+    element_type = ELEMENT_TYPES.get(value[FROZENSET_TAG if frozen else SET_TAG])
+    items = value[ITEMS_KEY]
+    if element_type is not None and hasattr(element_type, "model_validate"):
+        items = (element_type.model_validate(item) for item in items)
+    return frozenset(items) if frozen else set(items)
+
+
+def encode_document(document: Mapping) -> dict:
+    return {
+        field: encode_set(value) if isinstance(value, (set, frozenset)) else value
+        for field, value in document.items()
+    }
+
+
+def decode_document(document: dict, fields=None) -> dict:
+    """
+    Decode the set fields of ``document`` in place. When ``fields`` is given
+    only those fields are decoded.
+    """
+    for field in document.keys() if fields is None else fields & document.keys():
+        value = document[field]
+        if is_encoded_set(value):
+            document[field] = decode_set(value)
+        elif isinstance(value, str) and value.startswith(LEGACY_TAG):
+            document[field] = LegacySetSerializer().decode(value[len(LEGACY_TAG) :])
+    return document
+
+
+class LegacySetSerializer:
+    OBJ_CLASS = set
+
+    def encode(self, obj):
+        return base64.b64encode(pickle.dumps(obj)).decode()
+
+    def decode(self, obj: str):
+        return pickle.loads(base64.b64decode(obj))
+
+
+class SetEncodingMiddleware(Middleware):
+    """
+    TinyDB middleware storing top-level set fields with the native encoding.
+    Only documents that actually hold a set are copied on write. Tables read
+    as ``DocumentsView`` are decoded a document at a time as they are read,
+    and handed back to the storage untouched.
+    """
+
+    def read(self):
+        data = self.storage.read()
+        if data is None:
+            return None
+        for table in data.values():
+            if isinstance(table, DocumentsView):
+                table.add_transform(decode_document)
+                continue
+            for document in table.values():
+                decode_document(document)
+        return data
+
+    def write(self, data):
+        self.storage.write(
+            {
+                table_name: (
+                    table
+                    if isinstance(table, DocumentsView)
+                    else {
+                        doc_id: (
+                            encode_document(document)
+                            if any(
+                                isinstance(value, (set, frozenset))
+                                for value in document.values()
+                            )
+                            else document
+                        )
+                        for doc_id, document in table.items()
+                    }
+                )
+                for table_name, table in data.items()
+            }
+        )
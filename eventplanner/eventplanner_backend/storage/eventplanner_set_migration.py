@@ -0,0 +1,237 @@
+"""
+Convert a database from the base64+pickle set format to the JSON-native one.
+
+The JSON database is processed as a stream, one document at a time, and
+written to a temporary file that atomically replaces the original, so even
+large ``db.json`` files are migrated with constant memory. A pending
+write-ahead log next to the file is folded into the snapshot first. SQLite
+databases are migrated row by row inside a single transaction, reading a
+batch of rows at a time.
+
+Usage:
+    python eventplanner_set_migration.py db.json
+    python eventplanner_set_migration.py db.sqlite3
+"""
+import sys
+import json
+import os
+import pathlib
+import argparse
+import sqlite3
+from os.path import dirname, realpath
+from typing import Iterator, Tuple
+
+sys.path.append(
+    str(pathlib.Path(dirname(realpath(__file__)) + "../../../..").resolve())
+)
+
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
+    Invitation,
+    Notification,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_set_encoding import (
+    LEGACY_TAG,
+    LegacySetSerializer,
+    encode_set,
+    register_element_types,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_wal_storage import (
+    WriteAheadLogStorage,
+)
+
+CHUNK_SIZE = 64 * 1024
+SQLITE_SUFFIXES = (".sqlite3", ".sqlite", ".db")
+SQLITE_BATCH_SIZE = 500
+
+
+class JSONStreamReader:
+    """
+    Minimal incremental reader for the TinyDB file layout
+    ``{"table": {"doc_id": {...}, ...}, ...}``. Only one document is held in
+    memory at a time.
+    """
+
+    def __init__(self, handle, chunk_size: int = CHUNK_SIZE):
+        self._handle = handle
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._handle.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._position :] + chunk
+        self._position = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while self._position < len(self._buffer):
+                if not self._buffer[self._position].isspace():
+                    return self._buffer[self._position]
+                self._position += 1
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self._position}")
+        self._position += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number can end exactly at the buffer boundary, make sure it
+            # is not continued in the next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._position = end
+            return value
+
+    def _members(self) -> Iterator[str]:
+        self._expect("{")
+        if self._peek() == "}":
+            self._position += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            yield key
+            separator = self._peek()
+            self._position += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or '}}' at offset {self._position}")
+
+    def documents(self) -> Iterator[Tuple[str, str | None, dict | None]]:
+        """
+        Yield ``(table, None, None)`` when a table starts, then
+        ``(table, doc_id, document)`` for each of its documents.
+        """
+        if not self._peek():
+            return
+        for table_name in self._members():
+            yield table_name, None, None
+            for doc_id in self._members():
+                yield table_name, doc_id, self._value()
+
+
+def migrate_document(document: dict) -> dict:
+    legacy_serializer = LegacySetSerializer()
+    for field, value in document.items():
+        if isinstance(value, str) and value.startswith(LEGACY_TAG):
+            document[field] = encode_set(
+                legacy_serializer.decode(value[len(LEGACY_TAG) :])
+            )
+    return document
+
+
+def migrate_json_file(path: str, log_path: str = None) -> int:
+    log_path = log_path or f"{path}.wal"
+    if os.path.exists(log_path) and os.path.getsize(log_path):
+        WriteAheadLogStorage(path, log_path=log_path, compaction_interval=0).close()
+
+    migrated = 0
+    temporary_path = f"{path}.migration"
+    with open(path, encoding="utf-8") as source, open(
+        temporary_path, "w", encoding="utf-8"
+    ) as target:
+        target.write("{")
+        current_table = None
+        first_document = True
+        for table_name, doc_id, document in JSONStreamReader(source).documents():
+            if doc_id is None:
+                if current_table is not None:
+                    target.write("}, ")
+                target.write(f"{json.dumps(table_name)}: {{")
+                current_table = table_name
+                first_document = True
+                continue
+            if not first_document:
+                target.write(", ")
+            target.write(f"{json.dumps(doc_id)}: ")
+            target.write(json.dumps(migrate_document(document)))
+            first_document = False
+            migrated += 1
+        if current_table is not None:
+            target.write("}")
+        target.write("}")
+        target.flush()
+        os.fsync(target.fileno())
+    os.replace(temporary_path, path)
+    return migrated
+
+
+def sqlite_rows(
+    connection: sqlite3.Connection, table_name: str, batch_size: int
+) -> Iterator[Tuple[int, str]]:
+    """
+    The rows of the table, ``batch_size`` at a time. Each batch resumes after
+    the last doc_id, so rows can be updated while they are iterated.
+    """
+    last_doc_id = -1
+    while True:
+        rows = connection.execute(
+            f'SELECT doc_id, data FROM "{table_name}" '
+            "WHERE doc_id > ? ORDER BY doc_id LIMIT ?",
+            (last_doc_id, batch_size),
+        ).fetchall()
+        if not rows:
+            return
+        yield from rows
+        last_doc_id = rows[-1][0]
+
+
+def migrate_sqlite_file(path: str, batch_size: int = SQLITE_BATCH_SIZE) -> int:
+    migrated = 0
+    connection = sqlite3.connect(path, isolation_level=None)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        tables = [
+            row[0]
+            for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        ]
+        for table_name in tables:
+            for doc_id, data in sqlite_rows(connection, table_name, batch_size):
+                document = migrate_document(json.loads(data))
+                connection.execute(
+                    f'UPDATE "{table_name}" SET data = ? WHERE doc_id = ?',
+                    (json.dumps(document), doc_id),
+                )
+                migrated += 1
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="db.json or SQLite database file to migrate")
+    arguments = parser.parse_args()
+
+    register_element_types(Invitation, Notification)
+    if arguments.path.endswith(SQLITE_SUFFIXES):
+        migrated = migrate_sqlite_file(arguments.path)
+    else:
+        migrated = migrate_json_file(arguments.path)
+    print(f"Migrated {migrated} documents in {arguments.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Database made of one independent storage per table.
+
+With a single shared storage every write to one table rewrites (or at least
+locks) all the others. ``ShardedDatabase`` creates a separate underlying
+database for each table on first use, so writes, flushes and compactions of
+``events`` never touch the ``users`` file and the other way round.
+"""
+import os
+import threading
+from typing import Callable, Dict
+
+
+def shard_path(path: str, table_name: str | None) -> str:
+    """``db.json`` -> ``db.users.json`` for the ``users`` table."""
+    if table_name is None:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.{table_name}{extension}"
+
+
+class ShardedDatabase:
+    def __init__(self, database_factory: Callable[[str], object]):
+        self._database_factory = database_factory
+        self._shards: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def shard(self, table_name: str):
+        with self._lock:
+            if table_name not in self._shards:
+                self._shards[table_name] = self._database_factory(table_name)
+            return self._shards[table_name]
+
+    def table(self, name: str):
+        return self.shard(name).table(name)
+
+    def tables(self) -> set:
+        return set(self._shards)
+
+    def close(self):
+        with self._lock:
+            for database in self._shards.values():
+                database.close()
+            self._shards.clear()
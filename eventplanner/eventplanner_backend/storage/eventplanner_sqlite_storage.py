@@ -0,0 +1,312 @@
+"""
+SQLite storage engine for the eventplanner database.
+
+Every TinyDB table is mapped to its own SQLite table holding one row per
+document, so a write only touches the rows of the documents it changes instead
+of re-serializing the whole database file. The tables expose the same
+interface as ``tinydb.table.Table`` (insert, search, get, update, remove, ...)
+so the routers can use them without knowing which engine is configured.
+Reads by document id can be limited to some ``fields``, the set fields among
+the others are then never decoded.
+"""
+import json
+import re
+import sqlite3
+import threading
+from typing import Callable, Collection, Iterable, Iterator, List, Mapping
+
+from tinydb.table import Document
+
+from eventplanner.eventplanner_backend.storage.eventplanner_set_encoding import (
+    encode_document,
+    decode_document,
+)
+
+TABLE_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+BUSY_TIMEOUT_MS = 5000
+
+
+class SQLiteDatabase:
+    """
+    Holds one SQLite connection per thread (FastAPI runs sync endpoints on a
+    threadpool) and hands out ``SQLiteTable`` objects.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._tables = {}
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @property
+    def _depth(self) -> int:
+        return getattr(self._local, "depth", 0)
+
+    def begin(self):
+        """
+        Start a unit of work on this thread's connection; the tables' own
+        transactions join it until ``commit``.
+        """
+        if not self._depth:
+            self.connection.execute("BEGIN IMMEDIATE")
+            self._local.changes = self.connection.total_changes
+        self._local.depth = self._depth + 1
+
+    def commit(self):
+        self._local.depth -= 1
+        if not self._depth:
+            self.connection.execute("COMMIT")
+
+    def rollback(self) -> bool:
+        """Roll the unit of work back, return whether it had changed rows."""
+        self._local.depth -= 1
+        if self._depth:
+            return False
+        self.connection.execute("ROLLBACK")
+        return self.connection.total_changes != self._local.changes
+
+    def table(self, name: str) -> "SQLiteTable":
+        if name not in self._tables:
+            self._tables[name] = SQLiteTable(self, name)
+        return self._tables[name]
+
+    def tables(self) -> set:
+        rows = self.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    @staticmethod
+    def encode(document: Mapping) -> str:
+        return json.dumps(encode_document(document))
+
+    @staticmethod
+    def decode(data: str, fields: Collection[str] = None) -> dict:
+        document = json.loads(data)
+        if fields is not None:
+            document = {field: document[field] for field in fields if field in document}
+        return decode_document(document, fields)
+
+
+class SQLiteTable:
+    """
+    A drop-in replacement for ``tinydb.table.Table`` backed by an SQLite table.
+
+    Queries are regular TinyDB ``Query`` objects and are evaluated in Python on
+    the decoded documents; mutations are applied row by row inside a single
+    ``BEGIN IMMEDIATE`` transaction so concurrent writers never interleave.
+    """
+
+    document_class = Document
+    # ``get`` by document id accepts ``fields``
+    projects_fields = True
+
+    def __init__(self, database: SQLiteDatabase, name: str):
+        if not TABLE_NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid table name: {name}")
+        self._database = database
+        self._name = name
+        self._database.connection.execute(
+            f'CREATE TABLE IF NOT EXISTS "{name}" '
+            "(doc_id INTEGER PRIMARY KEY, data TEXT NOT NULL)"
+        )
+
+    def __repr__(self):
+        return f"<SQLiteTable name='{self._name}', total={len(self)}>"
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        return self._database.connection
+
+    def _rows(self) -> Iterator[Document]:
+        cursor = self._connection.execute(
+            f'SELECT doc_id, data FROM "{self._name}" ORDER BY doc_id'
+        )
+        for doc_id, data in cursor:
+            yield self.document_class(self._database.decode(data), doc_id)
+
+    def _row(self, doc_id: int, fields: Collection[str] = None) -> Document | None:
+        row = self._connection.execute(
+            f'SELECT data FROM "{self._name}" WHERE doc_id = ?', (doc_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return self.document_class(self._database.decode(row[0], fields), doc_id)
+
+    def _write_transaction(self, operation: Callable):
+        connection = self._connection
+        if connection.in_transaction:
+            return operation(connection)
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = operation(connection)
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return result
+
+    def _insert_row(self, connection: sqlite3.Connection, document: Mapping) -> int:
+        if not isinstance(document, Mapping):
+            raise ValueError("Document is not a Mapping")
+        data = self._database.encode(document)
+        if isinstance(document, self.document_class):
+            if self._row(document.doc_id) is not None:
+                raise ValueError(
+                    f"Document with ID {str(document.doc_id)} already exists"
+                )
+            connection.execute(
+                f'INSERT INTO "{self._name}" (doc_id, data) VALUES (?, ?)',
+                (document.doc_id, data),
+            )
+            return document.doc_id
+        cursor = connection.execute(
+            f'INSERT INTO "{self._name}" (data) VALUES (?)', (data,)
+        )
+        return cursor.lastrowid
+
+    def insert(self, document: Mapping) -> int:
+        return self._write_transaction(
+            lambda connection: self._insert_row(connection, document)
+        )
+
+    def insert_multiple(self, documents: Iterable[Mapping]) -> List[int]:
+        return self._write_transaction(
+            lambda connection: [
+                self._insert_row(connection, document) for document in documents
+            ]
+        )
+
+    def all(self) -> List[Document]:
+        return list(self._rows())
+
+    def search(self, cond) -> List[Document]:
+        return [document for document in self._rows() if cond(document)]
+
+    def get(
+        self,
+        cond=None,
+        doc_id: int = None,
+        doc_ids: List = None,
+        fields: Collection[str] = None,
+    ):
+        if doc_id is not None:
+            return self._row(doc_id, fields)
+        if doc_ids is not None:
+            return [
+                document
+                for document in (self._row(doc_id_, fields) for doc_id_ in doc_ids)
+                if document is not None
+            ]
+        if cond is not None:
+            for document in self._rows():
+                if cond(document):
+                    return document
+            return None
+        raise RuntimeError("You have to pass either cond or doc_id or doc_ids")
+
+    def contains(self, cond=None, doc_id: int = None) -> bool:
+        if doc_id is not None:
+            return self._row(doc_id) is not None
+        if cond is not None:
+            return self.get(cond) is not None
+        raise RuntimeError("You have to pass either cond or doc_id")
+
+    def _matching(self, cond=None, doc_ids: Iterable[int] = None) -> List[Document]:
+        if doc_ids is not None:
+            return self.get(doc_ids=list(doc_ids))
+        if cond is not None:
+            return self.search(cond)
+        return self.all()
+
+    def update(self, fields, cond=None, doc_ids: Iterable[int] = None) -> List[int]:
+        def operation(connection: sqlite3.Connection):
+            updated_ids = []
+            for document in self._matching(cond, doc_ids):
+                if callable(fields):
+                    fields(document)
+                else:
+                    document.update(fields)
+                connection.execute(
+                    f'UPDATE "{self._name}" SET data = ? WHERE doc_id = ?',
+                    (self._database.encode(document), document.doc_id),
+                )
+                updated_ids.append(document.doc_id)
+            return updated_ids
+
+        return self._write_transaction(operation)
+
+    def upsert(self, document: Mapping, cond=None) -> List[int]:
+        if isinstance(document, self.document_class):
+            doc_ids = [document.doc_id]
+        else:
+            doc_ids = None
+        if doc_ids is None and cond is None:
+            raise ValueError(
+                "If you don't specify a search query, you must specify a doc_id."
+            )
+
+        def operation(_connection: sqlite3.Connection):
+            updated_ids = self.update(document, cond, doc_ids)
+            if updated_ids:
+                return updated_ids
+            return [self.insert(document)]
+
+        return self._write_transaction(operation)
+
+    def remove(self, cond=None, doc_ids: Iterable[int] = None) -> List[int]:
+        if cond is None and doc_ids is None:
+            raise RuntimeError("Use truncate() to remove all documents")
+
+        def operation(connection: sqlite3.Connection):
+            removed_ids = [
+                document.doc_id for document in self._matching(cond, doc_ids)
+            ]
+            connection.executemany(
+                f'DELETE FROM "{self._name}" WHERE doc_id = ?',
+                [(doc_id,) for doc_id in removed_ids],
+            )
+            return removed_ids
+
+        return self._write_transaction(operation)
+
+    def truncate(self) -> None:
+        self._write_transaction(
+            lambda connection: connection.execute(f'DELETE FROM "{self._name}"')
+        )
+
+    def count(self, cond) -> int:
+        return len(self.search(cond))
+
+    def clear_cache(self) -> None:
+        """SQLite tables do not keep a query cache."""
+
+    def __len__(self):
+        return self._connection.execute(
+            f'SELECT COUNT(*) FROM "{self._name}"'
+        ).fetchone()[0]
+
+    def __iter__(self) -> Iterator[Document]:
+        return iter(self.all())
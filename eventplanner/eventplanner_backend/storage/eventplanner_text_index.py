@@ -0,0 +1,152 @@
+"""
+In-memory full-text index for ``IndexedTable``.
+
+``TextIndex`` tokenizes the text fields of every document into lowercase
+words and keeps, for each word, the documents holding it and how often
+(the posting list), plus a sorted vocabulary for prefix matching. Like the
+other indexes it is updated incrementally by ``IndexedTable`` on every
+write and rebuilt when the table is loaded.
+
+``search`` ranks documents with Okapi BM25: each query word is expanded to
+the vocabulary words it is a prefix of, and only the posting lists of those
+words are visited, so the cost depends on how common the words are rather
+than on the size of the table.
+"""
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
+
+WORD_PATTERN = re.compile(r"\w+")
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Bounds the work done for very short prefixes such as "a"
+MAX_PREFIX_EXPANSIONS = 64
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words of ``text`` with accents removed."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return WORD_PATTERN.findall(text)
+
+
+class TextIndex:
+    """
+    Inverted index over the string ``fields`` of a document, registered in
+    ``IndexedTable.indexes`` under ``name``.
+    """
+
+    unique = False
+
+    def __init__(self, *fields: str, name: str = "text"):
+        self.name = name
+        self._fields = fields
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._vocabulary: List[str] = []
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+
+    @property
+    def fields(self) -> tuple:
+        return self._fields
+
+    def keys(self, document: Mapping) -> Iterable[Hashable]:
+        return tokenize(
+            " ".join(
+                document[field]
+                for field in self._fields
+                if isinstance(document.get(field), str)
+            )
+        )
+
+    def add(self, doc_id: int, document: Mapping):
+        words = list(self.keys(document))
+        for word, frequency in Counter(words).items():
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = {}
+                insort(self._vocabulary, word)
+            postings[doc_id] = frequency
+        self._lengths[doc_id] = len(words)
+        self._total_length += len(words)
+
+    def remove(self, doc_id: int, document: Mapping):
+        for word in set(self.keys(document)):
+            postings = self._postings.get(word)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[word]
+                del self._vocabulary[bisect_left(self._vocabulary, word)]
+        self._total_length -= self._lengths.pop(doc_id, 0)
+
+    def clear(self):
+        self._postings.clear()
+        self._vocabulary.clear()
+        self._lengths.clear()
+        self._total_length = 0
+
+    def check(self, doc_ids: Set[int], document: Mapping):
+        pass
+
+    def lookup(self, word: str) -> Set[int]:
+        return set(self._postings.get(word, ()))
+
+    def resolve(self, operation: str, operand) -> Optional[Set[int]]:
+        # Queries on the individual text fields are not answered from here
+        return None
+
+    def estimate(self, operation: str, operand) -> Optional[int]:
+        return None
+
+    def expand(self, prefix: str) -> List[str]:
+        """Vocabulary words starting with ``prefix``, shortest first."""
+        position = bisect_left(self._vocabulary, prefix)
+        words = []
+        while position < len(self._vocabulary):
+            word = self._vocabulary[position]
+            if not word.startswith(prefix):
+                break
+            words.append(word)
+            position += 1
+        if len(words) > MAX_PREFIX_EXPANSIONS:
+            words = heapq.nsmallest(MAX_PREFIX_EXPANSIONS, words, key=len)
+        return words
+
+    def search(self, text: str, limit: int = None) -> List[Tuple[int, float]]:
+        """
+        ``(doc_id, score)`` of the documents matching any word of ``text``
+        (or a word it is a prefix of), best first. An exact word match
+        scores higher than a longer word it is only a prefix of.
+        """
+        if not self._lengths:
+            return []
+        count = len(self._lengths)
+        lengths = self._lengths
+        # BM25 length normalization: k1 * (1 - b + b * length / average)
+        constant_norm = BM25_K1 * (1 - BM25_B)
+        length_norm = BM25_K1 * BM25_B / (self._total_length / count or 1)
+        scores: Dict[int, float] = {}
+        for query_word in set(tokenize(text)):
+            for word in self.expand(query_word):
+                postings = self._postings[word]
+                matches = len(postings)
+                idf = math.log(1 + (count - matches + 0.5) / (matches + 0.5))
+                # Prefix matches count less the more they had to be completed
+                weight = idf * (BM25_K1 + 1) * len(query_word) / len(word)
+                for doc_id, frequency in postings.items():
+                    norm = constant_norm + length_norm * lengths[doc_id]
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * frequency / (
+                        frequency + norm
+                    )
+        ranked = ((score, -doc_id) for doc_id, score in scores.items())
+        if limit is None:
+            best = sorted(ranked, reverse=True)
+        else:
+            best = heapq.nlargest(limit, ranked)
+        return [(-doc_id, score) for score, doc_id in best]
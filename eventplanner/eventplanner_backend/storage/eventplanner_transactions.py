@@ -0,0 +1,118 @@
+"""
+Unit of work spanning several tables.
+
+Inside ``unit_of_work`` every write of the participating tables is buffered
+by their storage and flushed once when the block exits: TinyDB storages keep
+the written data in ``TransactionMiddleware`` and write it back in a single
+``write``, SQLite databases run everything in one ``BEGIN IMMEDIATE``
+transaction. If the block raises, the buffers are dropped and the tables
+reload their indexes, so no half-applied change is ever stored.
+
+The write locks of all participating tables are held for the whole block, in
+an order every process agrees on (lock file path, or table name) so
+concurrent units of work cannot deadlock. With one storage file per table the
+flush of each file is atomic, but a crash between two files can still leave
+one of them behind.
+"""
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Iterable, Tuple
+
+from tinydb.middlewares import Middleware
+
+
+class TransactionMiddleware(Middleware):
+    """
+    Buffers the writes made by a thread between ``begin`` and ``commit`` and
+    serves that thread's reads from the buffer. Other threads keep seeing the
+    stored data, although the table locks keep them out while a unit of work
+    is open.
+    """
+
+    def __init__(self, storage_cls):
+        super().__init__(storage_cls)
+        self._local = threading.local()
+
+    @property
+    def _depth(self) -> int:
+        return getattr(self._local, "depth", 0)
+
+    def begin(self):
+        if not self._depth:
+            self._local.buffer = None
+        self._local.depth = self._depth + 1
+
+    def commit(self):
+        self._local.depth -= 1
+        if self._depth:
+            return
+        buffer, self._local.buffer = self._local.buffer, None
+        if buffer is not None:
+            self.storage.write(buffer)
+
+    def rollback(self) -> bool:
+        """Drop the buffered writes, return whether there were any."""
+        self._local.depth -= 1
+        if self._depth:
+            # Nested units of work join the outermost one, which decides
+            return False
+        buffer, self._local.buffer = self._local.buffer, None
+        return buffer is not None
+
+    def read(self):
+        if not self._depth:
+            return self.storage.read()
+        data = self._local.buffer
+        if data is None:
+            data = self.storage.read()
+            if data is None:
+                return None
+        # TinyDB edits the documents it reads in place before writing them
+        # back, so hand out copies and keep the buffer (and storages handing
+        # out their own state) as they were.
+        return {
+            table_name: {doc_id: dict(document) for doc_id, document in table.items()}
+            for table_name, table in data.items()
+        }
+
+    def write(self, data):
+        if self._depth:
+            self._local.buffer = data
+        else:
+            self.storage.write(data)
+
+
+@contextmanager
+def unit_of_work(participants: Iterable[Tuple[object, object]]):
+    """
+    Hold the write locks of the ``(table, unit)`` pairs in ``participants``
+    and buffer the writes of their units (``TransactionMiddleware`` or
+    ``SQLiteDatabase`` objects with ``begin``, ``commit`` and ``rollback``)
+    until the block exits. Nested units of work join the outermost one.
+    """
+    participants = list(participants)
+    units = list({id(unit): unit for _, unit in participants}.values())
+    # Every process takes the locks in the same order, by lock file (or by
+    # table name for locks held in this process only), so that two units of
+    # work over the same tables cannot each hold one lock the other waits on
+    locks = {}
+    for table, _ in participants:
+        key = getattr(table.lock, "path", None) or table.name
+        if id(table.lock) in locks:
+            key = min(key, locks[id(table.lock)][0])
+        locks[id(table.lock)] = (key, table.lock)
+    with ExitStack() as stack:
+        for _, lock in sorted(locks.values(), key=lambda item: item[0]):
+            stack.enter_context(lock.write())
+        for unit in units:
+            unit.begin()
+        try:
+            yield
+        except BaseException:
+            dirty = {id(unit) for unit in units if unit.rollback()}
+            for table, unit in participants:
+                if id(unit) in dirty:
+                    table.reload()
+            raise
+        for unit in units:
+            unit.commit()
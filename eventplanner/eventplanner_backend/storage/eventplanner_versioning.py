@@ -0,0 +1,156 @@
+"""
+Optimistic concurrency control for the database tables.
+
+Every document carries a version counter in ``VERSION_FIELD`` that is bumped
+on each write. ``compare_and_swap`` only applies a change if the document is
+still at the version it was read at, and ``update_with_retry`` builds the
+usual read-modify-write on top of it: the change is computed from a plain
+read, without holding the write lock, and recomputed from a fresh read when
+another writer got there first.
+"""
+import random
+import time
+from typing import Callable, Iterable, List, Mapping, Optional
+
+from tinydb.table import Document
+
+VERSION_FIELD = "_version"
+CAS_ATTEMPTS = 8
+CAS_BACKOFF_SECONDS = 0.001
+
+
+class VersionConflictError(RuntimeError):
+    def __init__(self, doc_id: int, expected: int, actual: int | None):
+        super().__init__(
+            f"Document {doc_id} is at version {actual}, expected {expected}"
+        )
+        self.doc_id = doc_id
+        self.expected = expected
+        self.actual = actual
+
+
+def version_of(document: Mapping) -> int:
+    # Documents written before versioning was introduced start at 0
+    return document.get(VERSION_FIELD, 0)
+
+
+def _apply(fields, document: dict):
+    if callable(fields):
+        fields(document)
+    else:
+        document.update(fields)
+
+
+class VersionedTable:
+    """
+    Stamps inserted documents with version 1 and bumps the version of every
+    document an update touches. Anything not overridden here is delegated to
+    the wrapped table.
+    """
+
+    def __init__(self, table):
+        self._table = table
+
+    def __getattr__(self, item):
+        return getattr(self._table, item)
+
+    def __len__(self):
+        return len(self._table)
+
+    def __iter__(self):
+        return iter(self._table)
+
+    def __repr__(self):
+        return f"<VersionedTable {self._table!r}>"
+
+    @staticmethod
+    def _stamp(document: Mapping) -> Mapping:
+        stamped = dict(document, **{VERSION_FIELD: 1})
+        if isinstance(document, Document):
+            return Document(stamped, document.doc_id)
+        return stamped
+
+    @staticmethod
+    def _bumping(fields) -> Callable:
+        def transform(document):
+            _apply(fields, document)
+            document[VERSION_FIELD] = version_of(document) + 1
+
+        return transform
+
+    def insert(self, document: Mapping) -> int:
+        return self._table.insert(self._stamp(document))
+
+    def insert_multiple(self, documents: Iterable[Mapping]) -> List[int]:
+        return self._table.insert_multiple(
+            [self._stamp(document) for document in documents]
+        )
+
+    def update(self, fields, cond=None, doc_ids: Iterable[int] = None) -> List[int]:
+        return self._table.update(self._bumping(fields), cond, doc_ids=doc_ids)
+
+    def upsert(self, document: Mapping, cond=None) -> List[int]:
+        if hasattr(document, "doc_id"):
+            updated_ids = self.update(document, doc_ids=[document.doc_id])
+        else:
+            updated_ids = self.update(document, cond)
+        if updated_ids:
+            return updated_ids
+        return [self.insert(document)]
+
+    def compare_and_swap(self, fields, doc_id: int, version: int) -> List[int]:
+        """
+        Apply ``fields`` (a mapping or an operation) to document ``doc_id``
+        only if it is still at ``version``, otherwise raise
+        ``VersionConflictError`` without writing anything.
+        """
+
+        def transform(document):
+            if version_of(document) != version:
+                raise VersionConflictError(doc_id, version, version_of(document))
+            _apply(fields, document)
+
+        return self.update(transform, doc_ids=[doc_id])
+
+
+def update_with_retry(
+    table,
+    cond,
+    change: Callable[[dict], Optional[Mapping]],
+    attempts: int = CAS_ATTEMPTS,
+) -> Optional[List[int]]:
+    """
+    Optimistic read-modify-write of the first document matching ``cond``.
+
+    ``change`` receives the current document and returns the fields to store,
+    or ``None`` when there is nothing to write; it may be called more than
+    once and must not have side effects. Raising from ``change`` aborts the
+    update. Returns ``None`` if no document matches, otherwise the updated
+    document ids. After ``attempts`` conflicts the change is computed and
+    applied while holding the table's write lock, so hot documents still make
+    progress.
+    """
+    for attempt in range(attempts):
+        document = table.get(cond)
+        if document is None:
+            return None
+        fields = change(document)
+        if fields is None:
+            return []
+        try:
+            return table.compare_and_swap(
+                fields, document.doc_id, version_of(document)
+            )
+        except VersionConflictError:
+            time.sleep(random.uniform(0, CAS_BACKOFF_SECONDS * 2**attempt))
+
+    with table.write_lock():
+        document = table.get(cond)
+        if document is None:
+            return None
+        fields = change(document)
+        if fields is None:
+            return []
+        return table.compare_and_swap(
+            fields, document.doc_id, version_of(document)
+        )
@@ -0,0 +1,231 @@
+"""
+Append-only write-ahead log storage for TinyDB.
+
+TinyDB hands the whole database to ``Storage.write`` on every mutation. Instead
+of rewriting ``db.json`` each time, ``WriteAheadLogStorage`` compares the new
+state with the last one it has seen and appends only the changed documents to
+a log file, one JSON line per write. On startup the snapshot is loaded and the
+log is replayed on top of it; a background thread periodically compacts the
+log into a fresh snapshot.
+
+Reads hand out a ``DocumentsView`` per table instead of copying the database:
+documents are copied when a caller first reads them. A view written back as
+it was handed out marks a table the write did not touch, so only the tables
+TinyDB actually rebuilt are compared with the stored state.
+
+Every log line describes absolute document states (``put``/``del``), so
+replaying a line twice is harmless. A line cut short by a crash is detected on
+startup and dropped, which keeps the on-disk state recoverable.
+"""
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from tinydb.storages import Storage, touch
+
+PUT = "put"
+DELETE = "del"
+DROP = "drop"
+
+
+class DocumentsView(Mapping):
+    """
+    Read-only view of the stored ``documents`` of a table that copies each
+    document the first time it is read, then runs the ``transforms`` added
+    with ``add_transform`` on the copy. Callers may change the copies freely.
+    """
+
+    def __init__(self, documents: Dict[str, dict]):
+        self.documents = documents
+        self._copies: Dict[str, dict] = {}
+        self._transforms: List[Callable[[dict], None]] = []
+
+    def add_transform(self, transform: Callable[[dict], None]):
+        for document in self._copies.values():
+            transform(document)
+        self._transforms.append(transform)
+
+    def __getitem__(self, doc_id: str) -> dict:
+        document = self._copies.get(doc_id)
+        if document is None:
+            document = dict(self.documents[doc_id])
+            for transform in self._transforms:
+                transform(document)
+            self._copies[doc_id] = document
+        return document
+
+    def __contains__(self, doc_id) -> bool:
+        return doc_id in self.documents
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.documents)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+
+class WriteAheadLogStorage(Storage):
+    def __init__(
+        self,
+        path: str,
+        log_path: Optional[str] = None,
+        compaction_interval: float = 60.0,
+        max_log_size: int = 4 * 1024 * 1024,
+        fsync: bool = True,
+    ):
+        self.path = path
+        self.log_path = log_path or f"{path}.wal"
+        self.max_log_size = max_log_size
+        self.fsync = fsync
+
+        self._lock = threading.RLock()
+        self._tables: Dict[str, Dict[str, dict]] = {}
+        self._log_size = 0
+
+        touch(self.path, create_dirs=False)
+        touch(self.log_path, create_dirs=False)
+        self._load_snapshot()
+        self._replay_log()
+        self._log_handle = open(self.log_path, "a", encoding="utf-8")
+
+        self._compaction_requested = threading.Event()
+        self._closed = threading.Event()
+        self._compaction_thread = None
+        if compaction_interval:
+            self._compaction_thread = threading.Thread(
+                target=self._compaction_loop,
+                args=(compaction_interval,),
+                name=f"wal-compaction-{os.path.basename(path)}",
+                daemon=True,
+            )
+            self._compaction_thread.start()
+
+    # Storage interface
+    def read(self) -> Optional[Dict[str, Mapping[str, dict]]]:
+        with self._lock:
+            # The stored tables are replaced, never changed, by writes, so
+            # the views stay consistent. Documents are copied on access so
+            # callers (e.g. the serialization middleware decoding fields in
+            # place) never mutate the cache.
+            return {
+                table_name: DocumentsView(table)
+                for table_name, table in self._tables.items()
+            }
+
+    def write(self, data: Dict[str, Mapping[str, dict]]) -> None:
+        with self._lock:
+            tables, operations = self._diff(data)
+            if not operations:
+                return
+            self._append(operations)
+            self._tables = tables
+        if self._log_size >= self.max_log_size:
+            self._compaction_requested.set()
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._compaction_requested.set()
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+        with self._lock:
+            self.compact()
+            self._log_handle.close()
+
+    # Log handling
+    def _diff(
+        self, data: Dict[str, Mapping[str, dict]]
+    ) -> Tuple[Dict[str, Dict[str, dict]], List[list]]:
+        """The tables to store for ``data`` and the operations to log."""
+        tables = {}
+        operations = []
+        for table_name in self._tables.keys() - data.keys():
+            operations.append([DROP, table_name])
+        for table_name, table in data.items():
+            previous = self._tables.get(table_name, {})
+            if isinstance(table, DocumentsView):
+                if table.documents is previous:
+                    # Handed out by read and not written since
+                    tables[table_name] = previous
+                    continue
+                # Read before another write replaced the table
+                table = table.documents
+            for doc_id, document in table.items():
+                if previous.get(doc_id) != document:
+                    operations.append([PUT, table_name, doc_id, document])
+            for doc_id in previous.keys() - table.keys():
+                operations.append([DELETE, table_name, doc_id])
+            tables[table_name] = dict(table)
+        return tables, operations
+
+    def _append(self, operations: List[list]):
+        line = json.dumps(operations) + "\n"
+        self._log_handle.write(line)
+        self._log_handle.flush()
+        if self.fsync:
+            os.fsync(self._log_handle.fileno())
+        self._log_size += len(line.encode("utf-8"))
+
+    def _apply(self, operations: List[list]):
+        for operation in operations:
+            if operation[0] == PUT:
+                _, table_name, doc_id, document = operation
+                self._tables.setdefault(table_name, {})[doc_id] = document
+            elif operation[0] == DELETE:
+                _, table_name, doc_id = operation
+                self._tables.get(table_name, {}).pop(doc_id, None)
+            elif operation[0] == DROP:
+                self._tables.pop(operation[1], None)
+
+    def _load_snapshot(self):
+        with open(self.path, encoding="utf-8") as handle:
+            content = handle.read()
+        self._tables = json.loads(content) if content.strip() else {}
+
+    def _replay_log(self):
+        valid_size = 0
+        with open(self.log_path, "rb") as handle:
+            for raw_line in handle:
+                if not raw_line.endswith(b"\n"):
+                    break
+                try:
+                    operations = json.loads(raw_line)
+                except ValueError:
+                    break
+                self._apply(operations)
+                valid_size += len(raw_line)
+        if valid_size != os.path.getsize(self.log_path):
+            # Drop the torn tail left behind by a crash mid-append
+            with open(self.log_path, "r+b") as handle:
+                handle.truncate(valid_size)
+        self._log_size = valid_size
+
+    # Compaction
+    def compact(self):
+        """
+        Rewrite the snapshot from the in-memory state and empty the log.
+        The snapshot is replaced atomically, so a crash at any point leaves
+        either the old snapshot plus the full log or the new snapshot.
+        """
+        with self._lock:
+            if not self._log_size:
+                return
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as handle:
+                json.dump(self._tables, handle)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temporary_path, self.path)
+            self._log_handle.truncate(0)
+            self._log_handle.seek(0)
+            self._log_size = 0
+
+    def _compaction_loop(self, interval: float):
+        while not self._closed.is_set():
+            self._compaction_requested.wait(interval)
+            self._compaction_requested.clear()
+            if self._closed.is_set():
+                return
+            self.compact()
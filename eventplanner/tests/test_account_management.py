@@ -20,6 +20,8 @@ from eventplanner.eventplanner_backend.app.eventplanner_main import app
 from eventplanner.eventplanner_backend.eventplanner_database import (
     users_table,
     event_table,
+    invitation_table,
+    notifications_table,
 user_query
 )
 
@@ -191,15 +193,35 @@ def test_delete_user_with_valid_token():
         assert response.status_code == 200
         assert "access_token" in response.json()
 
+        # Rows of the user in the other tables, and of someone else
+        uid = users_table.get_by("username", "testuser")["id"]
+        notifications_table.insert_multiple(
+            [
+                {"id": "mine", "user_id": uid, "time": 1.0, "read": False},
+                {"id": "other", "user_id": "other", "time": 1.0, "read": False},
+            ]
+        )
+        invitation_table.insert_multiple(
+            [
+                {"id": "sent", "start_user": uid, "end_user": "other"},
+                {"id": "received", "start_user": "other", "end_user": uid},
+                {"id": "unrelated", "start_user": "other", "end_user": "third"},
+            ]
+        )
+
         # Delete user account using authentication token
         access_token = response.json()["access_token"]
         headers = {"Authorization": f"Bearer {access_token}"}
         response = client.delete("/users/delete", headers=headers)
         assert response.status_code == 200
         assert "Account successfully deleted" in response.json()["message"]
+        assert [row["id"] for row in notifications_table.all()] == ["other"]
+        assert [row["id"] for row in invitation_table.all()] == ["unrelated"]
     finally:
         users_table.truncate()
         event_table.truncate()
+        notifications_table.truncate()
+        invitation_table.truncate()
 
 
 def test_update_user_success():
@@ -297,3 +319,32 @@ def test_get_existing_user_by_username():
     finally:
         users_table.truncate()
         event_table.truncate()
+
+
+def test_get_user_returns_only_the_requested_fields():
+    try:
+        response = client.post(
+            "/users/register",
+            json={
+                "username": "testuser",
+                "email": "testuser@example.com",
+                "password": "password123",
+            },
+        )
+        assert response.status_code == 200
+        uid = response.json()["uid"]
+
+        response = client.get("/users/testuser", params={"fields": "id, username"})
+        assert response.status_code == 200
+        assert response.json() == {"id": uid, "username": "testuser"}
+
+        response = client.get("/users/testuser", params={"fields": "friends"})
+        assert response.json() == {"friends": None}
+
+        response = client.get("/users/testuser", params={"fields": "id,secret"})
+        assert response.status_code == 400
+        response = client.get("/users/missing", params={"fields": "id"})
+        assert response.status_code == 404
+    finally:
+        users_table.truncate()
+        event_table.truncate()
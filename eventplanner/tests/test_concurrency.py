@@ -0,0 +1,267 @@
+"""
+Test module for concurrent access to the tables.
+
+It checks that:
+    - the reader-writer lock lets readers share and keeps writers exclusive
+    - no participant is lost when 200 users join the same event at once
+    - every write bumps the document version and a stale compare-and-swap
+      is rejected
+    - optimistic updates retried on conflict lose no increments
+    - concurrent joins and leaves on one event keep a consistent state
+    - accepting an invitation while its event is deleted does not deadlock
+"""
+import sys
+import time
+import pytest
+import pathlib
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from os.path import dirname, realpath
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+from tinydb import Query
+from fastapi.testclient import TestClient
+from eventplanner.eventplanner_backend.app.eventplanner_main import app
+from eventplanner.eventplanner_backend.authentication import (
+    eventplanner_authentication_helper as auth_helper,
+)
+from eventplanner.eventplanner_backend.eventplanner_database import (
+    users_table,
+    event_table,
+    invitation_table,
+    memberships_table,
+    memberships_query,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
+    User,
+    Event,
+    Invitation,
+    InvitationType,
+    MembershipRole,
+)
+from eventplanner.eventplanner_backend.api_routers.shared_functions import (
+    add_membership,
+    has_membership,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_locking import (
+    ReadWriteLock,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_versioning import (
+    VersionConflictError,
+    update_with_retry,
+    version_of,
+)
+
+client = TestClient(app)
+JOINING_USERS = 200
+
+
+def test_readers_share_and_writers_are_exclusive():
+    lock = ReadWriteLock()
+    active_readers = []
+    events = []
+
+    def reader():
+        with lock.read():
+            active_readers.append(1)
+            time.sleep(0.05)
+            events.append(("read", len(active_readers)))
+            active_readers.pop()
+
+    def writer():
+        with lock.write():
+            events.append(("write", len(active_readers)))
+            with lock.write(), lock.read():
+                pass
+
+    threads = [threading.Thread(target=reader) for _ in range(5)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(count for kind, count in events if kind == "read") > 1
+    assert [count for kind, count in events if kind == "write"] == [0]
+
+
+def test_concurrent_joins_do_not_lose_participants():
+    try:
+        users = [
+            User(
+                id=f"user-{i}",
+                username=f"user{i}",
+                email=f"user{i}@example.com",
+                password="unused",
+            )
+            for i in range(JOINING_USERS)
+        ]
+        users_table.insert_multiple(user.model_dump() for user in users)
+        event = Event(id="event", title="Hot event", public=True, organizer_id="x")
+        event_table.insert(event.model_dump())
+
+        def join(user: User):
+            token = auth_helper.create_access_token(data=user, version=0)
+            return client.get(
+                "/events/event/join", headers={"Authorization": f"Bearer {token}"}
+            ).status_code
+
+        with ThreadPoolExecutor(max_workers=50) as executor:
+            status_codes = list(executor.map(join, users))
+
+        assert status_codes == [200] * JOINING_USERS
+        participants = memberships_table.search(memberships_query.event_id == "event")
+        assert {membership["user_id"] for membership in participants} == {
+            user.id for user in users
+        }
+    finally:
+        users_table.truncate()
+        event_table.truncate()
+        memberships_table.truncate()
+
+
+def test_writes_bump_version_and_stale_swap_is_rejected():
+    try:
+        event = Event(id="event", title="Versioned event", organizer_id="x")
+        event_table.insert(event.model_dump())
+        stored = event_table.get_by("id", "event")
+        assert version_of(stored) == 1
+
+        event_table.compare_and_swap({"public": True}, stored.doc_id, 1)
+        assert version_of(event_table.get_by("id", "event")) == 2
+
+        with pytest.raises(VersionConflictError):
+            event_table.compare_and_swap({"public": False}, stored.doc_id, 1)
+        assert event_table.get_by("id", "event")["public"] is True
+
+        event_table.update({"title": "Renamed"}, doc_ids=[stored.doc_id])
+        assert version_of(event_table.get_by("id", "event")) == 3
+    finally:
+        event_table.truncate()
+
+
+def test_retried_updates_lose_no_increments():
+    try:
+        event = Event(id="event", title="Counter", organizer_id="x")
+        event_table.insert(event.model_dump() | {"counter": 0})
+        query = Query().id == "event"
+
+        def increment(_):
+            return update_with_retry(
+                event_table, query, lambda event: {"counter": event["counter"] + 1}
+            )
+
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            list(executor.map(increment, range(100)))
+
+        stored = event_table.get_by("id", "event")
+        assert stored["counter"] == 100
+        assert version_of(stored) == 101
+    finally:
+        event_table.truncate()
+
+
+def test_concurrent_joins_and_leaves_keep_consistent_state():
+    try:
+        users = [
+            User(
+                id=f"user-{i}",
+                username=f"user{i}",
+                email=f"user{i}@example.com",
+                password="unused",
+            )
+            for i in range(100)
+        ]
+        users_table.insert_multiple(user.model_dump() for user in users)
+        event = Event(id="event", title="Hot event", public=True, organizer_id="x")
+        event_table.insert(event.model_dump())
+        joined = {user.id for user in users[::2]}
+        for user_id in joined:
+            add_membership("event", user_id, MembershipRole.PARTICIPANT)
+
+        def join_or_leave(user: User):
+            token = auth_helper.create_access_token(data=user, version=0)
+            headers = {"Authorization": f"Bearer {token}"}
+            if user.id in joined:
+                return client.delete("/events/event/leave", headers=headers)
+            return client.get("/events/event/join", headers=headers)
+
+        with ThreadPoolExecutor(max_workers=50) as executor:
+            responses = list(executor.map(join_or_leave, users))
+
+        assert {response.status_code for response in responses} == {200}
+        participants = memberships_table.search(memberships_query.event_id == "event")
+        assert {membership["user_id"] for membership in participants} == {
+            user.id for user in users[1::2]
+        }
+    finally:
+        users_table.truncate()
+        event_table.truncate()
+        memberships_table.truncate()
+
+
+def test_accepting_invitation_while_event_is_deleted_does_not_deadlock():
+    threads = []
+    try:
+        guest = User(
+            id="guest", username="guest", email="guest@example.com", password="x"
+        )
+        users_table.insert(guest.model_dump())
+        event = Event(id="event", title="Cancelled event", organizer_id="x")
+        event_table.insert(event.model_dump())
+        invitation = Invitation(
+            id="invite",
+            time=str(datetime.datetime.now()),
+            start_user="x",
+            end_user="guest",
+            type=InvitationType.EVENT,
+            event_id="event",
+        )
+        invitation_table.insert(invitation.model_dump(mode="json"))
+        token = auth_helper.create_access_token(data=guest, version=0)
+        deleting = threading.Event()
+        responses = []
+
+        def delete_event():
+            # The lock order of DELETE /events/{id}, with time in between for
+            # the answer to take whatever locks it takes first
+            with event_table.lock.write():
+                deleting.set()
+                time.sleep(0.3)
+                with invitation_table.lock.write():
+                    event_table.remove(Query().id == "event")
+                    invitation_table.remove(Query().event_id == "event")
+
+        def accept():
+            deleting.wait()
+            responses.append(
+                client.get(
+                    "/invitations/invite/answer",
+                    params={"answer": True},
+                    headers={"Authorization": f"Bearer {token}"},
+                )
+            )
+
+        threads.extend(
+            threading.Thread(target=target, daemon=True)
+            for target in (delete_event, accept)
+        )
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        assert not any(thread.is_alive() for thread in threads)
+
+        # Invitation or event already gone, depending on which lock the
+        # answer waited on
+        assert responses[0].status_code in (400, 404)
+        assert not has_membership("event", "guest", MembershipRole.PARTICIPANT)
+    finally:
+        # Deadlocked threads keep holding the locks the cleanup needs
+        if not any(thread.is_alive() for thread in threads):
+            users_table.truncate()
+            event_table.truncate()
+            invitation_table.truncate()
+            memberships_table.truncate()
@@ -12,9 +12,11 @@ Contains tests for the following endpoints:
     - [PUT] /events/{event_id}/admin
     - [DELETE] /events/{event_id}/admin
     - [PUT ] /events/{event_id}/ownership
+    - [GET] /events/{event_id} and /events with a fields projection
 
 """
 import sys
+import json
 import time
 import pathlib
 from os.path import dirname, realpath
@@ -27,6 +29,15 @@ from eventplanner.eventplanner_backend.eventplanner_database import (
     users_table,
     event_table,
     events_query,
+    invitation_table,
+    invitations_query,
+    memberships_table,
+)
+from eventplanner.eventplanner_backend.api_routers.shared_functions import (
+    has_membership,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
+    MembershipRole,
 )
 
 client = TestClient(app)
@@ -72,6 +83,7 @@ def test_register_event_with_required_parameters():
     finally:
         users_table.truncate()
         event_table.truncate()
+        memberships_table.truncate()
 
 
 def test_retrieve_public_event_with_valid_event_id_and_current_user():
@@ -129,6 +141,7 @@ def test_retrieve_public_event_with_valid_event_id_and_current_user():
         # Clean up
         users_table.truncate()
         event_table.truncate()
+        memberships_table.truncate()
 
 
 def test_returns_list_of_events_with_valid_query_parameters():
@@ -208,6 +221,7 @@ def test_returns_list_of_events_with_valid_query_parameters():
         # Clean up
         users_table.truncate()
         event_table.truncate()
+        memberships_table.truncate()
 
 
 def test_update_event_status_to_public_when_user_is_organizer_or_admin():
@@ -297,6 +311,7 @@ def test_update_event_status_to_public_when_user_is_organizer_or_admin():
     finally:
         # Cleanup
         event_table.truncate()
+        memberships_table.truncate()
         users_table.truncate()
 
 
@@ -391,14 +406,20 @@ def test_user_join_event_successfully():
         assert len(public_ev) != 0
 
         ids_start_user_active_requests_private = [
-            req.start_user for req in private_ev[0]["requests_to_join"]
+            req["start_user"]
+            for req in invitation_table.search(
+                invitations_query.event_id == event_private.json()["id_event"]
+            )
         ]
 
         assert user1_id in ids_start_user_active_requests_private
-        assert user1_id in public_ev[0]["participants"]
+        assert has_membership(
+            public_ev[0]["id"], user1_id, MembershipRole.PARTICIPANT
+        )
 
     finally:
         event_table.truncate()
+        memberships_table.truncate()
         users_table.truncate()
 
 
@@ -468,7 +489,9 @@ def test_user_leaves_event_successfully():
         public_ev = event_table.search(
             events_query.id == event_public.json()["id_event"]
         )
-        assert user1_id in public_ev[0]["participants"]
+        assert has_membership(
+            public_ev[0]["id"], user1_id, MembershipRole.PARTICIPANT
+        )
 
         response = client.delete(
             f"/events/{event_public.json()['id_event']}/leave",
@@ -480,11 +503,14 @@ def test_user_leaves_event_successfully():
         public_ev = event_table.search(
             events_query.id == event_public.json()["id_event"]
         )
-        assert not user1_id in public_ev[0]["participants"]
+        assert not has_membership(
+            public_ev[0]["id"], user1_id, MembershipRole.PARTICIPANT
+        )
 
     # Cleanup
     finally:
         event_table.truncate()
+        memberships_table.truncate()
         users_table.truncate()
 
 
@@ -545,10 +571,13 @@ def test_add_admin_event_success():
         public_ev = event_table.search(
             events_query.id == event_public.json()["id_event"]
         )
-        assert user1_id in public_ev[0]["admins"]
+        assert has_membership(
+            public_ev[0]["id"], user1_id, MembershipRole.ADMIN
+        )
 
     finally:
         event_table.truncate()
+        memberships_table.truncate()
         users_table.truncate()
 
 
@@ -609,7 +638,9 @@ def test_remove_admin_event_success():
         public_ev = event_table.search(
             events_query.id == event_public.json()["id_event"]
         )
-        assert user1_id in public_ev[0]["admins"]
+        assert has_membership(
+            public_ev[0]["id"], user1_id, MembershipRole.ADMIN
+        )
 
         response = client.delete(
             f"/events/{event_public.json()['id_event']}/admin",
@@ -620,10 +651,13 @@ def test_remove_admin_event_success():
         public_ev = event_table.search(
             events_query.id == event_public.json()["id_event"]
         )
-        assert not user1_id in public_ev[0]["admins"]
+        assert not has_membership(
+            public_ev[0]["id"], user1_id, MembershipRole.ADMIN
+        )
 
     finally:
         event_table.truncate()
+        memberships_table.truncate()
         users_table.truncate()
 
 
@@ -686,6 +720,7 @@ def test_change_ownership_successfully():
         assert user1_id == public_ev[0]["organizer_id"]
     finally:
         event_table.truncate()
+        memberships_table.truncate()
         users_table.truncate()
 
 
@@ -751,4 +786,129 @@ def test_update_event_success():
     finally:
         # Cleanup
         event_table.truncate()
+        memberships_table.truncate()
+        users_table.truncate()
+
+
+def test_private_event_members_are_listed_to_members_only():
+    try:
+        tokens = {}
+        for username in ("organizer", "member", "outsider"):
+            client.post(
+                "/users/register",
+                json={
+                    "username": username,
+                    "email": f"{username}@example.com",
+                    "password": "password123",
+                },
+            )
+            tokens[username] = client.post(
+                "/token", data={"username": username, "password": "password123"}
+            ).json()["access_token"]
+        headers = {
+            username: {"Authorization": f"Bearer {token}"}
+            for username, token in tokens.items()
+        }
+        event_id = client.post(
+            "/events/register",
+            params={"title": "Private", "description": "d", "location": "l"},
+            headers=headers["organizer"],
+        ).json()["id_event"]
+        client.put(
+            f"/events/{event_id}/admin",
+            params={"username": "member"},
+            headers=headers["organizer"],
+        )
+
+        response = client.get(f"/events/{event_id}/members", headers=headers["member"])
+        assert response.status_code == 200
+        assert {member["role"] for member in response.json()} == {"admin"}
+        assert len(response.json()) == 2
+        response = client.get(
+            f"/events/{event_id}/members", headers=headers["outsider"]
+        )
+        assert response.status_code == 403
+
+        response = client.delete(f"/events/{event_id}", headers=headers["organizer"])
+        assert response.status_code == 200
+        assert client.get("/users/me/events", headers=headers["member"]).json() == []
+    finally:
+        event_table.truncate()
+        memberships_table.truncate()
+        users_table.truncate()
+
+
+def test_events_return_only_the_requested_fields():
+    try:
+        headers = {}
+        for username in ("organizer", "outsider"):
+            client.post(
+                "/users/register",
+                json={
+                    "username": username,
+                    "email": f"{username}@example.com",
+                    "password": "password123",
+                },
+            )
+            token = client.post(
+                "/token", data={"username": username, "password": "password123"}
+            ).json()["access_token"]
+            headers[username] = {"Authorization": f"Bearer {token}"}
+        event_ids = [
+            client.post(
+                "/events/register",
+                params={
+                    "title": title,
+                    "description": "d",
+                    "location": "nowhere",
+                    "tags": ["#art"],
+                    "start_time": 100,
+                },
+                headers=headers["organizer"],
+            ).json()["id_event"]
+            for title in ("First", "Second")
+        ]
+
+        # The weather is not fetched when it is not asked for
+        response = client.get(
+            f"/events/{event_ids[0]}",
+            params={"fields": "id,title,tags,start_time"},
+            headers=headers["organizer"],
+        )
+        assert response.status_code == 200
+        assert response.json() == {
+            "id": event_ids[0],
+            "title": "First",
+            "tags": ["#art"],
+            "start_time": 100,
+        }
+        response = client.get(
+            f"/events/{event_ids[0]}",
+            params={"fields": "title,start_time"},
+            headers=headers["outsider"],
+        )
+        assert response.json() == {"title": "First", "start_time": None}
+
+        response = client.get("/events", params={"fields": "title", "limit": 1})
+        assert response.status_code == 200
+        assert response.json() == [{"title": "First"}]
+        response = client.get(
+            "/events",
+            params={"fields": "title", "cursor": response.headers["X-Next-Cursor"]},
+        )
+        assert response.json() == [{"title": "Second"}]
+        assert "X-Next-Cursor" not in response.headers
+
+        response = client.get("/events", params={"fields": "id", "stream": True})
+        assert [json.loads(line) for line in response.text.splitlines()] == [
+            {"id": event_id} for event_id in event_ids
+        ]
+
+        response = client.get("/events", params={"fields": "title,password"})
+        assert response.status_code == 400
+        response = client.get("/events", params={"fields": ","})
+        assert response.status_code == 400
+    finally:
+        event_table.truncate()
+        memberships_table.truncate()
         users_table.truncate()
@@ -0,0 +1,183 @@
+"""
+Test module for the geospatial event index.
+
+It checks that:
+    - points are encoded to the usual geohashes
+    - radius queries return the documents within the radius, nearest first,
+      also across the antimeridian and for very large radii
+    - the index follows inserts, updates and removes of the table
+    - events are geocoded once when their location is written
+    - [GET] /events/nearby answers from the stored coordinates
+"""
+import sys
+import random
+import pathlib
+from os.path import dirname, realpath
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+from tinydb import TinyDB, Query
+from tinydb.storages import MemoryStorage
+from fastapi.testclient import TestClient
+from eventplanner.eventplanner_backend.app.eventplanner_main import app
+from eventplanner.eventplanner_backend.api_routers import shared_functions
+from eventplanner.eventplanner_backend.authentication import (
+    eventplanner_authentication_helper as auth_helper,
+)
+from eventplanner.eventplanner_backend.eventplanner_database import (
+    users_table,
+    event_table,
+    memberships_table,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import User
+from eventplanner.eventplanner_backend.storage.eventplanner_indexes import (
+    IndexedTable,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_geo_index import (
+    GeoIndex,
+    distance_km,
+    geohash,
+)
+
+client = TestClient(app)
+query = Query()
+
+BUCHAREST = (44.4268, 26.1025)
+PLOIESTI = (44.9365, 26.0138)
+CLUJ = (46.7712, 23.6236)
+COORDINATES = {"Bucharest": BUCHAREST, "Ploiesti": PLOIESTI, "Cluj": CLUJ}
+
+
+def create_indexed_events_table() -> IndexedTable:
+    return IndexedTable(TinyDB(storage=MemoryStorage).table("events"), [GeoIndex()])
+
+
+def names(results: list) -> list:
+    return [document["name"] for document, _ in results]
+
+
+def test_geohash_and_distance():
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geohash(-90, -180, 3) == "000"
+    assert round(distance_km(*BUCHAREST, *CLUJ)) == 324
+    assert distance_km(*BUCHAREST, *BUCHAREST) == 0
+
+
+def test_nearby_returns_documents_within_the_radius_nearest_first():
+    table = create_indexed_events_table()
+    for name, (latitude, longitude) in COORDINATES.items():
+        table.insert({"name": name, "latitude": latitude, "longitude": longitude})
+    table.insert({"name": "Unknown", "latitude": None, "longitude": None})
+    table.insert({"name": "Fiji west", "latitude": -17.8, "longitude": 179.99})
+    table.insert({"name": "Fiji east", "latitude": -17.8, "longitude": -179.99})
+
+    assert names(table.search_nearby(*BUCHAREST, 1)) == ["Bucharest"]
+    assert names(table.search_nearby(*BUCHAREST, 100)) == ["Bucharest", "Ploiesti"]
+    assert names(table.search_nearby(*CLUJ, 400, limit=2)) == ["Cluj", "Ploiesti"]
+    assert names(table.search_nearby(-17.8, 180, 5)) == ["Fiji west", "Fiji east"]
+    assert len(table.search_nearby(0, 0, 30000)) == 5
+    assert table.search_nearby(0, 0, 100) == []
+
+
+def test_nearby_matches_distances_to_every_point():
+    generator = random.Random(0)
+    table = create_indexed_events_table()
+    points = [
+        (generator.uniform(43, 48), generator.uniform(20, 30)) for _ in range(500)
+    ]
+    for i, (latitude, longitude) in enumerate(points):
+        table.insert({"name": i, "latitude": latitude, "longitude": longitude})
+
+    for radius_km in (0.5, 10, 40, 150, 700):
+        center = (generator.uniform(43, 48), generator.uniform(20, 30))
+        expected = sorted(
+            (distance_km(*center, *point), i)
+            for i, point in enumerate(points)
+            if distance_km(*center, *point) <= radius_km
+        )
+        assert names(table.search_nearby(*center, radius_km)) == [
+            i for _, i in expected
+        ]
+
+
+def test_nearby_follows_table_writes():
+    table = create_indexed_events_table()
+    table.insert({"id": "1", "latitude": BUCHAREST[0], "longitude": BUCHAREST[1]})
+    table.insert({"id": "2", "latitude": CLUJ[0], "longitude": CLUJ[1]})
+
+    table.update({"latitude": CLUJ[0], "longitude": CLUJ[1]}, query.id == "1")
+    assert table.search_nearby(*BUCHAREST, 10) == []
+    assert len(table.search_nearby(*CLUJ, 10)) == 2
+
+    table.remove(query.id == "2")
+    assert [document["id"] for document, _ in table.search_nearby(*CLUJ, 10)] == ["1"]
+    table.truncate()
+    assert table.search_nearby(*CLUJ, 10) == []
+
+
+def test_events_are_geocoded_once_and_found_nearby(monkeypatch):
+    geocoded = []
+
+    def get_location_coordinates(location: str):
+        geocoded.append(location)
+        return COORDINATES.get(location, (None, None))
+
+    monkeypatch.setattr(
+        shared_functions, "get_location_coordinates", get_location_coordinates
+    )
+    try:
+        user = User(id="organizer", username="o", email="o@example.com", password="x")
+        users_table.insert(user.model_dump())
+        token = auth_helper.create_access_token(data=user, version=0)
+        headers = {"Authorization": f"Bearer {token}"}
+        event_ids = {}
+        for location in ("Bucharest", "Ploiesti", "Nowhere"):
+            response = client.post(
+                "/events/register",
+                params={"title": location, "description": "d", "location": location},
+                headers=headers,
+            )
+            assert response.status_code == 200
+            event_ids[location] = response.json()["id_event"]
+        assert geocoded == ["Bucharest", "Ploiesti", "Nowhere"]
+
+        response = client.get(
+            "/events/nearby",
+            params={"lat": BUCHAREST[0], "lon": BUCHAREST[1], "radius_km": 100},
+        )
+        assert response.status_code == 200
+        assert [event["title"] for event in response.json()] == [
+            "Bucharest",
+            "Ploiesti",
+        ]
+        assert response.json()[0]["latitude"] == BUCHAREST[0]
+
+        # Only a change of location is geocoded again
+        client.put(
+            f"/events/{event_ids['Ploiesti']}",
+            json={"title": "Moved", "location": "Cluj"},
+            headers=headers,
+        )
+        client.put(
+            f"/events/{event_ids['Bucharest']}",
+            json={"title": "Renamed", "location": "Bucharest"},
+            headers=headers,
+        )
+        assert geocoded[3:] == ["Cluj"]
+        response = client.get(
+            "/events/nearby", params={"lat": CLUJ[0], "lon": CLUJ[1], "radius_km": 1}
+        )
+        assert [event["title"] for event in response.json()] == ["Moved"]
+
+        response = client.get(
+            "/events/nearby", params={"lat": 91, "lon": 0, "radius_km": 1}
+        )
+        assert response.status_code == 422
+        response = client.get(
+            "/events/nearby", params={"lat": 0, "lon": 0, "radius_km": 0}
+        )
+        assert response.status_code == 422
+    finally:
+        users_table.truncate()
+        event_table.truncate()
+        memberships_table.truncate()
@@ -0,0 +1,123 @@
+"""
+Test module for the geocoding cache.
+
+It checks that:
+    - repeated lookups of a location, however it is spelled, geocode once
+    - unknown locations are cached for a shorter time than found ones
+    - entries evicted from the LRU, or cached by another worker, are read
+      from the table instead of the geocoder
+    - geocoder errors are not cached
+"""
+import sys
+import pathlib
+from os.path import dirname, realpath
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+import pytest
+from tinydb import TinyDB
+from tinydb.storages import MemoryStorage
+from geopy.exc import GeocoderUnavailable
+from eventplanner.eventplanner_backend.api_routers.eventplanner_geocoding import (
+    GeocodingCache,
+    normalize_location,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_indexes import (
+    HashIndex,
+    IndexedTable,
+)
+
+COORDINATES = {"bucharest": (44.4268, 26.1025), "cluj": (46.7712, 23.6236)}
+
+
+class FakeGeocoder:
+    def __init__(self):
+        self.calls = []
+        self.unavailable = False
+
+    def __call__(self, location: str):
+        self.calls.append(location)
+        if self.unavailable:
+            raise GeocoderUnavailable("down")
+        return COORDINATES.get(normalize_location(location), (None, None))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def create_geocodes_table() -> IndexedTable:
+    return IndexedTable(
+        TinyDB(storage=MemoryStorage).table("geocodes"), [HashIndex("location")]
+    )
+
+
+def create_cache(geocoder, table, clock, size: int = 10) -> GeocodingCache:
+    return GeocodingCache(geocoder, table, size, ttl=100, negative_ttl=10, clock=clock)
+
+
+def test_repeated_lookups_geocode_once():
+    geocoder, clock = FakeGeocoder(), Clock()
+    cache = create_cache(geocoder, create_geocodes_table(), clock)
+
+    assert normalize_location("  Piața  Unirii ") == "piața unirii"
+    for location in ("Bucharest", "bucharest", "  BUCHAREST  "):
+        assert cache.coordinates(location) == COORDINATES["bucharest"]
+    assert geocoder.calls == ["Bucharest"]
+
+    clock.now += 101
+    assert cache.coordinates("Bucharest") == COORDINATES["bucharest"]
+    assert len(geocoder.calls) == 2
+
+
+def test_unknown_locations_expire_sooner():
+    geocoder, clock = FakeGeocoder(), Clock()
+    cache = create_cache(geocoder, create_geocodes_table(), clock)
+
+    assert cache.coordinates("Atlantis") == (None, None)
+    clock.now += 9
+    assert cache.coordinates("Atlantis") == (None, None)
+    assert geocoder.calls == ["Atlantis"]
+    clock.now += 2
+    assert cache.coordinates("Atlantis") == (None, None)
+    assert geocoder.calls == ["Atlantis", "Atlantis"]
+
+
+def test_evicted_and_shared_entries_are_read_from_the_table():
+    geocoder, clock = FakeGeocoder(), Clock()
+    table = create_geocodes_table()
+    cache = create_cache(geocoder, table, clock, size=1)
+
+    cache.coordinates("Bucharest")
+    cache.coordinates("Cluj")
+    assert len(table) == 2
+    # Bucharest was evicted from the LRU but is still in the table
+    assert cache.coordinates("Bucharest") == COORDINATES["bucharest"]
+    # So does another worker sharing the table
+    other_worker = create_cache(geocoder, table, clock)
+    assert other_worker.coordinates("cluj") == COORDINATES["cluj"]
+    assert geocoder.calls == ["Bucharest", "Cluj"]
+
+    # Expired rows are refreshed in place
+    clock.now += 101
+    cache.clear()
+    cache.coordinates("Cluj")
+    assert len(table) == 2
+    assert geocoder.calls[-1] == "Cluj"
+
+
+def test_geocoder_errors_are_not_cached():
+    geocoder, clock = FakeGeocoder(), Clock()
+    table = create_geocodes_table()
+    cache = create_cache(geocoder, table, clock)
+
+    geocoder.unavailable = True
+    with pytest.raises(GeocoderUnavailable):
+        cache.coordinates("Cluj")
+    assert len(table) == 0
+    geocoder.unavailable = False
+    assert cache.coordinates("Cluj") == COORDINATES["cluj"]
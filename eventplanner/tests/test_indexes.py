@@ -0,0 +1,493 @@
+"""
+Test module for the table indexes.
+
+It checks that:
+    - point lookups go through the hash indexes and stay in sync on writes
+    - unique indexes reject duplicate usernames and emails
+    - batch writes read and write the storage once, indexed counts not at all
+    - updates computed by a function are checked against the unique indexes
+    - tag queries are answered from the posting sets of the set index
+    - time range queries are answered from the sorted indexes
+    - sorted pages resume from a keyset cursor, with or without filters
+    - [GET] /events streams every matching event as NDJSON on request
+    - index-backed reads return only the requested fields
+    - [POST] /users/register reports duplicates found by the index
+"""
+import sys
+import json
+import base64
+import pathlib
+from os.path import dirname, realpath
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+import pytest
+from tinydb import TinyDB, Query
+from tinydb.storages import MemoryStorage
+from fastapi.testclient import TestClient
+from eventplanner.eventplanner_backend.app.eventplanner_main import app
+from eventplanner.eventplanner_backend.eventplanner_database import (
+    users_table,
+    event_table,
+    memberships_table,
+)
+from eventplanner.eventplanner_backend.api_routers import (
+    eventplanner_event_management as event_management,
+)
+from eventplanner.eventplanner_backend.authentication import (
+    eventplanner_authentication_helper as auth_helper,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import User
+from eventplanner.eventplanner_backend.storage.eventplanner_indexes import (
+    HashIndex,
+    IndexedTable,
+    SetIndex,
+    SortedIndex,
+    UniqueConstraintError,
+)
+
+client = TestClient(app)
+query = Query()
+
+
+def create_indexed_users_table() -> IndexedTable:
+    return IndexedTable(
+        TinyDB(storage=MemoryStorage).table("users"),
+        [HashIndex("id"), HashIndex("username"), HashIndex("email")],
+    )
+
+
+def test_indexes_follow_insert_update_and_remove():
+    table = create_indexed_users_table()
+    table.insert({"id": "1", "username": "first", "email": "first@example.com"})
+    table.insert({"id": "2", "username": "second", "email": "second@example.com"})
+
+    table.update({"username": "renamed"}, query.id == "1")
+    assert table.get_by("username", "first") is None
+    assert table.get_by("username", "renamed")["id"] == "1"
+    assert table.search(query.username == "renamed")[0]["id"] == "1"
+
+    table.remove(query.id == "2")
+    assert table.get_by("id", "2") is None
+    assert table.get(query.email == "second@example.com") is None
+    assert len(table) == 1
+
+
+def test_unique_index_rejects_duplicates():
+    table = create_indexed_users_table()
+    table.insert({"id": "1", "username": "first", "email": "first@example.com"})
+    table.insert({"id": "2", "username": "second", "email": "second@example.com"})
+
+    with pytest.raises(UniqueConstraintError):
+        table.insert({"id": "3", "username": "first", "email": "third@example.com"})
+    with pytest.raises(UniqueConstraintError):
+        table.update({"email": "first@example.com"}, query.id == "2")
+
+    # Re-saving a document with its own values is not a conflict
+    table.update({"email": "first@example.com"}, query.id == "1")
+    assert len(table) == 2
+
+
+class CountingStorage(MemoryStorage):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+        self.writes = 0
+
+    def read(self):
+        self.reads += 1
+        return super().read()
+
+    def write(self, data):
+        self.writes += 1
+        super().write(data)
+
+
+def test_batch_writes_access_the_storage_once():
+    database = TinyDB(storage=CountingStorage)
+    table = IndexedTable(
+        database.table("users"), [HashIndex("id"), HashIndex("username")]
+    )
+    storage = database.storage
+
+    writes = storage.writes
+    doc_ids = table.insert_multiple(
+        {"id": str(i), "username": f"user{i}", "group": i % 2} for i in range(10)
+    )
+    assert storage.writes == writes + 1
+    assert table.get_by("username", "user3").doc_id == doc_ids[3]
+
+    reads = storage.reads
+    table.update({"group": 2}, query.group == 0)
+    # Finding, updating and reindexing the documents read once each
+    assert storage.reads == reads + 3
+    assert len(table.search(query.group == 2)) == 5
+
+    reads = storage.reads
+    assert table.count(query.username == "user3") == 1
+    assert storage.reads == reads
+    assert table.count(query.group == 1) == 5
+
+    with pytest.raises(UniqueConstraintError):
+        table.insert_multiple(
+            [{"id": "a", "username": "new"}, {"id": "b", "username": "new"}]
+        )
+    with pytest.raises(UniqueConstraintError):
+        table.insert_multiple([{"id": "c", "username": "user1"}])
+    assert len(table) == 10
+
+
+def test_transforms_are_checked_for_duplicates():
+    table = IndexedTable(
+        TinyDB(storage=MemoryStorage).table("users"),
+        [HashIndex("id"), HashIndex("username")],
+    )
+    table.insert_multiple({"id": str(i), "username": f"user{i}"} for i in range(3))
+
+    def rename(username):
+        def transform(document):
+            document["username"] = username
+
+        return transform
+
+    with pytest.raises(UniqueConstraintError):
+        table.update(rename("user1"), query.id == "0")
+    with pytest.raises(UniqueConstraintError):
+        table.update(rename("same"), query.id.one_of(["0", "2"]))
+    with pytest.raises(UniqueConstraintError):
+        table.compare_and_swap(rename("user2"), 1, 0)
+    assert [document["username"] for document in table.all()] == [
+        "user0",
+        "user1",
+        "user2",
+    ]
+
+    def swap(document):
+        document["username"] = {"user0": "user1", "user1": "user0"}[
+            document["username"]
+        ]
+
+    table.update(swap, query.id.one_of(["0", "1"]))
+    assert table.get_by("username", "user0")["id"] == "1"
+
+
+def test_register_duplicate_email_is_rejected():
+    try:
+        response = client.post(
+            "/users/register",
+            json={
+                "username": "user1",
+                "email": "same@example.com",
+                "password": "password123",
+            },
+        )
+        assert response.status_code == 200
+
+        response = client.post(
+            "/users/register",
+            json={
+                "username": "user2",
+                "email": "same@example.com",
+                "password": "password123",
+            },
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Email already registered"
+    finally:
+        users_table.truncate()
+        event_table.truncate()
+
+
+def test_set_index_answers_any_and_all_queries():
+    table = IndexedTable(
+        TinyDB(storage=MemoryStorage).table("events"), [SetIndex("tags")]
+    )
+    table.insert({"id": "1", "tags": {"#art", "#music"}, "public": True})
+    table.insert({"id": "2", "tags": {"#music"}, "public": False})
+    table.insert({"id": "3", "tags": None, "public": True})
+
+    def ids(cond) -> set:
+        return {document["id"] for document in table.search(cond)}
+
+    assert table.indexes["tags"].resolve("any", ("#art", "#food")) == {1}
+    assert ids(query.tags.any(["#art", "#music"])) == {"1", "2"}
+    assert ids(query.tags.all(["#art", "#music"])) == {"1"}
+    # The indexed part narrows down the documents the rest is evaluated on
+    assert ids(query.tags.any(["#music"]) & (query.public == False)) == {"2"}
+
+    table.update({"tags": {"#food"}}, query.id == "1")
+    assert ids(query.tags.any(["#art"])) == set()
+    table.remove(query.tags.any(["#food"]))
+    assert ids(query.tags.any(["#art", "#music", "#food"])) == {"2"}
+
+
+def test_events_are_filtered_by_any_or_all_tags():
+    try:
+        user = User(id="organizer", username="o", email="o@example.com", password="x")
+        users_table.insert(user.model_dump())
+        token = auth_helper.create_access_token(data=user, version=0)
+        headers = {"Authorization": f"Bearer {token}"}
+        for title, tags in (
+            ("both", ["#art", "#music"]),
+            ("art", ["#art"]),
+            ("none", []),
+        ):
+            response = client.post(
+                "/events/register",
+                params={
+                    "title": title,
+                    "description": "d",
+                    "location": "l",
+                    "tags": tags,
+                    "public": True,
+                },
+                headers=headers,
+            )
+            assert response.status_code == 200
+
+        def titles(**params) -> set:
+            response = client.get("/events", params=params)
+            assert response.status_code == 200
+            return {event["title"] for event in response.json()}
+
+        assert titles(tags=["#art", "#music"]) == {"both", "art"}
+        assert titles(tags=["#art", "#music"], tags_match="all") == {"both"}
+        assert titles(tags=["#music"], title="art") == set()
+        assert titles() == {"both", "art", "none"}
+    finally:
+        users_table.truncate()
+        event_table.truncate()
+        memberships_table.truncate()
+
+
+def test_sorted_index_answers_range_queries():
+    table = IndexedTable(
+        TinyDB(storage=MemoryStorage).table("events"), [SortedIndex("start_time")]
+    )
+    for i, start_time in enumerate([30, 10, 20, 20, None, "soon"]):
+        table.insert({"id": str(i), "start_time": start_time})
+    index = table.indexes["start_time"]
+
+    def ids(cond) -> set:
+        return {document["id"] for document in table.search(cond)}
+
+    assert index.range(low=20) == {1, 3, 4}
+    assert index.range(low=20, include_low=False) == {1}
+    assert index.range(high=20, include_high=False) == {2}
+    assert ids(query.start_time <= 20) == {"1", "2", "3"}
+    assert ids((query.start_time > 10) & (query.start_time < 30)) == {"2", "3"}
+    assert ids(query.start_time == 20) == {"2", "3"}
+
+    table.update({"start_time": 5}, query.id == "0")
+    table.remove(query.id == "2")
+    assert ids(query.start_time < 20) == {"0", "1"}
+    assert index.range() == {1, 2, 4}
+
+
+def test_events_are_filtered_by_time_range():
+    try:
+        user = User(id="organizer", username="o", email="o@example.com", password="x")
+        users_table.insert(user.model_dump())
+        token = auth_helper.create_access_token(data=user, version=0)
+        headers = {"Authorization": f"Bearer {token}"}
+        for title, start_time, end_time in (
+            ("morning", 8, 12),
+            ("afternoon", 13, 17),
+            ("all day", 8, 20),
+        ):
+            response = client.post(
+                "/events/register",
+                params={
+                    "title": title,
+                    "description": "d",
+                    "location": "l",
+                    "start_time": start_time,
+                    "end_time": end_time,
+                },
+                headers=headers,
+            )
+            assert response.status_code == 200
+
+        def titles(**params) -> set:
+            response = client.get("/events", params=params)
+            assert response.status_code == 200
+            return {event["title"] for event in response.json()}
+
+        assert titles(start_date=9) == {"afternoon"}
+        assert titles(end_date=17) == {"morning", "afternoon"}
+        assert titles(start_date=8, end_date=12) == {"morning"}
+        assert titles(start_date=11, end_date=13, date_match="overlaps") == {
+            "morning",
+            "afternoon",
+            "all day",
+        }
+        assert titles(start_date=18, date_match="overlaps") == {"all day"}
+    finally:
+        users_table.truncate()
+        event_table.truncate()
+        memberships_table.truncate()
+
+
+def test_search_sorted_pages_through_the_index():
+    table = IndexedTable(
+        TinyDB(storage=MemoryStorage).table("events"),
+        [HashIndex("public", unique=False), SortedIndex("created_at")],
+    )
+    for i in range(40):
+        table.insert(
+            {"id": str(i), "created_at": 40 - i, "public": i % 2 == 0, "n": i % 3}
+        )
+    table.insert({"id": "undated"})
+
+    def pages(cond, limit: int, descending: bool = False) -> list:
+        pages, after = [], None
+        while True:
+            page = table.search_sorted(
+                cond, "created_at", limit, after=after, descending=descending
+            )
+            if not page:
+                return pages
+            pages.append([int(document["id"]) for document in page])
+            after = (page[-1]["created_at"], page[-1].doc_id)
+
+    everything = pages(None, 7)
+    assert len(everything) == 6
+    assert sum(everything, []) == list(range(39, -1, -1))
+    assert sum(pages(None, 7, descending=True), []) == list(range(40))
+    # Exact indexed filter, then one evaluated on the documents
+    assert sum(pages(query.public == True, 4), []) == list(range(38, -1, -2))
+    assert sum(pages((query.public == True) & (query.n == 0), 2), []) == [
+        36,
+        30,
+        24,
+        18,
+        12,
+        6,
+        0,
+    ]
+    assert sum(pages(query.n == 1, 5, descending=True), []) == list(range(1, 40, 3))
+    # Few candidates are sorted directly instead of walking the index
+    assert table.search_sorted(query.id == "3", "created_at", 5)[0]["id"] == "3"
+
+
+def test_events_are_paged_with_a_cursor():
+    try:
+        user = User(id="organizer", username="o", email="o@example.com", password="x")
+        users_table.insert(user.model_dump())
+        token = auth_helper.create_access_token(data=user, version=0)
+        for i in range(7):
+            response = client.post(
+                "/events/register",
+                params={
+                    "title": f"event {i}",
+                    "description": "d",
+                    "location": "l",
+                    "start_time": 100 - i,
+                    "end_time": 200,
+                },
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            assert response.status_code == 200
+
+        def all_pages(**params) -> list:
+            titles, cursor = [], None
+            while True:
+                response = client.get(
+                    "/events", params=params | ({"cursor": cursor} if cursor else {})
+                )
+                assert response.status_code == 200
+                titles.append([event["title"] for event in response.json()])
+                cursor = response.headers.get("X-Next-Cursor")
+                if cursor is None:
+                    return titles
+
+        assert all_pages(limit=3) == [
+            ["event 0", "event 1", "event 2"],
+            ["event 3", "event 4", "event 5"],
+            ["event 6"],
+        ]
+        assert all_pages(limit=4, sort="start_time") == [
+            ["event 6", "event 5", "event 4", "event 3"],
+            ["event 2", "event 1", "event 0"],
+        ]
+        assert all_pages(limit=5, descending=True)[0][0] == "event 6"
+
+        first_page = client.get("/events", params={"limit": 2})
+        cursor = first_page.headers["X-Next-Cursor"]
+        response = client.get("/events", params={"cursor": cursor, "sort": "start_time"})
+        assert response.status_code == 400
+        response = client.get("/events", params={"cursor": "not a cursor"})
+        assert response.status_code == 400
+        for position in (["created_at", False, "x", 1], ["created_at", False, 1, None]):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            response = client.get("/events", params={"cursor": cursor})
+            assert response.status_code == 400
+    finally:
+        users_table.truncate()
+        event_table.truncate()
+        memberships_table.truncate()
+
+
+def test_events_are_streamed_as_ndjson(monkeypatch):
+    try:
+        user = User(id="organizer", username="o", email="o@example.com", password="x")
+        users_table.insert(user.model_dump())
+        token = auth_helper.create_access_token(data=user, version=0)
+        for i in range(7):
+            response = client.post(
+                "/events/register",
+                params={
+                    "title": f"event {i}",
+                    "description": "d",
+                    "location": "l",
+                    "tags": ["#music"] if i % 2 else ["#art"],
+                },
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            assert response.status_code == 200
+        # Several storage batches make up one stream
+        monkeypatch.setattr(event_management, "STREAM_BATCH_SIZE", 2)
+
+        def streamed_titles(response) -> list:
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "application/x-ndjson"
+            return [json.loads(line)["title"] for line in response.text.splitlines()]
+
+        # The limit does not apply to a stream
+        response = client.get("/events", params={"stream": True, "limit": 1})
+        assert streamed_titles(response) == [f"event {i}" for i in range(7)]
+        response = client.get(
+            "/events",
+            params={"tags": ["#music"], "descending": True},
+            headers={"Accept": "application/x-ndjson"},
+        )
+        assert streamed_titles(response) == ["event 5", "event 3", "event 1"]
+
+        cursor = client.get("/events", params={"limit": 4}).headers["X-Next-Cursor"]
+        response = client.get("/events", params={"stream": True, "cursor": cursor})
+        assert streamed_titles(response) == ["event 4", "event 5", "event 6"]
+        assert client.get("/events", params={"limit": 1}).json()[0]["title"] == "event 0"
+    finally:
+        users_table.truncate()
+        event_table.truncate()
+        memberships_table.truncate()
+
+
+def test_indexed_reads_return_only_the_requested_fields():
+    table = IndexedTable(
+        TinyDB(storage=MemoryStorage).table("events"),
+        [HashIndex("id"), SortedIndex("created_at")],
+    )
+    for i in range(5):
+        table.insert({"id": str(i), "n": i % 2, "created_at": i, "big": [i] * 100})
+
+    assert table.get_by("id", "3", {"id", "n", "missing"}) == {"id": "3", "n": 1}
+    assert table.get_by("id", "3")["big"] == [3] * 100
+    # Exact queries read the fields, others are filtered on whole documents
+    assert table.search_sorted(None, "created_at", 2, fields={"id"}) == [
+        {"id": "0"},
+        {"id": "1"},
+    ]
+    page = table.search_sorted(query.n == 1, "created_at", 5, fields={"created_at"})
+    assert page == [{"created_at": 1}, {"created_at": 3}]
+    assert [document.doc_id for document in page] == [2, 4]
@@ -4,6 +4,7 @@ Test module for notification management related endpoints.
 Contains tests for the following endpoints:
     - [POST] /invitations
     - [GET] /invitations/{invite_id}/answer
+    - [GET] /invitations
 """
 import sys
 import time
@@ -17,8 +18,15 @@ from eventplanner.eventplanner_backend.app.eventplanner_main import app
 from eventplanner.eventplanner_backend.eventplanner_database import (
     users_table,
     event_table,
-    events_query,
-    user_query,
+    invitation_table,
+    invitations_query,
+    memberships_table,
+)
+from eventplanner.eventplanner_backend.api_routers.shared_functions import (
+    has_membership,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
+    MembershipRole,
 )
 
 client = TestClient(app)
@@ -82,14 +90,14 @@ def test_inviting_user_with_valid_data_and_authentication_returns_success_messag
         )
         assert response.status_code == 200
         assert "User invited successfully" in response.json()["message"]
-        assert len(
-            users_table.search(user_query.id == user1_id)[0]["active_invitations"]
-        )
+        assert invitation_table.search(invitations_query.end_user == user1_id)
 
     finally:
         # Cleanup
         users_table.truncate()
         event_table.truncate()
+        invitation_table.truncate()
+        memberships_table.truncate()
 
 
 def test_valid_invitation_given_to_valid_user_with_request_to_join():
@@ -153,11 +161,164 @@ def test_valid_invitation_given_to_valid_user_with_request_to_join():
         )
         assert response.status_code == 200
 
-        # Check if the second user has the invitation in their requests_to_join
-        event = event_table.search(events_query.id == event1["id_event"])[0]
-        assert len(event["requests_to_join"])
+        # Check if the request is stored with the event
+        assert invitation_table.search(
+            invitations_query.event_id == event1["id_event"]
+        )
 
     finally:
         # Cleanup
         users_table.truncate()
         event_table.truncate()
+        invitation_table.truncate()
+        memberships_table.truncate()
+
+
+def register_and_login(username: str) -> tuple:
+    response = client.post(
+        "/users/register",
+        json={
+            "username": username,
+            "email": f"{username}@example.com",
+            "password": "password123",
+        },
+    )
+    assert response.status_code == 200
+    token_response = client.post(
+        "/token", data={"username": username, "password": "password123"}
+    )
+    assert token_response.status_code == 200
+    headers = {"Authorization": f"Bearer {token_response.json()['access_token']}"}
+    return response.json()["uid"], headers
+
+
+def test_accepting_event_invitation_adds_participant_and_removes_invitation():
+    try:
+        organizer_id, organizer_headers = register_and_login("organizer")
+        guest_id, guest_headers = register_and_login("guest")
+        event_id = client.post(
+            "/events/register",
+            params={
+                "title": "Party",
+                "description": "test",
+                "location": "test",
+                "public": False,
+            },
+            headers=organizer_headers,
+        ).json()["id_event"]
+
+        invite_id = client.post(
+            "/invitations",
+            json={"end_user": guest_id, "type": "event", "event_id": event_id},
+            headers=organizer_headers,
+        ).json()["invite_id"]
+        stored_users = users_table.all()
+        stored_event = event_table.get_by("id", event_id)
+
+        # Only the invited user can answer
+        response = client.get(
+            f"/invitations/{invite_id}/answer",
+            params={"answer": True},
+            headers=organizer_headers,
+        )
+        assert response.status_code == 400
+
+        listed = client.get("/invitations", headers=guest_headers).json()
+        assert [invitation["id"] for invitation in listed] == [invite_id]
+
+        response = client.get(
+            f"/invitations/{invite_id}/answer",
+            params={"answer": True},
+            headers=guest_headers,
+        )
+        assert response.status_code == 200
+        assert has_membership(event_id, guest_id, MembershipRole.PARTICIPANT)
+        assert invitation_table.get_by("id", invite_id) is None
+        assert client.get("/invitations", headers=guest_headers).json() == []
+        # Accepting only adds a membership edge
+        assert users_table.all() == stored_users
+        assert event_table.get_by("id", event_id) == stored_event
+        assert not has_membership(event_id, organizer_id, MembershipRole.PARTICIPANT)
+    finally:
+        users_table.truncate()
+        event_table.truncate()
+        invitation_table.truncate()
+        memberships_table.truncate()
+
+
+def test_declining_friend_invitation_only_removes_invitation():
+    try:
+        _, sender_headers = register_and_login("sender")
+        receiver_id, receiver_headers = register_and_login("receiver")
+        invite_id = client.post(
+            "/invitations",
+            json={"end_user": receiver_id, "type": "friend"},
+            headers=sender_headers,
+        ).json()["invite_id"]
+        users_before = users_table.all()
+
+        response = client.get(
+            f"/invitations/{invite_id}/answer",
+            params={"answer": False},
+            headers=receiver_headers,
+        )
+        assert response.status_code == 200
+        assert invitation_table.get_by("id", invite_id) is None
+        assert users_table.all() == users_before
+    finally:
+        users_table.truncate()
+        event_table.truncate()
+        invitation_table.truncate()
+        memberships_table.truncate()
+
+
+def test_join_request_is_listed_and_approved_by_organizer():
+    try:
+        _, organizer_headers = register_and_login("organizer")
+        requester_id, requester_headers = register_and_login("requester")
+        event_id = client.post(
+            "/events/register",
+            params={
+                "title": "Private",
+                "description": "test",
+                "location": "test",
+                "public": False,
+            },
+            headers=organizer_headers,
+        ).json()["id_event"]
+
+        invite_id = client.get(
+            f"/events/{event_id}/join", headers=requester_headers
+        ).json()["id_invitation"]
+        response = client.get(f"/events/{event_id}/join", headers=requester_headers)
+        assert "already requested" in response.json()["message"]
+
+        response = client.get(
+            "/invitations", params={"event_id": event_id}, headers=requester_headers
+        )
+        assert response.status_code == 400
+        listed = client.get(
+            "/invitations", params={"event_id": event_id}, headers=organizer_headers
+        ).json()
+        assert [invitation["start_user"] for invitation in listed] == [requester_id]
+
+        response = client.post(
+            f"/events/{event_id}/approve_request",
+            params={"invitation_id": invite_id},
+            headers=organizer_headers,
+        )
+        assert response.status_code == 200
+        members = client.get(
+            f"/events/{event_id}/members",
+            params={"role": "participant"},
+            headers=organizer_headers,
+        ).json()
+        assert [member["user_id"] for member in members] == [requester_id]
+        my_events = client.get("/users/me/events", headers=requester_headers).json()
+        assert [membership["event_id"] for membership in my_events] == [event_id]
+        assert invitation_table.get_by("id", invite_id) is None
+    finally:
+        users_table.truncate()
+        event_table.truncate()
+        invitation_table.truncate()
+        memberships_table.truncate()
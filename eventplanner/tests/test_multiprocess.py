@@ -0,0 +1,222 @@
+"""
+Test module for running the database from several processes.
+
+It checks that with EVENTPLANNER_DATABASE_MULTIPROCESS:
+    - increments from several processes on one document are all kept
+    - documents inserted by different processes never share a doc id
+    - transactions over the same tables, given in opposite orders, do not
+      deadlock with one file per table
+    - the wal engine is rejected since it cannot be shared between processes
+    - a write to one table neither reloads the other tables sharing its lock
+      file nor reindexes the unchanged documents of its own table
+"""
+import os
+import sys
+import json
+import pathlib
+import subprocess
+from os.path import dirname, realpath
+
+ROOT = str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve())
+sys.path.append(ROOT)
+
+import pytest
+from tinydb import TinyDB
+from eventplanner.common import eventplanner_common as common
+from eventplanner.eventplanner_backend.storage.eventplanner_indexes import (
+    HashIndex,
+    IndexedTable,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_locking import (
+    LockedTable,
+    ProcessReadWriteLock,
+)
+
+PROCESSES = 4
+INCREMENTS = 25
+INSERTS = 10
+
+SETUP = f"""
+import sys
+sys.path.append({ROOT!r})
+from eventplanner.eventplanner_backend.eventplanner_database import (
+    event_table,
+    events_query,
+    transaction,
+    update_with_retry,
+    users_table,
+)
+"""
+
+WORKER = (
+    SETUP
+    + f"""
+for i in range({INCREMENTS}):
+    update_with_retry(
+        event_table,
+        events_query.id == "counter",
+        lambda event: {{"count": event["count"] + 1}},
+    )
+for i in range({INSERTS}):
+    event_table.insert({{"id": f"{{sys.argv[1]}}-{{i}}"}})
+"""
+)
+
+TRANSACTIONS = (
+    SETUP
+    + f"""
+tables = [event_table, users_table]
+if sys.argv[1] == "1":
+    tables.reverse()
+for i in range({INCREMENTS}):
+    with transaction(*tables):
+        event_table.insert({{"id": f"{{sys.argv[1]}}-{{i}}"}})
+        users_table.insert({{"id": f"{{sys.argv[1]}}-{{i}}"}})
+"""
+)
+
+REPORT = (
+    SETUP
+    + """
+import json
+counter = event_table.get_by("id", "counter")
+print(json.dumps({"count": counter["count"], "documents": len(event_table)}))
+"""
+)
+
+
+def run(code: str, directory, engine: str, *args, **variables) -> subprocess.Popen:
+    environment = dict(
+        os.environ,
+        EVENTPLANNER_DATABASE_ENGINE=engine,
+        EVENTPLANNER_DATABASE_MULTIPROCESS="true",
+        **variables,
+    )
+    return subprocess.Popen(
+        [sys.executable, "-c", code, *args],
+        cwd=directory,
+        env=environment,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+
+@pytest.mark.parametrize(
+    "engine",
+    [common.EventplannerDatabaseEngine.JSON, common.EventplannerDatabaseEngine.SQLITE],
+)
+def test_processes_do_not_lose_writes(engine, tmp_path):
+    seed = SETUP + '\nevent_table.insert({"id": "counter", "count": 0})'
+    assert run(seed, tmp_path, engine.value).wait() == 0
+
+    workers = [run(WORKER, tmp_path, engine.value, str(i)) for i in range(PROCESSES)]
+    for worker in workers:
+        _, errors = worker.communicate(timeout=120)
+        assert worker.returncode == 0, errors
+
+    report, errors = run(REPORT, tmp_path, engine.value).communicate(timeout=60)
+    assert json.loads(report) == {
+        "count": PROCESSES * INCREMENTS,
+        "documents": 1 + PROCESSES * INSERTS,
+    }, errors
+
+
+@pytest.mark.parametrize(
+    "engine",
+    [common.EventplannerDatabaseEngine.JSON, common.EventplannerDatabaseEngine.SQLITE],
+)
+def test_transactions_in_opposite_orders_do_not_deadlock(engine, tmp_path):
+    # Creates the files first: new SQLite files switch to WAL without waiting
+    # for each other
+    setup = run(
+        SETUP, tmp_path, engine.value, EVENTPLANNER_DATABASE_PER_TABLE_FILES="true"
+    )
+    assert setup.wait() == 0
+    workers = [
+        run(
+            TRANSACTIONS,
+            tmp_path,
+            engine.value,
+            str(i),
+            EVENTPLANNER_DATABASE_PER_TABLE_FILES="true",
+        )
+        for i in range(2)
+    ]
+    for worker in workers:
+        _, errors = worker.communicate(timeout=120)
+        assert worker.returncode == 0, errors
+
+    report = SETUP + "\nprint(len(event_table), len(users_table))"
+    output, errors = run(
+        report, tmp_path, engine.value, EVENTPLANNER_DATABASE_PER_TABLE_FILES="true"
+    ).communicate(timeout=60)
+    assert output.split() == [str(2 * INCREMENTS)] * 2, errors
+
+
+def test_wal_engine_is_rejected(tmp_path):
+    process = run(SETUP, tmp_path, common.EventplannerDatabaseEngine.WAL.value)
+    _, errors = process.communicate(timeout=60)
+    assert process.returncode != 0
+    assert "cannot be shared between processes" in errors
+
+
+class CountingIndex(HashIndex):
+    def __init__(self, field: str):
+        super().__init__(field)
+        self.added = 0
+
+    def add(self, doc_id, document):
+        self.added += 1
+        super().add(doc_id, document)
+
+
+class Worker:
+    """The events and users tables of one JSON file, as one process sees them."""
+
+    def __init__(self, directory):
+        database = TinyDB(directory / "db.json")
+        # Each lock opens the lock file itself, like another process would
+        lock = ProcessReadWriteLock(str(directory / "db.json.lock"))
+        self.reloads = []
+        self.indexes = {}
+        self.tables = {}
+        for name in ("events", "users"):
+            table = database.table(name)
+            self.indexes[name] = CountingIndex("id")
+            indexed_table = IndexedTable(table, [self.indexes[name]])
+            self.tables[name] = LockedTable(
+                indexed_table, lock, self._reload(name, table, indexed_table)
+            )
+
+    def _reload(self, name, table, indexed_table):
+        def reload():
+            self.reloads.append(name)
+            table.clear_cache()
+            indexed_table.refresh()
+
+        return reload
+
+
+def test_writes_only_reload_their_table(tmp_path):
+    first, second = Worker(tmp_path), Worker(tmp_path)
+    first.tables["events"].insert_multiple({"id": f"e{i}"} for i in range(10))
+    first.tables["users"].insert({"id": "u0"})
+    assert len(second.tables["events"]) == 10
+    assert len(second.tables["users"]) == 1
+    second.reloads.clear()
+
+    first.tables["users"].insert({"id": "u1"})
+    assert len(second.tables["events"]) == 10
+    assert second.reloads == []
+    assert second.tables["users"].get_by("id", "u1") is not None
+    assert second.reloads == ["users"]
+
+    added = second.indexes["events"].added
+    first.tables["events"].update({"id": "e10"}, doc_ids=[3])
+    first.tables["events"].remove(doc_ids=[5])
+    assert second.tables["events"].get_by("id", "e10").doc_id == 3
+    assert second.tables["events"].get_by("id", "e2") is None
+    assert second.tables["events"].get_by("id", "e4") is None
+    assert second.tables["events"].get_by("id", "e5") is not None
+    assert second.indexes["events"].added == added + 1
@@ -3,6 +3,10 @@ Test module for notification management related endpoints.
 
 Contains tests for the following endpoints:
     - [POST] /notifications/{user_id}/notify
+    - [GET] /notifications
+    - [GET] /notifications/unread_count
+    - [POST] /notifications/{notification_id}/read
+    - [POST] /notifications/read
 """
 import sys
 import pathlib
@@ -12,15 +16,49 @@ sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resol
 
 from fastapi.testclient import TestClient
 from eventplanner.eventplanner_backend.app.eventplanner_main import app
+from eventplanner.eventplanner_backend.api_routers.shared_functions import (
+    encode_cursor,
+)
 from eventplanner.eventplanner_backend.eventplanner_database import (
     users_table,
     event_table,
-    user_query,
+    notifications_table,
+    notifications_query,
+    move_embedded_notifications,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
+    Notification,
+    NotificationType,
 )
 
 client = TestClient(app)
 
 
+def register_and_login(username: str) -> tuple:
+    response = client.post(
+        "/users/register",
+        json={
+            "username": username,
+            "email": f"{username}@example.com",
+            "password": "password123",
+        },
+    )
+    user_id = response.json()["uid"]
+    response = client.post(
+        "/token", data={"username": username, "password": "password123"}
+    )
+    token = response.json()["access_token"]
+    return user_id, {"Authorization": f"Bearer {token}"}
+
+
+def notify(user_id: str, content: str):
+    response = client.post(
+        f"/notifications/{user_id}/notify",
+        params={"notification_type": "system", "content": content},
+    )
+    assert response.status_code == 200
+
+
 def test_user_notified_successfully():
     try:
         # Create a user
@@ -49,16 +87,108 @@ def test_user_notified_successfully():
         assert response.status_code == 200
         assert "User notified successfully!" in response.json()["message"]
 
-        # Query user table for the user
-        user = users_table.search(user_query.id == user_id)[0]
-
-        # Assert if the invitation is in active_invitations field
-        assert any(
-            notification.message == "You have been invited to an event"
-            for notification in user["notifications"]
+        # The notification is stored in its own table, not in the user
+        notifications = notifications_table.search(
+            notifications_query.user_id == user_id
         )
+        assert [notification["message"] for notification in notifications] == [
+            "You have been invited to an event"
+        ]
+        assert "notifications" not in users_table.get_by("id", user_id)
 
     finally:
         # Cleanup
         users_table.truncate()
         event_table.truncate()
+        notifications_table.truncate()
+
+
+def test_list_notifications_pages_newest_first():
+    try:
+        user_id, headers = register_and_login("reader")
+        other_id, _ = register_and_login("other")
+        for i in range(5):
+            notify(user_id, f"message {i}")
+        notify(other_id, "not mine")
+
+        messages = []
+        cursor = None
+        while True:
+            params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+            response = client.get("/notifications", params=params, headers=headers)
+            assert response.status_code == 200
+            page = response.json()
+            assert len(page["notifications"]) <= 2
+            messages += [n["message"] for n in page["notifications"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert messages == [f"message {i}" for i in reversed(range(5))]
+
+        for cursor in ("not a cursor", encode_cursor("1", 2), encode_cursor(1.5, None)):
+            response = client.get(
+                "/notifications", params={"cursor": cursor}, headers=headers
+            )
+            assert response.status_code == 400
+    finally:
+        users_table.truncate()
+        notifications_table.truncate()
+
+
+def test_unread_count_and_mark_read():
+    try:
+        user_id, headers = register_and_login("reader")
+        other_id, other_headers = register_and_login("other")
+        for i in range(3):
+            notify(user_id, f"message {i}")
+
+        response = client.get("/notifications/unread_count", headers=headers)
+        assert response.json() == {"unread": 3}
+
+        first = client.get("/notifications", headers=headers).json()["notifications"][0]
+        response = client.post(
+            f"/notifications/{first['id']}/read", headers=other_headers
+        )
+        assert response.status_code == 404
+        response = client.post(f"/notifications/{first['id']}/read", headers=headers)
+        assert response.status_code == 200
+
+        response = client.get("/notifications/unread_count", headers=headers)
+        assert response.json() == {"unread": 2}
+        response = client.get(
+            "/notifications", params={"unread_only": True}, headers=headers
+        )
+        assert first["id"] not in [
+            n["id"] for n in response.json()["notifications"]
+        ]
+
+        response = client.post("/notifications/read", headers=headers)
+        assert response.json()["marked"] == 2
+        response = client.get("/notifications/unread_count", headers=headers)
+        assert response.json() == {"unread": 0}
+    finally:
+        users_table.truncate()
+        notifications_table.truncate()
+
+
+def test_embedded_notifications_are_moved_to_their_table():
+    try:
+        notification = Notification(
+            user_id="legacy",
+            notification_type=NotificationType.SYSTEM,
+            message="old",
+            id="n1",
+            time=1.0,
+        )
+        users_table.insert(
+            {"id": "legacy", "username": "legacy", "notifications": {notification}}
+        )
+
+        move_embedded_notifications()
+
+        assert "notifications" not in users_table.get_by("id", "legacy")
+        assert notifications_table.get_by("id", "n1")["message"] == "old"
+    finally:
+        users_table.truncate()
+        notifications_table.truncate()
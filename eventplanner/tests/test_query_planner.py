@@ -0,0 +1,187 @@
+"""
+Test module for the cost-based query planner.
+
+It checks that:
+    - the indexes estimate the size of a condition without resolving it
+    - plans start from the most selective index and probe or intersect
+      the other indexed conditions before any document is read
+    - conditions without an index are left to be evaluated on the documents
+    - [GET] /events?explain=true returns the chosen plan
+"""
+import sys
+import pathlib
+from os.path import dirname, realpath
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+from tinydb import TinyDB, Query
+from tinydb.storages import MemoryStorage
+from fastapi.testclient import TestClient
+from eventplanner.eventplanner_backend.app.eventplanner_main import app
+from eventplanner.eventplanner_backend.authentication import (
+    eventplanner_authentication_helper as auth_helper,
+)
+from eventplanner.eventplanner_backend.eventplanner_database import (
+    users_table,
+    event_table,
+    memberships_table,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import User
+from eventplanner.eventplanner_backend.storage.eventplanner_indexes import (
+    HashIndex,
+    IndexedTable,
+    SetIndex,
+    SortedIndex,
+)
+
+client = TestClient(app)
+query = Query()
+
+
+def create_indexed_events_table() -> IndexedTable:
+    table = IndexedTable(
+        TinyDB(storage=MemoryStorage).table("events"),
+        [
+            HashIndex("id"),
+            HashIndex("public", unique=False),
+            SetIndex("tags"),
+            SortedIndex("start_time"),
+        ],
+    )
+    for i in range(100):
+        table.insert(
+            {
+                "id": str(i),
+                "public": i % 2 == 0,
+                "tags": {"#art"} if i % 10 == 0 else {"#music"},
+                "start_time": i,
+                "title": f"event {i % 3}",
+            }
+        )
+    return table
+
+
+def test_indexes_estimate_conditions_without_resolving_them():
+    table = create_indexed_events_table()
+    indexes = table.indexes
+
+    assert indexes["id"].estimate("==", "7") == 1
+    assert indexes["public"].estimate("==", True) == 50
+    assert indexes["tags"].estimate("any", ("#art", "#music")) == 100
+    assert indexes["tags"].estimate("all", ("#art", "#music")) == 10
+    assert indexes["start_time"].estimate(">=", 90) == 10
+    assert indexes["start_time"].estimate("<", 10) == 10
+    assert indexes["start_time"].estimate("<", -1) == 0
+    assert indexes["start_time"].estimate("matches", "x") is None
+    for operation, operand in ((">=", 90), ("<", 10), ("<=", 10), (">", 95)):
+        resolved = indexes["start_time"].resolve(operation, operand)
+        assert indexes["start_time"].estimate(operation, operand) == len(resolved)
+
+
+def test_plan_starts_from_the_most_selective_index():
+    table = create_indexed_events_table()
+    cond = (
+        (query.public == True)
+        & query.tags.any(["#art"])
+        & (query.start_time >= 85)
+        & (query.title == "event 0")
+    )
+
+    plan = table.explain(cond)
+    assert [(step["step"], step["index"]) for step in plan[:3]] == [
+        ("lookup", "tags"),
+        ("intersect", "start_time"),
+        # Probing the one candidate left beats collecting 50 ids
+        ("probe", "public"),
+    ]
+    assert [step["estimated_rows"] for step in plan[:3]] == [10, 15, 50]
+    assert [step["rows"] for step in plan[:3]] == [10, 1, 1]
+    # The title has no index and is evaluated on the candidate documents
+    assert plan[3] == {"step": "filter"}
+    assert [document["id"] for document in table.search(cond)] == ["90"]
+    assert table.count(cond & (query.public == False)) == 0
+
+
+def test_plan_matches_a_scan_of_the_table():
+    table = create_indexed_events_table()
+    conditions = [
+        query.public == False,
+        query.tags.all(["#art"]),
+        query.start_time < 30,
+        query.start_time > 20,
+        query.title == "event 1",
+    ]
+    documents = table.all()
+    for first in conditions:
+        for second in conditions:
+            cond = first & second & (query.start_time <= 60)
+            expected = [document["id"] for document in documents if cond(document)]
+            assert [document["id"] for document in table.search(cond)] == expected
+
+
+def test_explain_without_indexed_conditions():
+    table = create_indexed_events_table()
+
+    assert table.explain(query.title == "event 1") == [
+        {"step": "scan", "estimated_rows": 100},
+        {"step": "filter"},
+    ]
+    assert table.explain(None, "start_time") == [
+        {"step": "walk", "index": "start_time", "estimated_rows": 100}
+    ]
+    assert table.explain(query.id == "3", "start_time")[-1] == {
+        "step": "sort",
+        "index": "start_time",
+        "rows": 1,
+    }
+
+
+def test_events_explain_returns_the_plan():
+    try:
+        user = User(id="organizer", username="o", email="o@example.com", password="x")
+        users_table.insert(user.model_dump())
+        token = auth_helper.create_access_token(data=user, version=0)
+        for i in range(3):
+            response = client.post(
+                "/events/register",
+                params={
+                    "title": f"event {i}",
+                    "description": "d",
+                    "location": "l",
+                    "tags": ["#art"] if i else ["#music"],
+                    "public": True,
+                },
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            assert response.status_code == 200
+
+        response = client.get(
+            "/events",
+            params={
+                "tags": ["#music"],
+                "public": True,
+                "location": "l",
+                "explain": True,
+            },
+        )
+        assert response.status_code == 200
+        plan = response.json()["plan"]
+        assert [step["step"] for step in plan] == [
+            "lookup",
+            "intersect",
+            "walk",
+            "filter",
+        ]
+        assert [step.get("index") for step in plan[:3]] == [
+            "tags",
+            "public",
+            "created_at",
+        ]
+        assert plan[1]["estimated_rows"] == 3 and plan[1]["rows"] == 1
+
+        response = client.get("/events", params={"organizer_name": "o"})
+        assert len(response.json()) == 3
+    finally:
+        users_table.truncate()
+        event_table.truncate()
+        memberships_table.truncate()
@@ -0,0 +1,133 @@
+"""
+Test module for the JSON-native set encoding and the legacy migration.
+
+It checks that:
+    - sets and frozensets round-trip through the tagged sorted-array format
+    - sets of registered models (invitations) are restored as models
+    - a legacy base64+pickle db.json is migrated in place
+    - a legacy SQLite database is migrated a batch of rows at a time
+"""
+import sys
+import json
+import sqlite3
+import pathlib
+import tempfile
+from os.path import dirname, realpath, join
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+from tinydb import TinyDB
+from tinydb.storages import JSONStorage
+from eventplanner.eventplanner_backend.eventplanner_database import SetSerializer
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
+    Invitation,
+    InvitationType,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_set_encoding import (
+    LEGACY_TAG,
+    LegacySetSerializer,
+    SetEncodingMiddleware,
+    decode_document,
+    encode_document,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_set_migration import (
+    JSONStreamReader,
+    migrate_json_file,
+    migrate_sqlite_file,
+)
+
+invitation = Invitation(
+    id="inv", time="1", start_user="a", end_user="b", type=InvitationType.FRIEND
+)
+
+
+def test_sets_round_trip_as_sorted_tagged_arrays():
+    document = {
+        "friends": {"c", "a", "b"},
+        "tags": frozenset({"#art"}),
+        "active_invitations": {invitation},
+        "title": "unchanged",
+    }
+    encoded = encode_document(document)
+
+    assert encoded["friends"] == {"__set__": "str", "items": ["a", "b", "c"]}
+    assert encoded["tags"] == {"__frozenset__": "str", "items": ["#art"]}
+    assert decode_document(json.loads(json.dumps(encoded))) == document
+    assert SetSerializer().decode(SetSerializer().encode({"x"})) == {"x"}
+
+
+def test_legacy_database_is_migrated_in_place():
+    with tempfile.TemporaryDirectory() as directory:
+        path = join(directory, "db.json")
+        legacy = LegacySetSerializer()
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(
+                {
+                    "users": {
+                        str(i): {
+                            "id": str(i),
+                            "friends": LEGACY_TAG + legacy.encode({"x", str(i)}),
+                            "active_invitations": LEGACY_TAG
+                            + legacy.encode({invitation}),
+                        }
+                        for i in range(1, 20)
+                    },
+                    "events": {},
+                },
+                handle,
+            )
+
+        assert migrate_json_file(path) == 19
+
+        with open(path, encoding="utf-8") as handle:
+            assert LEGACY_TAG not in handle.read()
+        database = TinyDB(path, storage=SetEncodingMiddleware(JSONStorage))
+        user = database.table("users").get(doc_id=3)
+        assert user["friends"] == {"x", "3"}
+        assert user["active_invitations"] == {invitation}
+        assert database.table("events").all() == []
+        database.close()
+
+
+def test_stream_reader_handles_chunk_boundaries():
+    with tempfile.TemporaryDirectory() as directory:
+        path = join(directory, "db.json")
+        data = {"t": {str(i): {"n": i * 1234567, "s": "x" * i} for i in range(30)}}
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(data, handle)
+
+        with open(path, encoding="utf-8") as handle:
+            documents = [
+                (doc_id, document)
+                for _, doc_id, document in JSONStreamReader(handle, 7).documents()
+                if doc_id is not None
+            ]
+        assert dict(documents) == data["t"]
+
+
+def test_legacy_sqlite_database_is_migrated_in_batches():
+    with tempfile.TemporaryDirectory() as directory:
+        path = join(directory, "db.sqlite3")
+        legacy = LegacySetSerializer()
+        connection = sqlite3.connect(path)
+        connection.execute(
+            'CREATE TABLE "users" (doc_id INTEGER PRIMARY KEY, data TEXT NOT NULL)'
+        )
+        connection.executemany(
+            'INSERT INTO "users" VALUES (?, ?)',
+            [
+                (i, json.dumps({"friends": LEGACY_TAG + legacy.encode({str(i)})}))
+                for i in range(1, 24)
+            ],
+        )
+        connection.commit()
+        connection.close()
+
+        assert migrate_sqlite_file(path, batch_size=5) == 23
+
+        connection = sqlite3.connect(path)
+        rows = connection.execute('SELECT doc_id, data FROM "users"').fetchall()
+        connection.close()
+        assert [
+            decode_document(json.loads(data))["friends"] for _, data in rows
+        ] == [{str(doc_id)} for doc_id, _ in rows]
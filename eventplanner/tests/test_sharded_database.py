@@ -0,0 +1,58 @@
+"""
+Test module for per-table storage files.
+
+It checks that with EVENTPLANNER_DATABASE_PER_TABLE_FILES every table is
+stored in its own file and that writing events leaves the users file alone.
+"""
+import sys
+import pathlib
+from os.path import dirname, realpath, getmtime, getsize
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+import pytest
+from tinydb import Query
+from eventplanner.common import eventplanner_common as common
+from eventplanner.eventplanner_backend.eventplanner_database import create_database
+
+query = Query()
+
+
+@pytest.mark.parametrize(
+    "engine, users_file, events_file",
+    [
+        (common.EventplannerDatabaseEngine.JSON, "db.users.json", "db.events.json"),
+        (
+            common.EventplannerDatabaseEngine.WAL,
+            "db.users.json.wal",
+            "db.events.json.wal",
+        ),
+        (
+            common.EventplannerDatabaseEngine.SQLITE,
+            "db.users.sqlite3",
+            "db.events.sqlite3",
+        ),
+    ],
+)
+def test_event_writes_do_not_touch_users_file(
+    engine, users_file, events_file, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(common, "EVENTPLANNER_DATABASE_PER_TABLE_FILES", True)
+    monkeypatch.setattr(common, "EVENTPLANNER_DATABASE_MULTIPROCESS", False)
+    database = create_database(engine)
+    try:
+        database.table("users").insert({"id": "1", "friends": {"2"}})
+        users_state = (getsize(users_file), getmtime(users_file))
+
+        events = database.table("events")
+        for i in range(20):
+            events.insert({"id": str(i), "participants": {"1"}})
+        events.update({"title": "updated"}, query.id == "3")
+
+        assert (getsize(users_file), getmtime(users_file)) == users_state
+        assert getsize(events_file) > 0
+        assert database.table("users").get(query.id == "1")["friends"] == {"2"}
+        assert database.tables() == {"users", "events"}
+    finally:
+        database.close()
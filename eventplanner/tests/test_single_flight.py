@@ -0,0 +1,266 @@
+"""
+Test module for the calls to the geocoding and weather services.
+
+It checks that:
+    - concurrent calls for a key share the result, or the error, of one call,
+      from threads and from coroutines
+    - concurrent geocode and forecast lookups of the same place make a single
+      request to a local fake Nominatim and open-meteo
+    - forecasts are fetched over one keep-alive connection and time out
+"""
+import sys
+import json
+import asyncio
+import time
+import pathlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import dirname, realpath
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+import httpx
+import pytest
+from geopy import Nominatim
+from tinydb import TinyDB
+from tinydb.storages import MemoryStorage
+from eventplanner.common import eventplanner_common as common
+from eventplanner.eventplanner_backend.api_routers import (
+    eventplanner_geocoding as geocoding,
+    eventplanner_weather_integration as weather_integration,
+    shared_functions,
+)
+from eventplanner.eventplanner_backend.api_routers.eventplanner_single_flight import (
+    SingleFlight,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_indexes import (
+    HashIndex,
+    IndexedTable,
+)
+
+CALLERS = 20
+HOURLY_VARIABLES = [
+    "temperature_2m",
+    "relative_humidity_2m",
+    "dew_point_2m",
+    "apparent_temperature",
+    "precipitation_probability",
+    "precipitation",
+    "rain",
+    "snowfall",
+    "snow_depth",
+    "wind_speed_80m",
+    "temperature_180m",
+    "soil_temperature_6cm",
+]
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    """Answers like Nominatim on /search and like open-meteo on /v1/forecast."""
+
+    protocol_version = "HTTP/1.1"
+    requests = []
+    connections = set()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        self.requests.append(url.path)
+        self.connections.add(self.client_address)
+        # Keep the call in flight long enough for every caller to join it
+        time.sleep(0.3)
+        if url.path == "/search":
+            body = [{"lat": "44.4268", "lon": "26.1025", "display_name": "Bucharest"}]
+        else:
+            hours = 24 * int(params["forecast_days"][0])
+            times = [f"2024-05-{1 + i // 24:02}T{i % 24:02}:00" for i in range(hours)]
+            body = {
+                "hourly": {
+                    "time": times,
+                    **{variable: [1.5] * hours for variable in HOURLY_VARIABLES},
+                }
+            }
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    FakeUpstreamHandler.requests = []
+    FakeUpstreamHandler.connections = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeUpstreamHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    address = f"127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(
+        geocoding,
+        "geolocator",
+        Nominatim(user_agent="test", domain=address, scheme="http", timeout=10),
+    )
+    monkeypatch.setattr(
+        shared_functions,
+        "geocoding_cache",
+        geocoding.GeocodingCache(
+            geocoding.geocode,
+            IndexedTable(
+                TinyDB(storage=MemoryStorage).table("geocodes"),
+                [HashIndex("location")],
+            ),
+            size=10,
+            ttl=60,
+            negative_ttl=60,
+        ),
+    )
+    monkeypatch.setattr(
+        common, "EVENTPLANNER_WEATHER_URL", f"http://{address}/v1/forecast"
+    )
+    monkeypatch.setattr(
+        weather_integration,
+        "forecast_cache",
+        weather_integration.ForecastCache(
+            weather_integration.fetch_forecast,
+            size=10,
+            grid_degrees=0.1,
+            update_interval=3600,
+        ),
+    )
+    try:
+        yield FakeUpstreamHandler.requests
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run_concurrently(function, arguments: list) -> list:
+    barrier = threading.Barrier(len(arguments))
+
+    def call(argument):
+        barrier.wait()
+        return function(argument)
+
+    with ThreadPoolExecutor(len(arguments)) as executor:
+        return list(executor.map(call, arguments))
+
+
+def test_concurrent_calls_share_one_result():
+    flights = SingleFlight()
+    calls = []
+
+    def slow_call():
+        calls.append(None)
+        time.sleep(0.2)
+        return len(calls)
+
+    results = run_concurrently(lambda _: flights.do("key", slow_call), [None] * 10)
+    assert results == [1] * 10
+    assert len(flights) == 0
+    # Later calls start a new flight
+    assert flights.do("key", slow_call) == 2
+
+
+def test_concurrent_calls_share_one_error():
+    flights = SingleFlight()
+    calls = []
+
+    def failing_call():
+        calls.append(None)
+        time.sleep(0.2)
+        raise ConnectionError("upstream is down")
+
+    def call(_):
+        with pytest.raises(ConnectionError):
+            flights.do("key", failing_call)
+
+    run_concurrently(call, [None] * 10)
+    assert len(calls) == 1
+    assert len(flights) == 0
+
+
+def test_concurrent_geocodes_make_one_request(upstream):
+    results = run_concurrently(
+        shared_functions.get_location_coordinates,
+        ["Bucharest", "bucharest ", " BUCHAREST"] * (CALLERS // 3),
+    )
+    assert set(results) == {(44.4268, 26.1025)}
+    assert upstream == ["/search"]
+
+
+def test_concurrent_coroutines_share_one_result():
+    flights = SingleFlight()
+    calls = []
+
+    async def slow_call():
+        calls.append(None)
+        await asyncio.sleep(0.1)
+        return len(calls)
+
+    async def main():
+        first = asyncio.create_task(flights.do_async("key", slow_call))
+        others = [flights.do_async("key", slow_call) for _ in range(9)]
+        await asyncio.sleep(0)
+        assert len(flights) == 1
+        # The call outlives the caller that started it
+        first.cancel()
+        return await asyncio.gather(*others)
+
+    assert asyncio.run(main()) == [1] * 9
+    assert len(flights) == 0
+
+
+async def forecasts(points: list) -> list:
+    return await asyncio.gather(
+        *(
+            weather_integration.fetch_and_create_weather_data(
+                *point, weather_integration.TimeInterval.DAY_3
+            )
+            for point in points
+        )
+    )
+
+
+def test_concurrent_forecasts_make_one_request(upstream):
+    results = asyncio.run(
+        forecasts([(44.4268, 26.1025), (44.41, 26.07)] * (CALLERS // 2))
+    )
+    assert all(result is results[0] for result in results)
+    assert len(results[0]) == 3
+    assert upstream == ["/v1/forecast"]
+
+
+def test_forecasts_share_a_keep_alive_connection(upstream):
+    async def main():
+        for latitude in (10, 20, 30):
+            await weather_integration.fetch_forecast(
+                latitude, 0, weather_integration.TimeInterval.DAY_1
+            )
+        await weather_integration.weather_client.aclose()
+
+    asyncio.run(main())
+    assert len(upstream) == 3
+    assert len(FakeUpstreamHandler.connections) == 1
+
+
+def test_forecasts_time_out(upstream, monkeypatch):
+    monkeypatch.setattr(
+        weather_integration,
+        "weather_client",
+        weather_integration.WeatherClient(
+            timeout=httpx.Timeout(0.05, connect=1),
+            limits=httpx.Limits(max_connections=1),
+        ),
+    )
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(
+            weather_integration.fetch_forecast(
+                0, 0, weather_integration.TimeInterval.DAY_1
+            )
+        )
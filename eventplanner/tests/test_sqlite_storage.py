@@ -0,0 +1,108 @@
+"""
+Test module for the SQLite storage engine.
+
+It checks that ``SQLiteTable`` behaves like a TinyDB table for the operations
+used by the routers:
+    - insert / get / search
+    - update / upsert
+    - remove / truncate
+    - reads limited to some fields
+"""
+import sys
+import pathlib
+import tempfile
+from os.path import dirname, realpath, join
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+from tinydb import Query
+from eventplanner.eventplanner_backend.storage.eventplanner_sqlite_storage import (
+    SQLiteDatabase,
+)
+
+query = Query()
+
+
+def create_test_database(directory: str) -> SQLiteDatabase:
+    return SQLiteDatabase(join(directory, "test.sqlite3"))
+
+
+def test_insert_and_search_documents_with_sets():
+    with tempfile.TemporaryDirectory() as directory:
+        database = create_test_database(directory)
+        try:
+            table = database.table("users")
+            doc_id = table.insert({"id": "1", "username": "a", "friends": {"2", "3"}})
+            table.insert({"id": "2", "username": "b", "friends": None})
+
+            assert table.get(doc_id=doc_id)["friends"] == {"2", "3"}
+            assert table.search(query.username == "b")[0]["id"] == "2"
+            assert table.get(query.id == "missing") is None
+            assert len(table) == 2
+        finally:
+            database.close()
+
+
+def test_update_only_touches_matching_documents():
+    with tempfile.TemporaryDirectory() as directory:
+        database = create_test_database(directory)
+        try:
+            table = database.table("events")
+            table.insert({"id": "1", "participants": set()})
+            table.insert({"id": "2", "participants": set()})
+
+            updated = table.update({"participants": {"user"}}, query.id == "1")
+
+            assert len(updated) == 1
+            assert table.get(query.id == "1")["participants"] == {"user"}
+            assert table.get(query.id == "2")["participants"] == set()
+
+            table.upsert({"id": "3", "participants": set()}, query.id == "3")
+            assert table.contains(query.id == "3")
+        finally:
+            database.close()
+
+
+def test_remove_and_truncate():
+    with tempfile.TemporaryDirectory() as directory:
+        database = create_test_database(directory)
+        try:
+            table = database.table("events")
+            table.insert_multiple([{"id": "1"}, {"id": "2"}, {"id": "3"}])
+
+            assert len(table.remove(query.id == "2")) == 1
+            assert [event["id"] for event in table.all()] == ["1", "3"]
+
+            table.truncate()
+            assert len(table) == 0
+        finally:
+            database.close()
+
+
+def test_get_reads_only_the_requested_fields():
+    with tempfile.TemporaryDirectory() as directory:
+        database = create_test_database(directory)
+        try:
+            table = database.table("events")
+            doc_id = table.insert(
+                {
+                    "id": "1",
+                    "tags": {"#art"},
+                    "title": None,
+                    # Not a valid encoded set: decoding it would fail
+                    "admins": "{TinySet}:not base64",
+                }
+            )
+
+            document = table.get(doc_id=doc_id, fields={"id", "tags", "title", "x"})
+            assert document == {"id": "1", "tags": {"#art"}, "title": None}
+            assert document.doc_id == doc_id
+            assert table.get(doc_ids=[doc_id, 99], fields={"id"}) == [{"id": "1"}]
+            assert table.get(doc_id=99, fields={"id"}) is None
+
+            created_at = 1760000000.1234567
+            doc_id = table.insert({"id": "2", "created_at": created_at})
+            document = table.get(doc_id=doc_id, fields={"created_at"})
+            assert document["created_at"] == created_at
+        finally:
+            database.close()
@@ -0,0 +1,136 @@
+"""
+Test module for the full-text event search.
+
+It checks that:
+    - text is split into lowercase words without accents
+    - results are ranked with BM25 and prefixes of words match
+    - the index follows inserts, updates and removes of the table
+    - [GET] /events/search returns the best matching events first
+"""
+import sys
+import pathlib
+from os.path import dirname, realpath
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+from tinydb import TinyDB, Query
+from tinydb.storages import MemoryStorage
+from fastapi.testclient import TestClient
+from eventplanner.eventplanner_backend.app.eventplanner_main import app
+from eventplanner.eventplanner_backend.authentication import (
+    eventplanner_authentication_helper as auth_helper,
+)
+from eventplanner.eventplanner_backend.eventplanner_database import (
+    users_table,
+    event_table,
+    memberships_table,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import User
+from eventplanner.eventplanner_backend.storage.eventplanner_indexes import (
+    IndexedTable,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_text_index import (
+    TextIndex,
+    tokenize,
+)
+
+client = TestClient(app)
+query = Query()
+
+
+def create_indexed_events_table() -> IndexedTable:
+    return IndexedTable(
+        TinyDB(storage=MemoryStorage).table("events"),
+        [TextIndex("title", "description", "location")],
+    )
+
+
+def titles(results: list) -> list:
+    return [document["title"] for document, _ in results]
+
+
+def test_tokenize_lowercases_and_strips_accents():
+    assert tokenize("Concert în Piața Unirii, 20:00!") == [
+        "concert",
+        "in",
+        "piata",
+        "unirii",
+        "20",
+        "00",
+    ]
+
+
+def test_search_ranks_with_bm25_and_matches_prefixes():
+    table = create_indexed_events_table()
+    table.insert({"title": "Jazz concert", "description": "Live jazz, jazz all night"})
+    table.insert({"title": "Rock concert", "description": "Loud guitars"})
+    table.insert({"title": "Book club", "description": None, "location": "Library"})
+
+    # More occurrences of a rarer word rank higher
+    assert titles(table.search_text("jazz concert")) == ["Jazz concert", "Rock concert"]
+    # Same frequency, the shorter event ranks higher
+    assert titles(table.search_text("conc")) == ["Rock concert", "Jazz concert"]
+    assert titles(table.search_text("concert", limit=1)) == ["Rock concert"]
+    assert titles(table.search_text("libr")) == ["Book club"]
+    assert table.search_text("opera") == []
+
+    # An exact word ranks above a longer word it is a prefix of
+    table.insert({"title": "Art", "description": "art"})
+    table.insert({"title": "Artists", "description": "artists"})
+    assert titles(table.search_text("art")) == ["Art", "Artists"]
+
+
+def test_search_follows_table_writes():
+    table = create_indexed_events_table()
+    table.insert({"id": "1", "title": "Morning yoga", "location": "Park"})
+    table.insert({"id": "2", "title": "Evening run", "location": "Park"})
+
+    table.update({"title": "Morning pilates"}, query.id == "1")
+    assert table.search_text("yoga") == []
+    assert titles(table.search_text("pilates")) == ["Morning pilates"]
+
+    table.remove(query.id == "2")
+    assert titles(table.search_text("park")) == ["Morning pilates"]
+    assert table.indexes["text"].expand("ev") == []
+
+    table.truncate()
+    assert table.search_text("park") == []
+
+
+def test_search_events_endpoint_returns_best_matches_first():
+    try:
+        user = User(id="organizer", username="o", email="o@example.com", password="x")
+        users_table.insert(user.model_dump())
+        token = auth_helper.create_access_token(data=user, version=0)
+        for title, description, location in (
+            ("Jazz night", "Jazz quartet playing jazz standards", "Blue Note"),
+            ("Food market", "Street food and a jazz band", "Old town"),
+            ("Chess meetup", "Casual games", "Library"),
+        ):
+            response = client.post(
+                "/events/register",
+                params={
+                    "title": title,
+                    "description": description,
+                    "location": location,
+                },
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            assert response.status_code == 200
+
+        response = client.get("/events/search", params={"q": "jazz"})
+        assert response.status_code == 200
+        assert [event["title"] for event in response.json()] == [
+            "Jazz night",
+            "Food market",
+        ]
+
+        response = client.get("/events/search", params={"q": "libr", "limit": 1})
+        assert [event["title"] for event in response.json()] == ["Chess meetup"]
+
+        response = client.get("/events/search", params={"q": "jazz", "limit": 0})
+        assert response.status_code == 422
+    finally:
+        users_table.truncate()
+        event_table.truncate()
+        memberships_table.truncate()
@@ -0,0 +1,205 @@
+"""
+Test module for the unit of work over several tables.
+
+It checks that:
+    - writes to several tables inside a transaction are flushed once
+    - an exception inside a transaction stores nothing and resets the indexes
+    - nested transactions join the outermost one
+    - the table locks are taken in the order of their lock files, whatever
+      the order of the tables and of the lock objects in memory
+    - SQLite databases commit and roll back a unit of work
+    - [POST] /events/register stores the event and the user update together
+"""
+import sys
+import pathlib
+from contextlib import contextmanager
+from functools import partial
+from os.path import dirname, realpath
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+import pytest
+from tinydb import TinyDB, Query
+from tinydb.storages import MemoryStorage
+from fastapi.testclient import TestClient
+from eventplanner.eventplanner_backend.app.eventplanner_main import app
+from eventplanner.eventplanner_backend.authentication import (
+    eventplanner_authentication_helper as auth_helper,
+)
+from eventplanner.eventplanner_backend.eventplanner_database import (
+    users_table,
+    event_table,
+    memberships_table,
+    reload_table,
+    transaction,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import User
+from eventplanner.eventplanner_backend.storage.eventplanner_indexes import (
+    HashIndex,
+    IndexedTable,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_locking import (
+    LockedTable,
+    ProcessReadWriteLock,
+    ReadWriteLock,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_sqlite_storage import (
+    SQLiteDatabase,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_transactions import (
+    TransactionMiddleware,
+    unit_of_work,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_versioning import (
+    VersionedTable,
+)
+
+client = TestClient(app)
+query = Query()
+
+
+class CountingStorage(MemoryStorage):
+    writes = 0
+
+    def write(self, data):
+        CountingStorage.writes += 1
+        super().write(data)
+
+
+def open_tables(database, lock):
+    tables = []
+    for name in ("users", "events"):
+        table = database.table(name)
+        indexed_table = IndexedTable(VersionedTable(table), [HashIndex("id")])
+        reload = partial(reload_table, table, indexed_table)
+        tables.append(LockedTable(indexed_table, lock, reload))
+    return tables
+
+
+@pytest.fixture
+def memory_tables():
+    CountingStorage.writes = 0
+    database = TinyDB(storage=TransactionMiddleware(CountingStorage))
+    users, events = open_tables(database, ReadWriteLock())
+    return database.storage, users, events
+
+
+def test_transaction_flushes_once(memory_tables):
+    unit, users, events = memory_tables
+    with unit_of_work([(users, unit), (events, unit)]):
+        users.insert({"id": "user"})
+        events.insert({"id": "event"})
+        users.update({"events_created": {"event"}}, query.id == "user")
+        assert users.get_by("id", "user")["events_created"] == {"event"}
+
+    assert CountingStorage.writes == 1
+    assert events.get_by("id", "event") is not None
+    assert users.get_by("id", "user")["events_created"] == {"event"}
+
+
+def test_failed_transaction_stores_nothing(memory_tables):
+    unit, users, events = memory_tables
+    users.insert({"id": "existing"})
+
+    with pytest.raises(RuntimeError):
+        with unit_of_work([(users, unit), (events, unit)]):
+            users.insert({"id": "user"})
+            events.insert({"id": "event"})
+            raise RuntimeError("abort")
+
+    assert CountingStorage.writes == 1
+    assert users.get_by("id", "user") is None
+    assert events.get_by("id", "event") is None
+    assert len(users) == 1
+    assert users.insert({"id": "user"}) == 2
+
+
+def test_nested_transactions_join_the_outer_one(memory_tables):
+    unit, users, events = memory_tables
+    with unit_of_work([(users, unit), (events, unit)]):
+        with unit_of_work([(users, unit)]):
+            users.insert({"id": "user"})
+        assert CountingStorage.writes == 0
+        events.insert({"id": "event"})
+
+    assert CountingStorage.writes == 1
+
+
+class RecordingLock(ProcessReadWriteLock):
+    taken = []
+
+    @contextmanager
+    def write(self):
+        with super().write():
+            RecordingLock.taken.append(self.path)
+            yield
+
+
+def test_locks_are_taken_in_lock_file_order(tmp_path):
+    database = TinyDB(storage=TransactionMiddleware(MemoryStorage))
+    locks = [RecordingLock(str(tmp_path / f"{i}.lock")) for i in range(2)]
+    # The lock file order is the opposite of the order in memory
+    locks.sort(key=id, reverse=True)
+    paths = sorted(lock.path for lock in locks)
+    tables = [open_tables(database, lock)[0] for lock in locks]
+
+    for participants in (tables, tables[::-1]):
+        RecordingLock.taken = []
+        with unit_of_work((table, database.storage) for table in participants):
+            pass
+        assert RecordingLock.taken == paths
+
+
+def test_sqlite_unit_of_work(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "db.sqlite3"))
+    try:
+        users, events = open_tables(database, ReadWriteLock())
+        with unit_of_work([(users, database), (events, database)]):
+            users.insert({"id": "user"})
+            events.insert({"id": "event"})
+
+        with pytest.raises(RuntimeError):
+            with unit_of_work([(users, database), (events, database)]):
+                users.remove(query.id == "user")
+                events.insert({"id": "other"})
+                raise RuntimeError("abort")
+
+        assert users.get_by("id", "user") is not None
+        assert events.get_by("id", "other") is None
+        assert len(events) == 1
+    finally:
+        database.close()
+
+
+def test_register_event_updates_event_and_user_together():
+    try:
+        user = User(
+            id="organizer", username="organizer", email="o@example.com", password="x"
+        )
+        users_table.insert(user.model_dump())
+        token = auth_helper.create_access_token(data=user, version=0)
+
+        response = client.post(
+            "/events/register",
+            params={"title": "t", "description": "d", "location": "l"},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+        assert response.status_code == 200
+        event_id = response.json()["id_event"]
+        assert event_table.get_by("id", event_id) is not None
+        assert users_table.get_by("id", "organizer")["events_created"] == {event_id}
+        assert memberships_table.get_by("user_id", "organizer")["role"] == "admin"
+
+        with pytest.raises(RuntimeError):
+            with transaction(event_table, users_table):
+                event_table.remove(query.id == event_id)
+                users_table.update({"events_created": set()}, query.id == "organizer")
+                raise RuntimeError("abort")
+
+        assert event_table.get_by("id", event_id) is not None
+        assert users_table.get_by("id", "organizer")["events_created"] == {event_id}
+    finally:
+        users_table.truncate()
+        event_table.truncate()
+        memberships_table.truncate()
@@ -0,0 +1,114 @@
+"""
+Test module for the write-ahead log storage.
+
+It checks that:
+    - writes only append the changed documents to the log
+    - the log is replayed on startup
+    - a torn log tail left by a crash is dropped
+    - compaction rewrites the snapshot and empties the log
+    - reads copy documents only when they are read, and writes leave the
+      tables they did not change as they were, set fields included
+"""
+import sys
+import json
+import pathlib
+import tempfile
+from os.path import dirname, realpath, join, getsize
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+from tinydb import TinyDB, Query
+from eventplanner.eventplanner_backend.storage.eventplanner_set_encoding import (
+    SetEncodingMiddleware,
+)
+from eventplanner.eventplanner_backend.storage.eventplanner_wal_storage import (
+    DocumentsView,
+    WriteAheadLogStorage,
+)
+
+query = Query()
+
+
+def open_test_database(directory: str) -> TinyDB:
+    return TinyDB(
+        join(directory, "db.json"), storage=WriteAheadLogStorage, compaction_interval=0
+    )
+
+
+def test_update_appends_only_changed_document():
+    with tempfile.TemporaryDirectory() as directory:
+        database = open_test_database(directory)
+        table = database.table("events")
+        table.insert_multiple([{"id": str(i), "title": "x" * 100} for i in range(50)])
+        log_size = getsize(join(directory, "db.json.wal"))
+
+        table.update({"title": "updated"}, query.id == "7")
+
+        with open(join(directory, "db.json.wal"), encoding="utf-8") as handle:
+            last_entry = json.loads(handle.readlines()[-1])
+        assert last_entry == [["put", "events", "8", {"id": "7", "title": "updated"}]]
+        assert getsize(join(directory, "db.json.wal")) - log_size < 100
+        assert getsize(join(directory, "db.json")) == 0
+        database.storage.close()
+
+
+def test_log_is_replayed_and_torn_tail_dropped():
+    with tempfile.TemporaryDirectory() as directory:
+        database = open_test_database(directory)
+        database.table("users").insert({"id": "1", "username": "first"})
+        database.table("users").update({"username": "second"}, query.id == "1")
+        # Simulate a crash: no compaction, and half a record at the end of the log
+        database.storage._log_handle.close()
+        with open(join(directory, "db.json.wal"), "a", encoding="utf-8") as handle:
+            handle.write('[["put", "users", "2", {"id": ')
+
+        recovered = open_test_database(directory)
+        assert recovered.table("users").all() == [{"id": "1", "username": "second"}]
+
+        recovered.table("users").insert({"id": "2", "username": "third"})
+        assert len(recovered.table("users")) == 2
+        recovered.storage.close()
+
+
+def test_compaction_rewrites_snapshot():
+    with tempfile.TemporaryDirectory() as directory:
+        database = open_test_database(directory)
+        database.table("users").insert({"id": "1"})
+        database.table("users").remove(query.id == "1")
+        database.table("users").insert({"id": "2"})
+
+        database.storage.compact()
+
+        assert getsize(join(directory, "db.json.wal")) == 0
+        with open(join(directory, "db.json"), encoding="utf-8") as handle:
+            assert json.load(handle) == {"users": {"2": {"id": "2"}}}
+        database.storage.close()
+
+        reopened = open_test_database(directory)
+        assert reopened.table("users").all() == [{"id": "2"}]
+        reopened.storage.close()
+
+
+def test_untouched_tables_are_neither_copied_nor_compared():
+    with tempfile.TemporaryDirectory() as directory:
+        database = TinyDB(
+            join(directory, "db.json"),
+            storage=SetEncodingMiddleware(WriteAheadLogStorage),
+            compaction_interval=0,
+        )
+        storage = database.storage.storage
+        users, events = database.table("users"), database.table("events")
+        users.insert({"id": "1", "friends": {"2", "3"}})
+        events.insert({"id": "event", "title": "x"})
+
+        data = storage.read()
+        assert isinstance(data["users"], DocumentsView)
+        data["users"]["1"]["id"] = "changed"
+        stored_users = storage.read()["users"]
+        assert stored_users["1"]["id"] == "1"
+
+        events.update({"title": "y"}, query.id == "event")
+        assert storage.read()["users"].documents is stored_users.documents
+        assert users.get(query.id == "1")["friends"] == {"2", "3"}
+        assert events.get(query.id == "event")["title"] == "y"
+        storage.close()
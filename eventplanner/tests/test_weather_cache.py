@@ -0,0 +1,143 @@
+"""
+Test module for the forecast cache.
+
+It checks that:
+    - points in the same grid cell share one forecast per time interval
+    - forecasts expire at the next model update
+    - the least recently used forecasts are dropped beyond the size bound
+    - [GET] /weather/data can bypass the cache and [GET] /weather/cache
+      reports its hits and misses
+"""
+import sys
+import asyncio
+import pathlib
+from os.path import dirname, realpath
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+from fastapi.testclient import TestClient
+from eventplanner.eventplanner_backend.app.eventplanner_main import app
+from eventplanner.eventplanner_backend.api_routers import (
+    eventplanner_weather_integration as weather_integration,
+)
+from eventplanner.eventplanner_backend.api_routers.eventplanner_weather_integration import (
+    ForecastCache,
+    grid_cell,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
+    TimeInterval,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_weather_columns import (
+    HOURLY_VARIABLES,
+    WeatherColumns,
+)
+
+client = TestClient(app)
+
+
+class FakeForecast:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, latitude: float, longitude: float, time_interval):
+        self.calls.append((latitude, longitude, time_interval))
+        # One hour whose temperature and humidity tell the cell asked for
+        return WeatherColumns.from_open_meteo(
+            {
+                "time": ["2024-05-01T00:00"],
+                **{variable: [len(self.calls)] for variable in HOURLY_VARIABLES},
+                "temperature_2m": [latitude],
+                "relative_humidity_2m": [longitude],
+            }
+        )
+
+
+def cell(response) -> tuple:
+    hour = response.json()[0]["hourly_data"][0]
+    return hour["temperature_2m"], hour["relative_humidity_2m"], hour["rain"]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 7200.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def create_cache(fetch, clock, size: int = 10) -> ForecastCache:
+    return ForecastCache(
+        fetch, size, grid_degrees=0.1, update_interval=3600, clock=clock
+    )
+
+
+def forecast(cache: ForecastCache, *arguments):
+    return asyncio.run(cache.forecast(*arguments))
+
+
+def test_points_in_a_grid_cell_share_a_forecast():
+    fetch, clock = FakeForecast(), Clock()
+    cache = create_cache(fetch, clock)
+
+    assert grid_cell(44.4268, 26.1025, 0.1) == (44.4, 26.1)
+    assert grid_cell(-0.04, 179.96, 0.1) == (-0.0, 180.0)
+    first = forecast(cache, 44.4268, 26.1025, TimeInterval.DAY_7)
+    assert forecast(cache, 44.41, 26.07, TimeInterval.DAY_7) is first
+    assert fetch.calls == [(44.4, 26.1, TimeInterval.DAY_7)]
+
+    forecast(cache, 44.41, 26.07, TimeInterval.DAY_3)
+    forecast(cache, 44.46, 26.07, TimeInterval.DAY_7)
+    assert fetch.calls[1:] == [
+        (44.4, 26.1, TimeInterval.DAY_3),
+        (44.5, 26.1, TimeInterval.DAY_7),
+    ]
+    assert cache.stats() == {"hits": 1, "misses": 3, "size": 3}
+
+
+def test_forecasts_expire_at_the_next_model_update():
+    fetch, clock = FakeForecast(), Clock()
+    cache = create_cache(fetch, clock)
+
+    clock.now = 7200 + 3000
+    forecast(cache, 44.4, 26.1, TimeInterval.DAY_1)
+    clock.now = 7200 + 3599
+    forecast(cache, 44.4, 26.1, TimeInterval.DAY_1)
+    assert len(fetch.calls) == 1
+    clock.now = 7200 + 3600
+    forecast(cache, 44.4, 26.1, TimeInterval.DAY_1)
+    assert len(fetch.calls) == 2
+
+
+def test_least_recently_used_forecasts_are_dropped():
+    fetch, clock = FakeForecast(), Clock()
+    cache = create_cache(fetch, clock, size=2)
+
+    forecast(cache, 1, 1, TimeInterval.DAY_1)
+    forecast(cache, 2, 2, TimeInterval.DAY_1)
+    forecast(cache, 1, 1, TimeInterval.DAY_1)
+    forecast(cache, 3, 3, TimeInterval.DAY_1)
+    assert cache.stats()["size"] == 2
+    forecast(cache, 1, 1, TimeInterval.DAY_1)
+    assert len(fetch.calls) == 3
+    forecast(cache, 2, 2, TimeInterval.DAY_1)
+    assert len(fetch.calls) == 4
+
+
+def test_weather_endpoints_use_and_report_the_cache(monkeypatch):
+    cached, uncached = FakeForecast(), FakeForecast()
+    monkeypatch.setattr(
+        weather_integration, "forecast_cache", create_cache(cached, Clock())
+    )
+    monkeypatch.setattr(weather_integration, "fetch_forecast", uncached)
+
+    params = {"latitude": 44.4268, "longitude": 26.1025, "time_interval": "3"}
+    for _ in range(2):
+        response = client.get("/weather/data", params=params)
+        assert response.status_code == 200
+        assert cell(response) == (44.4, 26.1, 1)
+    response = client.get("/weather/data", params={**params, "cache": False})
+    assert cell(response) == (44.4268, 26.1025, 1)
+    assert uncached.calls == [(44.4268, 26.1025, TimeInterval.DAY_3)]
+
+    response = client.get("/weather/cache")
+    assert response.json() == {"hits": 1, "misses": 1, "size": 1}
@@ -0,0 +1,139 @@
+"""
+Test module for the column-oriented forecasts.
+
+It checks that:
+    - days are views of the forecast arrays
+    - the columns serialize to lists per variable, missing values as null
+    - the models per hour match the ones validated from the open-meteo rows
+    - [GET] /weather/data?format=columns returns the columns of every day,
+      and so does a direct call asking for the columns format
+"""
+import sys
+import asyncio
+import pathlib
+from datetime import datetime
+from os.path import dirname, realpath
+
+sys.path.append(str(pathlib.Path(dirname(realpath(__file__)) + "../../..").resolve()))
+
+import numpy as np
+from fastapi.testclient import TestClient
+from eventplanner.eventplanner_backend.app.eventplanner_main import app
+from eventplanner.eventplanner_backend.api_routers import (
+    eventplanner_weather_integration as weather_integration,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_base_models import (
+    HourlyWeatherData,
+)
+from eventplanner.eventplanner_backend.schemas.eventplanner_weather_columns import (
+    HOURLY_VARIABLES,
+    WeatherColumns,
+    WeatherFormat,
+)
+
+client = TestClient(app)
+
+
+def hourly(days: int) -> dict:
+    hours = 24 * days
+    data = {"time": [f"2024-05-{1 + i // 24:02}T{i % 24:02}:00" for i in range(hours)]}
+    for offset, variable in enumerate(HOURLY_VARIABLES):
+        data[variable] = [offset + i / 10 for i in range(hours)]
+    data["snow_depth"][5] = None
+    return data
+
+
+def test_days_are_views_of_the_forecast():
+    forecast = WeatherColumns.from_open_meteo(hourly(3))
+    days = forecast.days()
+
+    assert [len(day) for day in days] == [24, 24, 24]
+    assert [day.date() for day in days] == [
+        datetime(2024, 5, 1),
+        datetime(2024, 5, 2),
+        datetime(2024, 5, 3),
+    ]
+    for variable, column in days[1].values.items():
+        assert np.shares_memory(column, forecast.values[variable])
+    assert days[2].values["rain"][0] == forecast.values["rain"][48]
+
+
+def test_columns_serialize_to_lists():
+    data = hourly(1)
+    columns = WeatherColumns.from_open_meteo(data).to_json()
+
+    assert list(columns) == ["time", *HOURLY_VARIABLES]
+    assert columns == data
+    assert columns["snow_depth"][5] is None
+
+
+def test_models_match_the_validated_rows():
+    data = hourly(2)
+    forecast = WeatherColumns.from_open_meteo(data)
+    data["snow_depth"][5] = 0.0
+    forecast.values["snow_depth"][5] = 0.0
+    expected = [
+        HourlyWeatherData(
+            time=datetime.fromisoformat(data["time"][i]),
+            **{variable: data[variable][i] for variable in HOURLY_VARIABLES},
+        ).model_dump()
+        for i in range(48)
+    ]
+
+    daily_data = forecast.daily_data
+    assert forecast.daily_data is daily_data
+    assert [day.date for day in daily_data] == [
+        datetime(2024, 5, 1),
+        datetime(2024, 5, 2),
+    ]
+    assert [
+        hour.model_dump() for day in daily_data for hour in day.hourly_data
+    ] == expected
+
+
+def test_weather_data_in_columns(monkeypatch):
+    async def fetch_forecast(latitude, longitude, time_interval):
+        return WeatherColumns.from_open_meteo(hourly(int(time_interval.value)))
+
+    monkeypatch.setattr(weather_integration, "fetch_forecast", fetch_forecast)
+    params = {"latitude": 1, "longitude": 2, "time_interval": "3", "cache": False}
+
+    response = client.get("/weather/data", params={**params, "format": "columns"})
+    assert response.status_code == 200
+    days = response.json()
+    assert [day["date"] for day in days] == [
+        "2024-05-01T00:00:00",
+        "2024-05-02T00:00:00",
+        "2024-05-03T00:00:00",
+    ]
+    assert days[1]["hourly_data"]["time"][0] == "2024-05-02T00:00"
+    assert days[0]["hourly_data"]["snow_depth"][5] is None
+
+    rows = client.get("/weather/data", params=params).json()
+    assert rows[0]["date"] == days[0]["date"]
+    assert rows[0]["hourly_data"][5]["snow_depth"] is None
+    assert [hour["rain"] for hour in rows[1]["hourly_data"]] == (
+        days[1]["hourly_data"]["rain"]
+    )
+
+
+def test_weather_data_called_directly(monkeypatch):
+    forecast = WeatherColumns.from_open_meteo(hourly(1))
+
+    async def fetch_forecast(latitude, longitude, time_interval):
+        return forecast
+
+    monkeypatch.setattr(weather_integration, "fetch_forecast", fetch_forecast)
+    interval = weather_integration.TimeInterval.DAY_1
+
+    def call(**params):
+        return asyncio.run(
+            weather_integration.fetch_and_create_weather_data(
+                1, 2, interval, cache=False, **params
+            )
+        )
+
+    assert call() is forecast.daily_data
+    response = call(response_format=WeatherFormat.COLUMNS)
+    assert response.media_type == "application/json"
+    assert b'"hourly_data":{"time":' in response.body